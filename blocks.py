@@ -0,0 +1,170 @@
+#!/usr/bin/env python
+import opcodes
+
+# opcodes that only touch registers, flags and data memory and fall through to pc + 4
+STRAIGHT_OPCODES = (
+	opcodes.OPCODE_CODE_ADD,
+	opcodes.OPCODE_CODE_SUB,
+	opcodes.OPCODE_CODE_AND,
+	opcodes.OPCODE_CODE_OR,
+	opcodes.OPCODE_CODE_XOR,
+	opcodes.OPCODE_CODE_MULT,
+	opcodes.OPCODE_CODE_SHIFT,
+	opcodes.OPCODE_CODE_SIGNEXT,
+	opcodes.OPCODE_CODE_FFI,
+	opcodes.OPCODE_CODE_EXTRACT,
+	opcodes.OPCODE_CODE_INSERT,
+	opcodes.OPCODE_CODE_MOVEIMM,
+	opcodes.OPCODE_CODE_LD,
+	opcodes.OPCODE_CODE_LDC,
+	opcodes.OPCODE_CODE_ST,
+	opcodes.OPCODE_CODE_STC,
+	opcodes.OPCODE_CODE_NOP)
+
+MAX_BLOCK_LENGTH = 64
+
+class block:
+	""" straight-line opcodes from word index entry, one simulator clock each. a run starts at
+		any step : the clocks where increment_clock only moves the timer are run back to back
+		and passed over at once, the others the interpreter's way """
+	entry = 0
+	length = 0
+
+	def __init__ (self,entry,steps,runner):
+		self.entry = entry
+		self.length = len(steps)
+		self.opcodes = steps
+		# what the untraced runs call : see runner.block_step
+		self.steps = [ runner.block_step(opcode) for opcode in steps ]
+
+	def run (self,runner,offset):
+		""" run from step offset on, the simulator clock already moved to the first one ;
+			0 once the runner stops """
+		if runner.trace or runner.changes.subscribers:
+			return self.run_traced(runner,offset)
+		simulator = runner.simulator
+		stall = runner.stall
+		limit = runner.clock_limit
+		steps = self.steps
+		pc = ( self.entry + offset ) * 4
+		while True:
+			clock = simulator.clock
+			count = self.length - offset
+			if limit and limit - clock + 1 < count:
+				count = limit - clock + 1
+			quiet = runner.quiet_clocks(clock)
+			if quiet:
+				if quiet < count:
+					count = quiet
+				last = offset + count
+				try:
+					while offset < last:
+						steps[offset]()
+						pc += 4
+						offset += 1
+						if runner.pc != pc or runner.stall != stall:
+							break
+				except IndexError:
+					# the faulting step takes the clock after the ones done
+					runner.skip_clocks(clock,clock + count - last + offset)
+					simulator.clock = clock + count - last + offset
+					runner.changes.clear()
+					return self.fault(runner,offset)
+				done = count - last + offset
+				runner.skip_clocks(clock,clock + done)
+				simulator.clock = clock + done - 1
+				runner.changes.clear()
+				if offset < last:
+					return 1
+			else:
+				# a clock where the scheduler or an accelerator has work
+				try:
+					steps[offset]()
+				except IndexError:
+					return self.fault(runner,offset)
+				pc += 4
+				offset += 1
+				runner.changes.clear()
+				if not runner.increment_clock():
+					return 0
+				if runner.pc != pc or runner.stall != stall:
+					return 1
+			if offset == self.length or ( limit and simulator.clock >= limit ):
+				return 1
+			simulator.clock += 1
+
+	def run_traced (self,runner,offset):
+		""" every opcode traced and every clock through increment_clock, as the interpreter does """
+		simulator = runner.simulator
+		stall = runner.stall
+		limit = runner.clock_limit
+		ind = self.entry + offset
+		for opcode in self.opcodes[offset:]:
+			if ind != self.entry + offset:
+				# the rest of the block waits for the next run when the clock limit is reached
+				if limit and simulator.clock >= limit:
+					break
+				simulator.clock += 1
+			try:
+				opcode[0](opcode[3],opcode[1])
+			except IndexError:
+				return self.fault(runner,ind - self.entry)
+			if not runner.trace_opcode(ind,opcode):
+				return 0
+			if not runner.increment_clock():
+				return 0
+			ind += 1
+			# leave as soon as anything but the fall-through path is taken
+			if runner.pc != ind * 4 or runner.stall != stall:
+				break
+		return 1
+
+	def fault (self,runner,step):
+		""" the opcode of step raised IndexError : it takes its clock untraced and is passed
+			over, as simulator_clock does """
+		print 'error %d %d' % (self.entry + step,len(runner.code_segment))
+		runner.pc += 4
+		return 1
+
+class block_cache:
+	""" the block and step of every code word, looked up by index. a word is left to the
+		interpreter the first time it is reached : only code that runs again is translated """
+
+	def __init__ (self,runner):
+		self.runner = runner
+		# (block, step) per word index, (0,0) when no block runs there, None before the first
+		# lookup and False after it
+		self.words = [None] * len(runner.code_segment)
+
+	def lookup (self,ind):
+		""" (block, step) for word index ind, (0,0) for the interpreter to run it """
+		found = self.words[ind]
+		if found:
+			return found
+		if found is None:
+			self.words[ind] = False
+			return (0,0)
+		steps = []
+		i = ind
+		while i < len(self.words) and len(steps) < MAX_BLOCK_LENGTH and ( i == ind or not self.words[i] ):
+			opcode = self.runner.fetch_opcode(i)
+			if opcode[0] is None or opcode[1] not in STRAIGHT_OPCODES:
+				break
+			steps.append(opcode)
+			i += 1
+		if len(steps) < 2:
+			self.words[ind] = (0,0)
+		else:
+			b = block(ind,steps,self.runner)
+			for step in range(b.length):
+				self.words[ind + step] = (b,step)
+		return self.words[ind]
+
+	def invalidate (self,ind):
+		""" drop the block that covers word index ind """
+		(b,step) = self.words[ind] or (0,0)
+		self.words[ind] = None
+		if b:
+			for i in range(b.entry,b.entry + b.length):
+				if self.words[i] and self.words[i][0] is b:
+					self.words[i] = None
@@ -0,0 +1,141 @@
+#!/usr/bin/env python
+import bisect
+
+CAM_MAX_ENTRIES = 1024
+# key_size field of CAM_LKP : 16, 32, 64 and 128 bit keys
+CAM_KEY_BITS = (16,32,64,128)
+CAM_KEY_WORDS = (1,1,2,4)
+
+class cam_table:
+	""" index over one CAM table : entries are key words, each followed by as many mask
+		words when the table is masked. an entry whose key is all ones is empty.
+		fully masked entries (or all of them in a table with no mask) are hashed by key,
+		the others are kept in a short list that is searched in entry order """
+
+	def __init__ (self,segment,start,key_size,use_mask):
+		self.key_words = CAM_KEY_WORDS[key_size]
+		self.key_mask = ( 1 << CAM_KEY_BITS[key_size] ) - 1
+		self.use_mask = use_mask
+		self.entry_words = self.key_words
+		if use_mask:
+			self.entry_words *= 2
+		self.first = start
+		self.count = max(0,min(CAM_MAX_ENTRIES,( len(segment) - start ) // self.entry_words))
+		self.last = self.first + self.count * self.entry_words
+		# key -> indexes of the hashed entries with that key, in order
+		self.keys = {}
+		# indexes of the partly masked entries, in order
+		self.masked = []
+		# (key, mask) of every entry, None when empty
+		self.entries = [None] * self.count
+		for index in range(self.count):
+			self.load(segment,index)
+
+	def value (self,segment,word):
+		v = 0
+		for i in range(self.key_words):
+			v = ( v << 32 ) | int(segment[word + i])
+		return v & self.key_mask
+
+	def load (self,segment,index):
+		""" (re)read entry index from segment into the index """
+		old = self.entries[index]
+		if old is not None:
+			if old[1] == self.key_mask:
+				indexes = self.keys[old[0]]
+				indexes.remove(index)
+				if not indexes:
+					del self.keys[old[0]]
+			else:
+				self.masked.remove(index)
+		word = self.first + index * self.entry_words
+		key = self.value(segment,word)
+		if key == self.key_mask:
+			self.entries[index] = None
+			return
+		mask = self.key_mask
+		if self.use_mask:
+			mask = self.value(segment,word + self.key_words)
+		key &= mask
+		self.entries[index] = (key,mask)
+		if mask == self.key_mask:
+			bisect.insort(self.keys.setdefault(key,[]),index)
+		else:
+			bisect.insort(self.masked,index)
+
+	def lookup (self,key):
+		""" index of the first entry key matches, -1 for none """
+		key &= self.key_mask
+		found = -1
+		if key in self.keys:
+			found = self.keys[key][0]
+		for index in self.masked:
+			if found != -1 and index > found:
+				break
+			(entry,mask) = self.entries[index]
+			if key & mask == entry:
+				return index
+		return found
+
+def search (segment,start,key_size,use_mask,key):
+	""" lookup without an index : the first entry key matches read from segment, -1 for none """
+	key_words = CAM_KEY_WORDS[key_size]
+	key_mask = ( 1 << CAM_KEY_BITS[key_size] ) - 1
+	entry_words = key_words
+	if use_mask:
+		entry_words *= 2
+	count = max(0,min(CAM_MAX_ENTRIES,( len(segment) - start ) // entry_words))
+	key &= key_mask
+	for word in xrange(start,start + count * entry_words,entry_words):
+		if key_words == 1:
+			entry = int(segment[word]) & key_mask
+		else:
+			entry = 0
+			for i in range(key_words):
+				entry = ( entry << 32 ) | int(segment[word + i])
+			entry &= key_mask
+		if entry == key_mask:
+			continue
+		if not use_mask:
+			if key == entry:
+				return ( word - start ) // entry_words
+			continue
+		mask = 0
+		for i in range(key_words):
+			mask = ( mask << 32 ) | int(segment[word + key_words + i])
+		mask &= key_mask
+		if key & mask == entry & mask:
+			return ( word - start ) // entry_words
+	return -1
+
+class cam_cache:
+	""" the CAM tables looked up in one segment, by start word, key size and mask.
+		touch() must be called for every word written to the segment """
+
+	def __init__ (self):
+		self.tables = {}
+		self.enabled = 1
+
+	def table (self,segment,start,key_size,use_mask):
+		key = (start,key_size,use_mask)
+		if key in self.tables:
+			return self.tables[key]
+		table = cam_table(segment,start,key_size,use_mask)
+		if self.enabled:
+			self.tables[key] = table
+		return table
+
+	def lookup (self,segment,start,key_size,use_mask,key):
+		""" index of the first entry of the table that key matches, -1 for none. searched in
+			place when disabled : an index would be rebuilt on every lookup """
+		if not self.enabled:
+			return search(segment,start,key_size,use_mask,key)
+		return self.table(segment,start,key_size,use_mask).lookup(key)
+
+	def touch (self,segment,word):
+		for table in self.tables.itervalues():
+			if table.first <= word < table.last:
+				table.load(segment,( word - table.first ) // table.entry_words)
+
+	def clear (self):
+		self.tables = {}
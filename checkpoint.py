@@ -0,0 +1,193 @@
+#!/usr/bin/env python
+import struct
+import json
+import array
+import random
+import types
+import numpy
+import memory
+
+# magic, version, metadata length ; the JSON metadata follows, then the segments
+CHECKPOINT_MAGIC = 'RCKP'
+CHECKPOINT_VERSION = 1
+HEADER_FORMAT = '<4sHI'
+HEADER_SIZE = struct.calcsize(HEADER_FORMAT)
+# segments start on page boundaries so a restore can map them
+SEGMENT_ALIGN = 4096
+
+# derived from the state or bound to this process, rebuilt by restore
+RUNNER_SKIP = ('simulator','co_runner','co_runners','fio','trace','changes','dispatch','decoded_segment',
+	'blocks','opcode_counts','code_statistics','nop_opcode','crc_constants','cams','crypto')
+# the crypto contexts are saved as the data streamed through them, see crypto_state
+SIMULATOR_SKIP = ('rx_runners','tx_runners','common_cams','hash_tables','semaphore_lock')
+
+class segment_writer:
+	""" raw buffers of a checkpoint, in the order they are added """
+
+	def __init__ (self):
+		self.buffers = []
+		self.size = 0
+
+	def add (self,data):
+		offset = self.size
+		self.buffers.append(data)
+		self.size += len(data)
+		pad = -self.size % SEGMENT_ALIGN
+		if pad:
+			self.buffers.append('\0' * pad)
+			self.size += pad
+		return offset
+
+def is_opcode (value):
+	""" a decoded opcode : (handler, code, word, fields) """
+	return isinstance(value,tuple) and len(value) == 4 and (value[0] is None or callable(value[0])) \
+		and isinstance(value[3],dict)
+
+def value_state (value,segments):
+	""" JSON-able form of an attribute value ; buffers go to segments """
+	if value is None or isinstance(value,(bool,int,long,float,str)):
+		return value
+	if isinstance(value,numpy.ndarray):
+		data = numpy.ascontiguousarray(value).tostring()
+		return {'ndarray':value.dtype.str,'shape':list(value.shape),'offset':segments.add(data)}
+	if isinstance(value,numpy.generic):
+		return {'scalar':value.dtype.str,'value':value.item()}
+	if isinstance(value,array.array):
+		return {'array':value.typecode,'offset':segments.add(value.tostring()),'size':len(value) * value.itemsize}
+	if isinstance(value,memory.paged_memory):
+		pages = {}
+		for number in value.pages:
+			pages[str(number)] = segments.add(value.pages[number].tostring())
+		return {'pages':pages,'size':value.size,'page_size':value.page_size}
+	if is_opcode(value):
+		return {'opcode':int(value[2])}
+	if isinstance(value,list):
+		return [ value_state(v,segments) for v in value ]
+	if isinstance(value,tuple):
+		return {'tuple':[ value_state(v,segments) for v in value ]}
+	if isinstance(value,types.InstanceType):
+		return {'object':object_state(value,(),segments)}
+	raise ValueError('cannot checkpoint a %s' % (type(value)))
+
+def object_state (obj,skip,segments):
+	""" every data attribute of an instance, class defaults included """
+	state = {}
+	names = obj.__class__.__dict__.keys() + obj.__dict__.keys()
+	for name in names:
+		if name.startswith('__') or name in skip or name in state:
+			continue
+		value = getattr(obj,name)
+		if callable(value) and not isinstance(value,types.InstanceType):
+			continue
+		state[name] = value_state(value,segments)
+	return state
+
+class checkpoint_file:
+	""" the segments of a checkpoint being restored ; arrays are mapped copy-on-write """
+
+	def __init__ (self,name):
+		self.name = name
+		fobj = open(name,'rb')
+		(magic,version,length) = struct.unpack(HEADER_FORMAT,fobj.read(HEADER_SIZE))
+		if magic != CHECKPOINT_MAGIC or version != CHECKPOINT_VERSION:
+			fobj.close()
+			raise ValueError('not a version %d checkpoint' % (CHECKPOINT_VERSION))
+		self.metadata = json.loads(fobj.read(length))
+		self.base = HEADER_SIZE + length
+		self.base += -self.base % SEGMENT_ALIGN
+		self.fobj = fobj
+
+	def map (self,dtype,offset,shape):
+		return numpy.memmap(self.name,dtype,'c',self.base + offset,tuple(shape))
+
+	def read (self,offset,size):
+		self.fobj.seek(self.base + offset)
+		return self.fobj.read(size)
+
+	def close (self):
+		self.fobj.close()
+
+	def value (self,state,current,decode):
+		""" attribute value back from its state ; objects are restored into current """
+		if isinstance(state,unicode):
+			return str(state)
+		if isinstance(state,list):
+			if not isinstance(current,list):
+				current = []
+			return [ self.value(state[i],i < len(current) and current[i] or 0,decode) for i in range(len(state)) ]
+		if not isinstance(state,dict):
+			return state
+		if 'ndarray' in state:
+			return self.map(str(state['ndarray']),state['offset'],state['shape'])
+		if 'scalar' in state:
+			return numpy.dtype(str(state['scalar'])).type(state['value'])
+		if 'array' in state:
+			return array.array(str(state['array']),self.read(state['offset'],state['size']))
+		if 'pages' in state:
+			pages = memory.paged_memory(state['size'],state['page_size'])
+			for number in state['pages']:
+				pages.pages[int(number)] = self.map(numpy.uint32,state['pages'][number],(state['page_size'],))
+			return pages
+		if 'opcode' in state:
+			return decode(state['opcode'])
+		if 'tuple' in state:
+			return tuple(self.value(state['tuple'],0,decode))
+		if 'object' in state:
+			if not isinstance(current,types.InstanceType):
+				raise ValueError('checkpoint holds an object where the simulator has none')
+			self.restore_object(current,state['object'],decode)
+			return current
+		raise ValueError('unknown checkpoint value %s' % (state.keys()))
+
+	def restore_object (self,obj,state,decode):
+		for name in state:
+			setattr(obj,str(name),self.value(state[name],getattr(obj,name,0),decode))
+
+def crypto_state (engine,segments):
+	""" the open crypt / auth contexts : their keys and data go as bytes, JSON cannot hold them """
+	return [ value_state((thread,hash,array.array('B',secret),array.array('B',data)),segments)
+		for (thread,hash,secret,data) in engine.state() ]
+
+def save (name,simulator,runners):
+	""" checkpoint the simulator, its runners and the random generator to file name """
+	segments = segment_writer()
+	metadata = {
+		'simulator':object_state(simulator,SIMULATOR_SKIP,segments),
+		'runners':[ object_state(r,RUNNER_SKIP,segments) for r in runners ],
+		'crypto':[ crypto_state(r.crypto,segments) for r in runners ],
+		'random':value_state(random.getstate(),segments),
+	}
+	text = json.dumps(metadata,separators=(',',':'))
+	fobj = open(name,'wb')
+	fobj.write(struct.pack(HEADER_FORMAT,CHECKPOINT_MAGIC,CHECKPOINT_VERSION,len(text)))
+	fobj.write(text)
+	fobj.write('\0' * (-(HEADER_SIZE + len(text)) % SEGMENT_ALIGN))
+	for data in segments.buffers:
+		fobj.write(data)
+	fobj.close()
+
+def restore (name,simulator,runners):
+	""" restore a checkpoint into a simulator and runners built from the same images """
+	checkpoint = checkpoint_file(name)
+	metadata = checkpoint.metadata
+	if len(metadata['runners']) != len(runners):
+		checkpoint.close()
+		raise ValueError('checkpoint holds %d runners, not %d' % (len(metadata['runners']),len(runners)))
+	checkpoint.restore_object(simulator,metadata['simulator'],None)
+	simulator.common_cams.clear()
+	simulator.hash_tables.clear()
+	for i in range(len(runners)):
+		r = runners[i]
+		checkpoint.restore_object(r,metadata['runners'][i],lambda word,r=r: r.decode_opcode(word))
+		r.predecode()
+		r.cams.clear()
+		contexts = []
+		if 'crypto' in metadata:
+			for state in metadata['crypto'][i]:
+				(thread,hash,secret,data) = checkpoint.value(state,0,None)
+				contexts.append((thread,hash,secret.tostring(),data.tostring()))
+		r.crypto.restore(contexts)
+		if r.blocks:
+			r.enable_blocks()
+	random.setstate(checkpoint.value(metadata['random'],0,None))
+	checkpoint.close()
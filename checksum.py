@@ -0,0 +1,26 @@
+#!/usr/bin/env python
+from numpy import frombuffer,uint64
+
+def fold (total):
+	""" 16 bit ones-complement value of a sum : carries added back in """
+	while total > 0xFFFF:
+		total = ( total & 0xFFFF ) + ( total >> 16 )
+	return total
+
+def partial_sum (data,total=0,reverse=0,odd=0):
+	""" ones-complement sum of the 16 bit units of data, big endian or byte reversed, added
+		to total. odd data starts at an odd offset of the packet, after a span of odd length :
+		its first byte is the low half of a unit. an odd last byte is padded with zero """
+	if odd:
+		data = '\0' + data
+	if len(data) & 1:
+		data += '\0'
+	if reverse:
+		units = frombuffer(data,'<u2')
+	else:
+		units = frombuffer(data,'>u2')
+	return fold(total + int(units.sum(dtype=uint64)))
+
+def checksum (total):
+	""" final checksum of a partial sum """
+	return ~fold(total) & 0xFFFF
@@ -0,0 +1,58 @@
+#!/usr/bin/env python
+
+# size field of CNTUP : 2 and 4 byte counters
+CNTR_SIZE_BYTES = (2,4)
+# operation field : increment, decrement
+CNTR_INCREMENT = 0
+CNTR_DECREMENT = 1
+# mode field : freeze at 0 and at the maximum, or wrap around
+CNTR_FREEZE = 0
+CNTR_WRAP = 1
+
+def counter_field (address,size):
+	""" (word, shift, maximum) of the counter at byte address : counters are big endian,
+		a 2 byte counter at the start of a word is its high half """
+	bits = CNTR_SIZE_BYTES[size] * 8
+	if bits == 32:
+		return (address >> 2,0,0xFFFFFFFF)
+	return (address >> 2,( 2 - ( address & 2 ) ) * 8,( 1 << bits ) - 1)
+
+def fold (updates):
+	""" updates as (address, size, delta, mode), in order -> counter field : [deltas, modes] """
+	counters = {}
+	order = []
+	for (address,size,delta,mode) in updates:
+		field = counter_field(address,size)
+		if field not in counters:
+			counters[field] = ([],[])
+			order.append(field)
+		counters[field][0].append(delta)
+		counters[field][1].append(mode)
+	return [ (field,counters[field][0],counters[field][1]) for field in order ]
+
+def new_value (value,maximum,deltas,modes):
+	""" value after the deltas : one addition when they are all wrapping, or all freezing in
+		the same direction ; a freeze on the way can only change the result otherwise """
+	if CNTR_FREEZE not in modes:
+		return ( value + sum(deltas) ) & maximum
+	if CNTR_WRAP not in modes and ( min(deltas) >= 0 or max(deltas) <= 0 ):
+		return min(maximum,max(0,value + sum(deltas)))
+	for (delta,mode) in zip(deltas,modes):
+		value += delta
+		if mode == CNTR_WRAP:
+			value &= maximum
+		else:
+			value = min(maximum,max(0,value))
+	return value
+
+def apply (segment,updates):
+	""" apply the updates that complete together to the counters in segment, each counter
+		read and written once ; returns the words written """
+	words = []
+	for ((word,shift,maximum),deltas,modes) in fold(updates):
+		old = int(segment[word])
+		value = new_value(( old >> shift ) & maximum,maximum,deltas,modes)
+		segment[word] = ( old & ~( maximum << shift ) & 0xFFFFFFFF ) | ( value << shift )
+		if word not in words:
+			words.append(word)
+	return words
@@ -0,0 +1,132 @@
+#!/usr/bin/env python
+import struct
+import zlib
+import binascii
+
+# lookup tables per (order, polynom, reflected) : a CRC type is set up once per run
+TABLES = {}
+# slicing by 8 : T[k][b] is the CRC of byte b followed by k zero bytes
+SLICES = 8
+
+def reflect (value,width):
+	""" value with its low width bits in reverse order """
+	result = 0
+	for i in range(width):
+		if value & ( 1 << i ):
+			result |= 1 << ( width - 1 - i )
+	return result
+
+def byte_table (order,polynom,reflected):
+	""" CRC of every byte value. reflected registers hold the CRC in their low order bits,
+		shifted right ; the others hold it in the high order bits of 32, shifted left """
+	table = []
+	if reflected:
+		poly = reflect(polynom,order)
+		for b in range(256):
+			crc = b
+			for i in range(8):
+				if crc & 1:
+					crc = ( crc >> 1 ) ^ poly
+				else:
+					crc >>= 1
+			table.append(crc)
+	else:
+		poly = ( polynom << ( 32 - order ) ) & 0xFFFFFFFF
+		for b in range(256):
+			crc = b << 24
+			for i in range(8):
+				if crc & 0x80000000:
+					crc = ( ( crc << 1 ) ^ poly ) & 0xFFFFFFFF
+				else:
+					crc = ( crc << 1 ) & 0xFFFFFFFF
+			table.append(crc)
+	return table
+
+def crc_tables (order,polynom,reflected):
+	""" the SLICES tables of a CRC type, built on first use """
+	key = (order,polynom,reflected)
+	if key not in TABLES:
+		tables = [ byte_table(order,polynom,reflected) ]
+		first = tables[0]
+		for k in range(1,SLICES):
+			previous = tables[-1]
+			if reflected:
+				tables.append([ ( c >> 8 ) ^ first[c & 0xff] for c in previous ])
+			else:
+				tables.append([ ( ( c << 8 ) & 0xFFFFFFFF ) ^ first[c >> 24] for c in previous ])
+		TABLES[key] = tables
+	return TABLES[key]
+
+class crc_engine:
+	""" CRC of a byte string for one CRC configuration : order, polynom, init and xor values
+		and reflect in / out, as in runner.CRC. the register is always passed in and returned
+		in its normal (unreflected) bit order, so partial results chain """
+
+	def __init__ (self,order,polynom,crc_init,crc_xor,reflect_in,reflect_out):
+		self.order = order
+		self.polynom = polynom
+		self.crc_init = crc_init
+		self.crc_xor = crc_xor
+		self.reflect_in = reflect_in
+		self.reflect_out = reflect_out
+		self.mask = ( 1 << order ) - 1
+		self.fast = 0
+		if order == 32 and polynom == 0x04C11DB7 and reflect_in:
+			self.fast = self.zlib_update
+		elif order == 16 and polynom == 0x1021 and not reflect_in:
+			self.fast = self.hqx_update
+		else:
+			self.tables = crc_tables(order,polynom,reflect_in)
+
+	def zlib_update (self,data,register):
+		# zlib keeps the register reflected and complemented on both ends
+		value = zlib.crc32(data,reflect(register,32) ^ 0xFFFFFFFF) & 0xFFFFFFFF
+		return reflect(value ^ 0xFFFFFFFF,32)
+
+	def hqx_update (self,data,register):
+		return binascii.crc_hqx(data,register)
+
+	def reflected_update (self,data,crc):
+		(t0,t1,t2,t3,t4,t5,t6,t7) = self.tables
+		end = len(data) - len(data) % 8
+		words = struct.unpack('<%dI' % (end // 4),data[:end])
+		for i in range(0,len(words),2):
+			crc ^= words[i]
+			high = words[i + 1]
+			crc = t7[crc & 0xff] ^ t6[( crc >> 8 ) & 0xff] ^ t5[( crc >> 16 ) & 0xff] ^ t4[crc >> 24] ^ \
+				t3[high & 0xff] ^ t2[( high >> 8 ) & 0xff] ^ t1[( high >> 16 ) & 0xff] ^ t0[high >> 24]
+		for c in data[end:]:
+			crc = t0[( crc ^ ord(c) ) & 0xff] ^ ( crc >> 8 )
+		return crc
+
+	def normal_update (self,data,crc):
+		(t0,t1,t2,t3,t4,t5,t6,t7) = self.tables
+		end = len(data) - len(data) % 8
+		words = struct.unpack('>%dI' % (end // 4),data[:end])
+		for i in range(0,len(words),2):
+			crc ^= words[i]
+			low = words[i + 1]
+			crc = t7[crc >> 24] ^ t6[( crc >> 16 ) & 0xff] ^ t5[( crc >> 8 ) & 0xff] ^ t4[crc & 0xff] ^ \
+				t3[low >> 24] ^ t2[( low >> 16 ) & 0xff] ^ t1[( low >> 8 ) & 0xff] ^ t0[low & 0xff]
+		for c in data[end:]:
+			crc = t0[( crc >> 24 ) ^ ord(c)] ^ ( ( crc << 8 ) & 0xFFFFFFFF )
+		return crc
+
+	def update (self,data,register):
+		""" register after data, starting from register """
+		register &= self.mask
+		if self.fast:
+			return self.fast(data,register)
+		if self.reflect_in:
+			return reflect(self.reflected_update(data,reflect(register,self.order)),self.order)
+		return self.normal_update(data,register << ( 32 - self.order )) >> ( 32 - self.order )
+
+	def finish (self,register):
+		""" the CRC value of a final register """
+		if self.reflect_out:
+			register = reflect(register,self.order)
+		return ( register ^ self.crc_xor ) & self.mask
+
+	def compute (self,data):
+		""" CRC of data on its own """
+		return self.finish(self.update(data,self.crc_init))
@@ -0,0 +1,95 @@
+#!/usr/bin/env python
+import struct
+import hashlib
+import hmac
+from numpy import frombuffer,uint8
+
+# hash of auth, keyed (HMAC) when the engine has an auth key
+AUTH_DIGEST = 'sha1'
+
+class xor_cipher:
+	""" stand-in for the cipher : the data xored with a key stream of SHA-256 blocks of the key
+		and a block counter. the stream runs on across chunks, and a second pass decrypts """
+
+	def __init__ (self,key):
+		self.key = key
+		self.block = 0
+		self.stream = ''
+
+	def update (self,data):
+		if len(self.stream) < len(data):
+			blocks = [ self.stream ]
+			for i in range(( len(data) - len(self.stream) + 31 ) // 32):
+				blocks.append(hashlib.sha256(self.key + struct.pack('>Q',self.block)).digest())
+				self.block += 1
+			self.stream = ''.join(blocks)
+		stream = self.stream[:len(data)]
+		self.stream = self.stream[len(data):]
+		return ( frombuffer(data,uint8) ^ frombuffer(stream,uint8) ).tostring()
+
+class crypto_engine:
+	""" the per thread contexts of the crypt / auth accelerator. a packet is streamed through
+		them chunk by chunk, first to last, so every byte is processed once. cipher can be
+		any class built from a key whose update() returns the data it is given, transformed """
+	cipher = xor_cipher
+	cipher_key = ''
+	auth_key = ''
+	digest = AUTH_DIGEST
+
+	def __init__ (self):
+		self.contexts = {}
+		# (key the context was opened with, chunks streamed through it) of every open context
+		self.streamed = {}
+
+	def auth_context (self,secret=None):
+		if secret is None:
+			secret = self.auth_key
+		if secret:
+			return hmac.new(secret,digestmod=getattr(hashlib,self.digest))
+		return hashlib.new(self.digest)
+
+	def open_context (self,hash,secret):
+		if hash:
+			return self.auth_context(secret)
+		return self.cipher(secret)
+
+	def chunk (self,thread,hash,data,first,last):
+		""" one chunk of a packet of thread : the data encrypted in place for crypt, and for
+			auth nothing until the last chunk, then the digest of the packet """
+		key = (thread,hash)
+		if first or key not in self.contexts:
+			if hash:
+				secret = self.auth_key
+			else:
+				secret = self.cipher_key
+			self.contexts[key] = self.open_context(hash,secret)
+			self.streamed[key] = (secret,[])
+		context = self.contexts[key]
+		if last:
+			del self.contexts[key]
+			del self.streamed[key]
+		else:
+			self.streamed[key][1].append(data)
+		if not hash:
+			return context.update(data)
+		context.update(data)
+		if last:
+			return context.digest()
+		return ''
+
+	def state (self):
+		""" (thread, hash, key, data streamed so far) of every open context """
+		return [ (thread,hash,secret,''.join(chunks)) for ((thread,hash),(secret,chunks)) in sorted(self.streamed.items()) ]
+
+	def restore (self,state):
+		""" reopen the contexts of state : their data is streamed through them again """
+		self.clear()
+		for (thread,hash,secret,data) in state:
+			key = (thread,hash)
+			self.contexts[key] = self.open_context(hash,secret)
+			self.contexts[key].update(data)
+			self.streamed[key] = (secret,[data])
+
+	def clear (self):
+		self.contexts = {}
+		self.streamed = {}
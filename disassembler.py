@@ -0,0 +1,566 @@
+#!/usr/bin/env python
+import opcodes
+
+def disassembly_jmp (opcode,op):
+	jc = opcode['call']
+	if jc == 1 :
+		buff = 'call'
+	else:
+		buff = 'jmp'
+	condition = opcode['condition']
+	invert = opcode['invert_condition']
+	set_clr = opcode['jmp_register']
+	if condition == opcodes.OPCODE_CONDITION_EQUAL:
+		if invert:
+			buff += '!=0\t'
+		else:
+			buff += '=0\t'
+	elif condition == opcodes.OPCODE_CONDITION_LESS:
+		if invert :
+			buff += '<0\t'
+		else:
+			buff += '>=0\t'
+	elif condition == opcodes.OPCODE_CONDITION_GREATER:
+		if invert :
+			buff += '>0\t'
+		else:
+			buff += '<=0\t'
+	elif  set_clr:
+		if invert :
+			buff += '_clr\t'
+		else:
+			buff += '_set\t'
+	else:
+		buff += '\t'
+	immediate = opcode['immediate_or_register']
+	if immediate :
+		buff += '0x%x\t' % (opcode['immediate_value'])
+	else:
+		buff += 'r%d\t' % (opcode['address_register'])
+	delay_slot = opcode['execute_delay_slot']
+	if set_clr:
+		buff += 'r%d\td.%d\t' % (condition,opcode['condition_bit_offset'])
+	if set_clr or condition != opcodes.OPCODE_CONDITION_ALWAYS :
+		if  delay_slot == 1:
+			buff += 'ds1\t'
+		elif delay_slot == 2:
+			buff += 'ds2\t'
+		if not immediate and opcode['update']:
+			buff += 'predict'
+	return buff
+
+def disassembly_jmpz (opcode,op):
+	if opcode['call']:
+		buff = 'call'
+	else:
+		buff = 'jmp'
+	if opcode['invert_condition']:
+		buff += 'nz\t'
+	else:
+		buff += 'z\t'
+	immediate = opcode['immediate_or_register']
+	if immediate :
+		buff += '0x%x\t' % (opcode['immediate_value'])
+	else:
+		buff += 'r%d\t' % (opcode['address_register'])
+	buff += 'r%d\t' % (opcode['source_a'])
+	delay_slot = opcode['execute_delay_slot']
+	if delay_slot == 1:
+		buff += 'ds1\t'
+	elif delay_slot == 2:
+		buff += 'ds2\t'
+	if not immediate and opcode['update']:
+		buff += 'predict'
+	size = opcode['size']
+	if size == opcodes.OPCODE_16MSB:
+		buff += '16msb'
+	elif size == opcodes.OPCODE_16LSB:
+		buff += '16lsb'
+	return buff
+
+def disassembly_jmp_cmp (opcode,op):
+	buff = 'jmp_cmp\t'
+	immediate = opcode['immediate_or_register']
+	if  immediate :
+		buff += '0x%x\t' % (opcode['immediate_value'])
+	else:
+		buff += 'r%d\t' % (opcode['address_register'])
+	buff += 'r%d\t' % (opcode['source_a'])
+	condition = opcode['operation']
+	invert = opcode['invert_condition']
+	if condition == opcodes.OPCODE_OPERATION_EQUAL:
+		if invert :
+			buff += '!=\t'
+		else:
+			buff += '==\t'
+	elif condition == opcodes.OPCODE_OPERATION_GREATER:
+		if invert :
+			buff += '<=\t'
+		else:
+			buff += '>\t'
+	elif condition == opcodes.OPCODE_OPERATION_BIT_OR:
+		if invert :
+			buff += '!or\t'
+		else:
+			buff += 'or\t'
+	elif condition == opcodes.OPCODE_OPERATION_BIT_AND:
+		if invert :
+			buff += '!and\t'
+		else:
+			buff += 'and\t'
+	if opcode['bsel'] :
+		buff += '0x%x\t' % (opcode['source_b'])
+	else:
+		buff += 'r%d\t' % (opcode['source_b'])
+	if not immediate and opcode['update']:
+		buff += 'predict'
+	return buff
+
+def disassembly_ljmp (opcode,op):
+	if opcode['call'] == 1:
+		buff = 'lcall\t'
+	else:
+		buff = 'ljmp\t'
+	buff += '0x%x' % (opcode['immediate_value'])
+	return buff
+
+def disassembly_dma_flags (opcode):
+	buff = ''
+	if opcode['invoke']:
+		buff += 'invoke\t'
+	if opcode['mask']:
+		buff += 'mask\t'
+	if opcode['mem']:
+		buff += 'mem\t'
+	if opcode['update_r16']:
+		buff += 'update\t'
+	if opcode['common_or_private']:
+		buff += 'common\t'
+	if opcode['addr_calc']:
+		buff += 'addr_calc\t'
+	if opcode['context_swap']:
+		buff += 'ctx_swap\t'
+	if opcode['async_enable']:
+		buff += 'async_en\t'
+	return buff
+
+def disassembly_dmard (opcode,op):
+	buff = 'dma_rd\t'
+	buff += 'r%d\tr%d\t' % (opcode['source_a'],opcode['source_a'])
+	if opcode['immediate_or_register']:
+		buff += '0x%x\t' % (opcode['source_b_or_immediate'])
+	else:
+		buff += 'r%d\t' % (opcode['source_b_or_immediate'])
+	return buff + disassembly_dma_flags(opcode)
+
+def disassembly_dmawr (opcode,op):
+	buff = 'dma_wr\t'
+	buff += 'r%d\tr%d\t' % (opcode['source_a'],opcode['source_a'])
+	if opcode['immediate_or_register']:
+		buff += '0x%x\t' % (opcode['source_b_or_immediate'])
+	else:
+		buff += 'r%d\t' % (opcode['source_b_or_immediate'])
+	return buff + disassembly_dma_flags(opcode)
+
+def disassembly_dmaalu (opcode,op):
+	buff = 'dma_lkup\t'
+	buff += 'r%d\tr%d\t' % (opcode['source_a'],opcode['source_c'])
+	if opcode['immediate_or_register']:
+		buff += '0x%x\t' % (opcode['source_b_or_immediate'])
+	else:
+		buff += 'r%d\t' % (opcode['source_b_or_immediate'])
+	buff += '0x%x\t' % (opcode['res_slot'])
+	if opcode['invoke']:
+		buff += 'invoke\t'
+	if opcode['mask']:
+		buff += 'mask\t'
+	if opcode['update_r16']:
+		buff += 'update\t'
+	if opcode['context_swap']:
+		buff += 'ctx_swap\t'
+	if opcode['async_enable']:
+		buff += 'async_en\t'
+	if opcode['common_or_private']:
+		buff += 'common\t'
+	if opcode['mem']:
+		buff += 'sram\t'
+	return buff
+
+def disassembly_alu (opcode,op):
+	buff = 'alu\t'
+	buff += 'r%d\tr%d\t' % (opcode['destination_register'],opcode['source_a'])
+	shift = opcode['byte_shift']
+	if shift == opcodes.OPCODE_BYTE_SHIFT_LEFT_1:
+		buff += '<<8'
+	elif shift == opcodes.OPCODE_BYTE_SHIFT_LEFT_2:
+		buff += '<<16'
+	elif shift == opcodes.OPCODE_BYTE_SHIFT_LEFT_3:
+		buff += '<<24'
+	elif shift == opcodes.OPCODE_BYTE_SHIFT_RIGHT_1:
+		buff += '>>8'
+	elif shift == opcodes.OPCODE_BYTE_SHIFT_RIGHT_2:
+		buff += '>>16'
+	elif shift == opcodes.OPCODE_BYTE_SHIFT_RIGHT_3:
+		buff += '>>24'
+	elif not opcode['update_flags']:
+		buff += 'bypass_flags'
+	if op == opcodes.OPCODE_CODE_ADD:
+		buff += '+'
+	elif op == opcodes.OPCODE_CODE_SUB:
+		buff += '-'
+	elif op == opcodes.OPCODE_CODE_MULT:
+		buff += '*'
+	elif op == opcodes.OPCODE_CODE_AND:
+		buff += 'and'
+	elif op == opcodes.OPCODE_CODE_OR:
+		buff += 'or'
+	else:
+		buff += 'xor'
+	if opcode['invert_source']:
+		buff += '~'
+	buff +='\t'
+	if opcode['immediate_or_register'] :
+		buff += 'd.%d\t' % (opcode['source_b_or_immediate'])
+	else:
+		buff += 'r%d\t' % (opcode['source_b_or_immediate'])
+	return buff
+
+def disassembly_ret (opcode,op):
+	return 'ret'
+
+def disassembly_ld (opcode,op):
+	if op == opcodes.OPCODE_CODE_LD:
+		buff = 'ld'
+	elif op == opcodes.OPCODE_CODE_ST:
+		buff = 'st'
+	elif op == opcodes.OPCODE_CODE_LDC:
+		buff = 'ldc'
+	else:
+		buff = 'stc'
+	size = opcode['size']
+	if size == opcodes.OPCODE_SIZE_16:
+		buff += '16\t'
+	elif size == opcodes.OPCODE_SIZE_32:
+		buff += '32\t'
+	elif size == opcodes.OPCODE_SIZE_64:
+		buff += '64\t'
+	else:
+		buff += '8\t'
+	buff += 'r%d\t' % (opcode['destination_register'])
+	direct = opcode['direct_or_index']
+	if direct:
+		immed = opcode['base_address']
+		buff += 'r%d\t' % (immed)
+		if immed:
+			buff += '0x%x\t' % (opcode['offset'])
+		elif opcode['high_or_low']:
+			buff += 'high'
+	elif opcode['immediate_or_register']:
+		buff += '0x%x\t' % (opcode['immediate'])
+	else:
+		buff += 'r%d\t' % (opcode['base_address'])
+	return buff
+
+def disassembly_io (opcode,op):
+	if op == opcodes.OPCODE_CODE_LDIO:
+		buff = 'ldio\t'
+	else:
+		buff = 'stio\t'
+	size = opcode['size']
+	if size == opcodes.OPCODE_SIZE_16:
+		buff += '16\t'
+	elif size == opcodes.OPCODE_SIZE_32:
+		buff += '32\t'
+	else:
+		buff += '8\t'
+	if op == opcodes.OPCODE_CODE_LDIO:
+		buff += 'r%d\t' % (opcode['destination_register'])
+	else:
+		buff += 'r%d\t' % (opcode['source_address'])
+	if opcode['immediate_or_register']:
+		buff += '0x%x\t' % (opcode['immediate'])
+	else:
+		buff += 'r%d\t' % (opcode['address'])
+		if opcode['high_or_low']:
+			buff += 'high'
+	return buff
+
+def disassembly_mov (opcode,op):
+	buff = 'mov\t'
+	dst = opcode['destination_register']
+	buff += 'r%d\t' % (dst)
+	buff += '0x%x\t' % (dst)
+	if opcode['high_or_low']:
+		buff += '<<16\t'
+	if opcode['clear']:
+		buff += 'clear'
+	return buff
+
+def disassembly_shift (opcode,op):
+	buff = 'shift\t'
+	buff += 'r%d\t' % (opcode['destination_register'])
+	mode = opcode['mode']
+	if mode == opcodes.OPCODE_SHIFT_MODE_ASR:
+		buff += 'asr\t'
+	elif mode == opcodes.OPCODE_SHIFT_MODE_ASL:
+		buff += 'asl\t'
+	elif mode == opcodes.OPCODE_SHIFT_MODE_RSR:
+		buff += 'rsr\t'
+	else:
+		buff += 'rsr16\t'
+	buff += 'r%d\t' % (opcode['source_a'])
+	if opcode['immediate_or_register']:
+		buff += 'd.%d\t' % (opcode['source_b_or_immediate'])
+	else:
+		buff += 'r%d\t' % (opcode['source_b_or_immediate'])
+	if opcode['update_flags']:
+		buff += 'update_flags'
+	return buff
+
+def disassembly_extract (opcode,op):
+	buff = 'extract\t'
+	buff += 'r%d\tr%d\t' % (opcode['destination_register'],opcode['source_a'])
+	buff += 'd.%d\td.%d\t' % (opcode['offset'],opcode['width'])
+	return buff
+
+def disassembly_insert (opcode,op):
+	buff = 'insert\t'
+	buff += 'r%d\tr%d\t' % (opcode['destination_register'],opcode['source_a'])
+	buff += 'd.%d\td.%d\t' % (opcode['offset'],opcode['width'])
+	return buff
+
+def disassembly_ctxswap (opcode,op):
+	buff = 'ctx_swap\t'
+	if opcode['update_r16']:
+		buff += '0x%x\t' % (opcode['immediate_value'])
+	if not opcode['save']:
+		buff += 'dont_save'
+	elif opcode['async_en']:
+		buff += 'async_en'
+	return buff
+
+def disassembly_hash (opcode,op):
+	buff = 'hash\t'
+	buff += 'r%d\tr%d\t' % (opcode['source_c'],opcode['source_a'])
+	if not opcode['ks']:
+		buff += '48bit\t'
+	else:
+		buff += '60bit\t'
+	if opcode['sa']:
+		buff += 'src\t'
+	else:
+		buff += 'dst\t'
+	buff += 'd.%d\td.%d\t' % (opcode['res_slot'],opcode['table'])
+	if opcode['invoke']:
+		buff += 'invoke\t'
+	if opcode['rq']:
+		buff += 'refresh\t'
+	if opcode['cs']:
+		buff += 'ctx_swap\t'
+	if opcode['update_r16']:
+		buff += 'update'
+	return buff
+
+def disassembly_ramman (opcode,op):
+	common = opcode['common_or_private']
+	if opcode['type'] == 0:
+		buff = 'crc32\t'
+		buff += 'r%d\t' % (opcode['source_a'])
+		if opcode['immediate_or_register']:
+			buff += '0x%x\tr%d\t' % (opcode['source_b_or_immediate'],opcode['source_c'])
+		else:
+			buff += 'r%d\tr%d\t' % (opcode['source_b_or_immediate'],opcode['source_c'])
+		if opcode['eth']:
+			buff += 'eth\t'
+		if opcode['last']:
+			buff += 'last\t'
+		if common:
+			buff += 'common'
+	else:
+		buff = 'cam_lkp\t'
+		buff += 'r%d\tr%d\t' % (opcode['source_a'],opcode['source_c'])
+		key_size = opcode['key_size']
+		if key_size == 0:
+			buff += '16bit\t'
+		elif key_size == 1:
+			buff += '32bit\t'
+		elif key_size == 2:
+			buff += '64bit\t'
+		else:
+			buff += '128bit\t'
+		buff += 'd.%d\t' % (opcode['res_slot'])
+		if opcode['invoke']:
+			buff += 'invoke\t'
+		if opcode['mask']:
+			buff += 'mask\t'
+		if common:
+			buff += 'common'
+	return buff
+
+def disassembly_bbtx (opcode,op):
+	buff = 'bbtx\t'
+	if opcode['immediate_or_register']:
+		buff += 'r%d\tr%d\t0x%x\t' % (opcode['source_c'],opcode['source_a'],opcode['source_b_or_immediate'])
+	else:
+		buff += 'r%d\tr%d\tr%d\t' % (opcode['source_c'],opcode['source_a'],opcode['source_b_or_immediate'])
+	if opcode['last']:
+		buff += 'last\t'
+	if opcode['inc']:
+		buff += 'incremental\t'
+	if opcode['wait']:
+		buff += 'wait\t'
+	if opcode['common_or_private']:
+		buff += 'common'
+	return buff
+
+def disassembly_bbmsg (opcode,op):
+	buff = 'bbmsg\t'
+	if opcode['immediate_or_register']:
+		buff += 'd.%d\tr%d\t0x%x\t' % (opcode['type'],opcode['source_a'],opcode['source_b_or_immediate'])
+	else:
+		buff += 'd.%d\tr%d\tr%d\t' % (opcode['type'],opcode['source_a'],opcode['source_b_or_immediate'])
+	if opcode['size'] :
+		buff += '64bit\t'
+	if opcode['wait']:
+		buff += 'wait'
+	return buff
+
+def disassembly_ffi (opcode,op):
+	buff = 'ffi'
+	if opcode['size'] == opcodes.OPCODE_FFI8:
+		buff += '8\t'
+	else:
+		buff += '16\t'
+	if opcode['immediate_or_register'] == 1:
+		buff += 'r%d\tr%d\t0x%x' % (opcode['destination_register'],opcode['source_a'],opcode['source_b_or_immediate'])
+	else:
+		buff += 'r%d\tr%d\tr%d' % (opcode['destination_register'],opcode['source_a'],opcode['source_b_or_immediate'])
+	return buff
+
+def disassembly_chksm (opcode,op):
+	buff = 'chksm\t'
+	buff += 'r%d\tr%d\tr%d\t' % (opcode['destination_register'],opcode['source_b'],opcode['source_a'])
+	if opcode['high_or_low']:
+		buff += 'high\t'
+	if opcode['last']:
+		buff += 'last'
+	return buff
+
+def disassembly_counter (opcode,op):
+	buff = 'counter\t'
+	if not opcode['operation']:
+		buff += 'increment\t'
+	else:
+		buff += 'decrement\t'
+	if opcode['imm_or_reg_a']:
+		buff += '0x%x\t' % (opcode['source_a'])
+	else:
+		buff += 'r%d\t' % (opcode['source_a'])
+	if opcode['imm_or_reg_b']:
+		buff += '0x%x\t' % (opcode['source_b'])
+	else:
+		buff += 'r%d\t' % (opcode['source_b'])
+	if not opcode['size']:
+		buff += '2bytes\t'
+	else:
+		buff += '4bytes\t'
+	if not opcode['mode']:
+		buff += 'freeze'
+	else:
+		buff += 'wrap'
+	return buff
+
+def disassembly_crypt (opcode,op):
+	if not opcode['hash']:
+		buff = 'crypt\t'
+	else:
+		buff = 'auth\t'
+	if opcode['immediate_or_register']:
+		buff += 'r%d\t0x%x\t' % (opcode['source_a'],opcode['source_b'])
+	else:
+		buff += 'r%d\tr%d\t' % (opcode['source_a'],opcode['source_b'])
+	first = opcode['first']
+	last = opcode['last']
+	if first:
+		if last:
+			buff += 'single\t'
+		else:
+			buff += 'first\t'
+	elif last:
+		buff += 'last\t'
+	else:
+		buff += 'middle\t'
+	if opcode['invoke']:
+		buff += 'invoke'
+	return buff
+
+def disassembly_signext (opcode,op):
+	buff = 'signext\t'
+	buff += 'r%d\tr%d\t' % (opcode['destination_register'],opcode['source_a'])
+	srcb = opcode['source_b_or_immediate']
+	if opcode['immediate_or_register']:
+		if srcb == 0:
+			buff += '8bit'
+		else:
+			buff += '16bit'
+	else:
+		buff += 'r%d' % (srcb)
+	return buff
+
+def disassembly_nop (opcode,op):
+	return 'nop'
+
+disassemblers = {
+	opcodes.OPCODE_CODE_JMP:disassembly_jmp,
+	opcodes.OPCODE_CODE_DMARD:disassembly_dmard,
+	opcodes.OPCODE_CODE_DMAWR:disassembly_dmawr,
+	opcodes.OPCODE_CODE_DMALU:disassembly_dmaalu,
+	opcodes.OPCODE_CODE_LJMP:disassembly_ljmp,
+	opcodes.OPCODE_CODE_BEZ:disassembly_jmpz,
+	opcodes.OPCODE_CODE_CMPJMP:disassembly_jmp_cmp,
+	opcodes.OPCODE_CODE_ADD:disassembly_alu,
+	opcodes.OPCODE_CODE_SUB:disassembly_alu,
+	opcodes.OPCODE_CODE_AND:disassembly_alu,
+	opcodes.OPCODE_CODE_OR:disassembly_alu,
+	opcodes.OPCODE_CODE_XOR:disassembly_alu,
+	opcodes.OPCODE_CODE_MULT:disassembly_alu,
+	opcodes.OPCODE_CODE_RET:disassembly_ret,
+	opcodes.OPCODE_CODE_LD:disassembly_ld,
+	opcodes.OPCODE_CODE_ST:disassembly_ld,
+	opcodes.OPCODE_CODE_LDC:disassembly_ld,
+	opcodes.OPCODE_CODE_STC:disassembly_ld,
+	opcodes.OPCODE_CODE_LDIO:disassembly_io,
+	opcodes.OPCODE_CODE_STIO:disassembly_io,
+	opcodes.OPCODE_CODE_MOVEIMM:disassembly_mov,
+	opcodes.OPCODE_CODE_SHIFT:disassembly_shift,
+	opcodes.OPCODE_CODE_EXTRACT:disassembly_extract,
+	opcodes.OPCODE_CODE_INSERT:disassembly_insert,
+	opcodes.OPCODE_CODE_CSSVR:disassembly_ctxswap,
+	opcodes.OPCODE_CODE_HASH:disassembly_hash,
+	opcodes.OPCODE_CODE_CRCCALC:disassembly_ramman,
+	opcodes.OPCODE_CODE_BBTX:disassembly_bbtx,
+	opcodes.OPCODE_CODE_BBMSG:disassembly_bbmsg,
+	opcodes.OPCODE_CODE_FFI:disassembly_ffi,
+	opcodes.OPCODE_CODE_ICHECK:disassembly_chksm,
+	opcodes.OPCODE_CODE_CNTUP:disassembly_counter,
+	opcodes.OPCODE_CODE_CRYPT:disassembly_crypt,
+	opcodes.OPCODE_CODE_SIGNEXT:disassembly_signext,
+	opcodes.OPCODE_CODE_NOP:disassembly_nop
+	}
+
+texts = {}
+
+def disassemble (word):
+	""" disassembly text of one code word, '' if it is not a valid opcode ;
+		built on first request and kept per word """
+	word = int(word)
+	if word in texts:
+		return texts[word]
+	op = ( word >> opcodes.OP_SHIFT ) & opcodes.OP_MASK
+	code = opcodes.opcodeCodes[op]
+	if code is None:
+		text = ''
+	else:
+		text = disassemblers[code](opcodes.opcodeDecoders[code](word),op)
+	texts[word] = text
+	return text
@@ -0,0 +1,18 @@
+#!/usr/bin/env python
+import os
+from numpy import memmap
+
+# images hold big-endian 32 bit words
+WORD_FORMAT = '>u4'
+
+def load_segment (name,offset,size):
+	""" words of image file name from byte offset, size bytes of them, mapped copy-on-write :
+		nothing is read or byteswapped up front, pages are shared with every other run
+		of the same image until a word in them is written """
+	fobj = open(name,'rb')
+	try:
+		if os.fstat(fobj.fileno()).st_size < offset + size:
+			raise IOError('%s is too short for %d bytes at offset %d' % (name,size,offset))
+		return memmap(fobj,WORD_FORMAT,'c',offset,(size // 4,))
+	finally:
+		fobj.close()
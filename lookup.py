@@ -0,0 +1,242 @@
+#!/usr/bin/env python
+import struct
+import binascii
+from numpy import asarray,uint64,nonzero
+import cam
+
+# table_N type : where the table lives
+HASH_TABLE_COMMON = 0
+HASH_TABLE_DDR = 1
+# an entry is two words : flags and the key bits above 32, then the low 32 key bits
+HASH_ENTRY_WORDS = 2
+HASH_ENTRY_VALID = 0x80000000
+HASH_ENTRY_REFRESH = 0x40000000
+HASH_ENTRY_KEY_HIGH = 0x0FFFFFFF
+# ks field of HASH : 48 and 60 bit keys
+HASH_KEY_BITS = (48,60)
+# result word : hit, found in the table's CAM, context address of the entry
+HASH_RESULT_HIT = 0x80000000
+HASH_RESULT_CAM = 0x40000000
+HASH_RESULT_CONTEXT = 0x0000FFFF
+# the CAM behind a table holds 64 bit keys
+HASH_CAM_KEY_SIZE = 2
+
+def number (text):
+	if text == 'en':
+		return 1
+	if text == 'dis':
+		return 0
+	return int(text,0)
+
+class table_config:
+	""" table_N, key_N and context_N lines of one table """
+	base_address = 0
+	size = 0
+	depth = 0
+	type = HASH_TABLE_COMMON
+	cam_base_address = 0
+	offsets = (0,0)
+	shifts = (0,0)
+	aging = 0
+	key_type = 'dst'
+	# dst and src key masks
+	masks = ((1 << 64) - 1,(1 << 64) - 1)
+	context_address = 0
+	context_size = 0
+	cam_context_address = 0
+	cam_context_size = 0
+
+class lookup_config:
+	""" the lookup tables of runner.cfg :
+
+		// Lut table config: base_address size depth type cam_base_address
+		table_0                         0x0    64   64   1   0x200
+		// Key config: offset0 offset1 shift0  shift1 aging type mask0_msb mask0_lsb mask1_msb mask1_lsb
+		key_0                           2  3  0  8  dis  dst  0xffff  0x0  0x0  0xffffffff
+		// Context config: hash_context_address entry_size cam_context_address entry_size
+		context_0                       0x280  4    0x300  4
+		// Global mask config: global_mask_msb global_mask_lsb
+		global_mask_0                   0xffff    0xffffffff
+
+		size is in entries, depth is how many entries from the hashed one are searched.
+		the other lines of the file are for the runner handler and are skipped """
+
+	def __init__ (self):
+		self.tables = {}
+		self.global_masks = {}
+
+	def table (self,index):
+		if index not in self.tables:
+			self.tables[index] = table_config()
+		return self.tables[index]
+
+	def read (self,name):
+		fobj = open(name,'r')
+		for line in fobj:
+			args = line.split('//')[0].split()
+			if len(args) < 2 or '_' not in args[0]:
+				continue
+			(kind,index) = args[0].rsplit('_',1)
+			if not index.isdigit():
+				continue
+			index = int(index)
+			try:
+				if kind == 'table' and len(args) > 5:
+					t = self.table(index)
+					(t.base_address,t.size,t.depth,t.type,t.cam_base_address) = [ number(a) for a in args[1:6] ]
+				elif kind == 'key' and len(args) > 10:
+					t = self.table(index)
+					t.offsets = (number(args[1]),number(args[2]))
+					t.shifts = (number(args[3]),number(args[4]))
+					t.aging = number(args[5])
+					t.key_type = args[6]
+					t.masks = (( number(args[7]) << 32 ) | number(args[8]),( number(args[9]) << 32 ) | number(args[10]))
+				elif kind == 'context' and len(args) > 4:
+					t = self.table(index)
+					(t.context_address,t.context_size,t.cam_context_address,t.cam_context_size) = [ number(a) for a in args[1:5] ]
+				elif kind == 'global_mask' and len(args) > 2:
+					self.global_masks[index] = ( number(args[1]) << 32 ) | number(args[2])
+			except ValueError:
+				print "WARNING: bad lookup configuration line '%s'" % (line.strip())
+		fobj.close()
+
+def table_entries (config,segment):
+	""" entries of a table that fit in its memory """
+	return max(0,min(config.size,( len(segment) - config.base_address // 4 ) // HASH_ENTRY_WORDS))
+
+def hash_key (key,size):
+	""" entry a key hashes to : CRC-16 (0x1021, init 0xFFFF) of its 8 bytes, the flow hash (CRC_TYPE_FLOW) """
+	return binascii.crc_hqx(struct.pack('>Q',key),0xFFFF) % size
+
+class hash_index:
+	""" key -> entry indexes of the valid entries of one table ; a lookup takes the first
+		of them within depth entries of the hashed one, as a search of the table would """
+
+	def __init__ (self,config,segment):
+		self.config = config
+		self.first = config.base_address // 4
+		self.count = table_entries(config,segment)
+		self.last = self.first + self.count * HASH_ENTRY_WORDS
+		self.keys = {}
+		self.entries = [None] * self.count
+		words = asarray(segment[self.first:self.last]).astype(uint64).reshape(self.count,HASH_ENTRY_WORDS)
+		valid = nonzero(words[:,0] & HASH_ENTRY_VALID)[0]
+		keys = ( ( words[valid,0] & HASH_ENTRY_KEY_HIGH ) << 32 ) | words[valid,1]
+		for (index,key) in zip(valid.tolist(),keys.tolist()):
+			self.entries[index] = key
+			self.keys.setdefault(key,[]).append(index)
+
+	def load (self,segment,index):
+		""" (re)read entry index from segment """
+		old = self.entries[index]
+		if old is not None:
+			indexes = self.keys[old]
+			indexes.remove(index)
+			if not indexes:
+				del self.keys[old]
+		word = self.first + index * HASH_ENTRY_WORDS
+		high = int(segment[word])
+		if not high & HASH_ENTRY_VALID:
+			self.entries[index] = None
+			return
+		key = ( ( high & HASH_ENTRY_KEY_HIGH ) << 32 ) | int(segment[word + 1])
+		self.entries[index] = key
+		indexes = self.keys.setdefault(key,[])
+		indexes.append(index)
+		indexes.sort()
+
+	def lookup (self,key,start):
+		""" entry of key searched from entry start, -1 for none """
+		found = -1
+		distance = self.config.depth
+		for index in self.keys.get(key,()):
+			d = ( index - start ) % self.count
+			if d < distance:
+				(found,distance) = (index,d)
+		return found
+
+def search (config,segment,key,start):
+	""" lookup without an index : read the entries from start on """
+	first = config.base_address // 4
+	count = table_entries(config,segment)
+	for d in range(min(config.depth,count)):
+		index = ( start + d ) % count
+		word = first + index * HASH_ENTRY_WORDS
+		high = int(segment[word])
+		if high & HASH_ENTRY_VALID and ( ( ( high & HASH_ENTRY_KEY_HIGH ) << 32 ) | int(segment[word + 1]) ) == key:
+			return index
+	return -1
+
+class hash_tables:
+	""" the hash accelerator's tables : configuration, the index of every table and the CAMs
+		behind them. touch() must be called for the words written to common memory or DDR """
+
+	def __init__ (self,config=None):
+		if config is None:
+			config = lookup_config()
+		self.config = config
+		self.indexes = {}
+		self.cams = {HASH_TABLE_COMMON:cam.cam_cache(),HASH_TABLE_DDR:cam.cam_cache()}
+		self.enabled = 1
+
+	def segment (self,simulator,config):
+		if config.type == HASH_TABLE_DDR:
+			return simulator.ddr
+		return simulator.common_segment
+
+	def key (self,table,key,ks,sa):
+		""" lookup key of a HASH : the table's src or dst key mask and the global mask """
+		config = self.config.tables[table]
+		key &= config.masks[sa & 1]
+		key &= self.config.global_masks.get(ks,( 1 << 64 ) - 1)
+		return key & ( ( 1 << HASH_KEY_BITS[ks] ) - 1 )
+
+	def lookup (self,simulator,table,key,ks,sa,refresh=0):
+		""" result word of a lookup of key in table : hit, CAM hit and context address """
+		if table not in self.config.tables:
+			return 0
+		key = self.key(table,key,ks,sa)
+		config = self.config.tables[table]
+		segment = self.segment(simulator,config)
+		count = table_entries(config,segment)
+		if count == 0:
+			return 0
+		start = hash_key(key,count)
+		if self.enabled:
+			if table not in self.indexes:
+				self.indexes[table] = hash_index(config,segment)
+			index = self.indexes[table].lookup(key,start)
+		else:
+			index = search(config,segment,key,start)
+		if index != -1:
+			if refresh and config.aging:
+				word = config.base_address // 4 + index * HASH_ENTRY_WORDS
+				segment[word] = int(segment[word]) | HASH_ENTRY_REFRESH
+			address = config.context_address + index * config.context_size
+			return HASH_RESULT_HIT | ( address & HASH_RESULT_CONTEXT )
+		index = self.cams[config.type].lookup(segment,config.cam_base_address // 4,HASH_CAM_KEY_SIZE,0,key)
+		if index != -1:
+			address = config.cam_context_address + index * config.cam_context_size
+			return HASH_RESULT_HIT | HASH_RESULT_CAM | ( address & HASH_RESULT_CONTEXT )
+		return 0
+
+	def touch (self,segment,type,word):
+		if not self.indexes and not self.cams[type].tables:
+			return
+		for table in self.indexes:
+			index = self.indexes[table]
+			if index.config.type == type and index.first <= word < index.last:
+				index.load(segment,( word - index.first ) // HASH_ENTRY_WORDS)
+		self.cams[type].touch(segment,word)
+
+	def clear (self):
+		self.indexes = {}
+		for type in self.cams:
+			self.cams[type].clear()
+
+	def disable (self):
+		""" search memory on every lookup : for tables that other processes write """
+		self.clear()
+		self.enabled = 0
+		for type in self.cams:
+			self.cams[type].enabled = 0
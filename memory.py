@@ -0,0 +1,177 @@
+#!/usr/bin/env python
+import mmap
+import array
+from numpy import zeros,uint32,asarray,frombuffer
+
+# words per page
+PAGE_SIZE = 4096
+
+class paged_memory:
+	""" sparse memory of size 32 bit words, indexed like the dense array it replaces.
+		a page is allocated on the first write that is not all zero ; untouched words read as zero """
+
+	def __init__ (self,size,page_size=PAGE_SIZE):
+		self.size = size
+		self.page_size = page_size
+		self.pages = {}
+
+	def __len__ (self):
+		return self.size
+
+	def touched (self):
+		""" number of allocated pages """
+		return len(self.pages)
+
+	def range (self,index):
+		""" (address, count) of an index or a step-less slice """
+		if isinstance(index,slice):
+			(start,stop,step) = index.indices(self.size)
+			if step != 1:
+				raise IndexError('paged memory slices take no step')
+			return (start,max(0,stop - start))
+		if index < 0:
+			index += self.size
+		if index < 0 or index >= self.size:
+			raise IndexError('address %d out of memory of %d words' % (index,self.size))
+		return (index,1)
+
+	def __getitem__ (self,index):
+		(address,count) = self.range(index)
+		if isinstance(index,slice):
+			return self.read(address,count)
+		page = self.pages.get(address // self.page_size)
+		if page is None:
+			return uint32(0)
+		return page[address % self.page_size]
+
+	def __setitem__ (self,index,value):
+		(address,count) = self.range(index)
+		if isinstance(index,slice):
+			self.write(address,value,count)
+			return
+		number = address // self.page_size
+		if number not in self.pages:
+			if not value:
+				return
+			self.pages[number] = zeros(self.page_size,uint32)
+		self.pages[number][address % self.page_size] = value
+
+	def read (self,address,count):
+		""" count words from address as a new array, across page boundaries """
+		if address < 0 or address + count > self.size:
+			raise IndexError('read of %d words at %d out of memory of %d words' % (count,address,self.size))
+		values = zeros(count,uint32)
+		done = 0
+		while done < count:
+			(number,offset) = divmod(address + done,self.page_size)
+			length = min(count - done,self.page_size - offset)
+			page = self.pages.get(number)
+			if page is not None:
+				values[done:done + length] = page[offset:offset + length]
+			done += length
+		return values
+
+	def write (self,address,values,count=None):
+		""" write values from address, across page boundaries ; a scalar fills count words """
+		if count is None:
+			values = asarray(values,uint32)
+			count = len(values)
+		elif not hasattr(values,'__len__'):
+			values = zeros(count,uint32) + uint32(values)
+		else:
+			values = asarray(values,uint32)
+			if len(values) != count:
+				raise ValueError('writing %d words to a range of %d' % (len(values),count))
+		if address < 0 or address + count > self.size:
+			raise IndexError('write of %d words at %d out of memory of %d words' % (count,address,self.size))
+		done = 0
+		while done < count:
+			(number,offset) = divmod(address + done,self.page_size)
+			length = min(count - done,self.page_size - offset)
+			chunk = values[done:done + length]
+			page = self.pages.get(number)
+			if page is None and chunk.any():
+				page = self.pages[number] = zeros(self.page_size,uint32)
+			if page is not None:
+				page[offset:offset + length] = chunk
+			done += length
+
+class shared_memory (paged_memory):
+	""" dense memory of size 32 bit words in an anonymous shared mapping, for runners in
+		forked processes ; the kernel only backs the pages that are written """
+
+	def __init__ (self,size,page_size=PAGE_SIZE):
+		self.size = size
+		self.page_size = page_size
+		self.buffer = mmap.mmap(-1,size * 4)
+		self.words = frombuffer(self.buffer,uint32)
+
+	def touched (self):
+		""" number of pages holding a word that is not zero """
+		count = 0
+		for start in range(0,self.size,self.page_size):
+			if self.words[start:start + self.page_size].any():
+				count += 1
+		return count
+
+	def __getitem__ (self,index):
+		(address,count) = self.range(index)
+		if isinstance(index,slice):
+			return self.read(address,count)
+		return self.words[address]
+
+	def __setitem__ (self,index,value):
+		(address,count) = self.range(index)
+		if isinstance(index,slice):
+			self.write(address,value,count)
+			return
+		self.words[address] = value
+
+	def read (self,address,count):
+		if address < 0 or address + count > self.size:
+			raise IndexError('read of %d words at %d out of memory of %d words' % (count,address,self.size))
+		return self.words[address:address + count].copy()
+
+	def write (self,address,values,count=None):
+		if count is None:
+			count = len(values)
+		if address < 0 or address + count > self.size:
+			raise IndexError('write of %d words at %d out of memory of %d words' % (count,address,self.size))
+		self.words[address:address + count] = values
+
+	def load (self,source):
+		""" copy the allocated pages of a paged_memory """
+		for number in source.pages:
+			start = number * source.page_size
+			self.words[start:start + source.page_size] = source.pages[number]
+
+def read_bytes (words,address,length):
+	""" length bytes from byte address of a memory of big-endian 32 bit words ; fewer at its end """
+	first = address // 4
+	last = min(( address + length + 3 ) // 4,len(words))
+	if first >= last:
+		return ''
+	data = asarray(words[first:last],'>u4').tostring()
+	return data[address & 3:( address & 3 ) + length]
+
+def write_bytes (words,address,data):
+	""" write bytes from byte address of a memory of big-endian 32 bit words ;
+		returns the first and last + 1 word written """
+	first = address // 4
+	last = ( address + len(data) + 3 ) // 4
+	if last > len(words):
+		raise IndexError('write of %d bytes at 0x%x out of memory of %d words' % (len(data),address,len(words)))
+	offset = address & 3
+	if offset or len(data) % 4:
+		# the words at both ends keep the bytes around data
+		merged = bytearray(read_bytes(words,first * 4,( last - first ) * 4))
+		merged[offset:offset + len(data)] = data
+		data = str(merged)
+	values = frombuffer(data,'>u4')
+	if isinstance(words,paged_memory):
+		words.write(first,values)
+	elif isinstance(words,array.array):
+		words[first:last] = array.array(words.typecode,values.tolist())
+	else:
+		words[first:last] = values
+	return (first,last)
@@ -310,3 +310,95 @@ cryptOpcode = {'opcode':(0,6),
 retOpcode = {'opcode':(0,6)}
 																																			
 
+
+# the layout tables each opcode code is decoded with
+opcodeFormats = {
+	OPCODE_CODE_JMP : (jmpOpcode,),
+	OPCODE_CODE_LJMP : (jmplngOpcode,),
+	OPCODE_CODE_BEZ : (bezOpcode,),
+	OPCODE_CODE_CMPJMP : (cmpjmpOpcode,),
+	OPCODE_CODE_RET : (retOpcode,),
+	OPCODE_CODE_CSSVR : (ctxswapOpcode,),
+	OPCODE_CODE_LD : (ldOpcode,),
+	OPCODE_CODE_LDC : (ldOpcode,),
+	OPCODE_CODE_ST : (ldOpcode,),
+	OPCODE_CODE_STC : (ldOpcode,),
+	OPCODE_CODE_ADD : (aluOpcode,),
+	OPCODE_CODE_SUB : (aluOpcode,),
+	OPCODE_CODE_AND : (aluOpcode,),
+	OPCODE_CODE_OR : (aluOpcode,),
+	OPCODE_CODE_XOR : (aluOpcode,),
+	OPCODE_CODE_MULT : (aluOpcode,),
+	OPCODE_CODE_SHIFT : (shiftOpcode,),
+	OPCODE_CODE_SIGNEXT : (signextOpcode,),
+	OPCODE_CODE_FFI : (ffiOpcode,),
+	OPCODE_CODE_EXTRACT : (insertOpcode,),
+	OPCODE_CODE_INSERT : (insertOpcode,),
+	OPCODE_CODE_ICHECK : (icheckOpcode,),
+	OPCODE_CODE_MOVEIMM : (movOpcode,),
+	OPCODE_CODE_LDIO : (ldioOpcode,),
+	OPCODE_CODE_STIO : (ldioOpcode,),
+	OPCODE_CODE_CNTUP : (counterOpcode,),
+	OPCODE_CODE_BBTX : (bbtxOpcode,),
+	OPCODE_CODE_BBMSG : (bbmsgOpcode,),
+	OPCODE_CODE_RAMMAN : (crcOpcode,camOpcode),
+	OPCODE_CODE_HASH : (hashOpcode,),
+	OPCODE_CODE_DMALU : (dmaaluOpcode,),
+	OPCODE_CODE_DMARD : (dmaOpcode,),
+	OPCODE_CODE_DMAWR : (dmaOpcode,),
+	OPCODE_CODE_CRYPT : (cryptOpcode,),
+	OPCODE_CODE_NOP : (nopOpcode,)}
+
+def compile_field (name,start,end):
+	""" shift-and-mask extractor for bits start..end of a code word (bit 0 is the msb) """
+	if start < 0 or end > 32 or start >= end:
+		raise ValueError('opcodes: bad bit range (%d,%d) for %s' % (start,end,name))
+	return (32 - end,(1 << (end - start)) - 1)
+
+def compile_format (code,layouts):
+	""" generate the decoder of one opcode code : int word -> dict of fields """
+	ranges = {}
+	for layout in layouts:
+		for name in layout:
+			if name in ranges and ranges[name] != layout[name]:
+				raise ValueError('opcodes: field %s of opcode 0x%x has two bit ranges' % (name,code))
+			ranges[name] = layout[name]
+	if 'opcode' not in ranges or ranges['opcode'][0] != 0:
+		raise ValueError('opcodes: opcode 0x%x has no opcode field at bit 0' % (code))
+	fields = []
+	for name in sorted(ranges):
+		(shift,mask) = compile_field(name,ranges[name][0],ranges[name][1])
+		fields.append("'%s':(word >> %d) & 0x%x" % (name,shift,mask))
+	source = 'def decode_0x%02x(word):\n\treturn {%s}\n' % (code,', '.join(fields))
+	scope = {}
+	exec source in scope
+	return scope['decode_0x%02x' % (code)]
+
+# decoders are generated once, when the module is loaded
+opcodeDecoders = {}
+for code in opcodeFormats:
+	opcodeDecoders[code] = compile_format(code,opcodeFormats[code])
+
+(OP_SHIFT,OP_MASK) = compile_field('opcode',ldOpcode['opcode'][0],ldOpcode['opcode'][1])
+(OP4_SHIFT,OP4_MASK) = compile_field('opcode',dmaOpcode['opcode'][0],dmaOpcode['opcode'][1])
+(OP5_SHIFT,OP5_MASK) = compile_field('opcode',jmpOpcode['opcode'][0],jmpOpcode['opcode'][1])
+
+# the 6-bit opcode field -> opcode code it executes as. the dma opcodes are
+# selected by their 4 msb only and jmp by its 5 msb, so they own several entries
+opcodeCodes = []
+for op in range(64):
+	word = op << OP_SHIFT
+	op4 = ( word >> OP4_SHIFT ) & OP4_MASK
+	op5 = ( word >> OP5_SHIFT ) & OP5_MASK
+	if op4 == OPCODE_CODE_DMARD >> 2:
+		opcodeCodes.append(OPCODE_CODE_DMARD)
+	elif op4 == OPCODE_CODE_DMAWR >> 2:
+		opcodeCodes.append(OPCODE_CODE_DMAWR)
+	elif op4 == OPCODE_CODE_DMALU >> 2:
+		opcodeCodes.append(OPCODE_CODE_DMALU)
+	elif op5 == OPCODE_CODE_JMP:
+		opcodeCodes.append(OPCODE_CODE_JMP)
+	elif op in opcodeFormats:
+		opcodeCodes.append(op)
+	else:
+		opcodeCodes.append(None)
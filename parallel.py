@@ -0,0 +1,256 @@
+#!/usr/bin/env python
+import os
+import mmap
+import cPickle
+import traceback
+import multiprocessing
+import numpy
+import memory
+import tracing
+
+RING_SLOTS = 256
+# kind, sender, and two values
+RING_WORDS = 4
+# sender's counters_lock and counters FIFO count, read by the other runner's CNTR_LOCK
+MESSAGE_STATUS = 0
+# the receiver's counters_lock, written by its co-runner's CNTR_LOCK
+MESSAGE_LOCK = 1
+
+SEMAPHORE_FIELDS = ('enable_wakeup','status','wakeup','thread','runner','owner_thread','owner_runner')
+SEMAPHORE_FLAGS = ('enable_wakeup','status','wakeup')
+SEMAPHORE_RUNNERS = ('runner','owner_runner')
+
+def shared_array (count,dtype):
+	""" count elements in an anonymous MAP_SHARED mapping, visible to every forked process """
+	return numpy.frombuffer(mmap.mmap(-1,count * numpy.dtype(dtype).itemsize),dtype)
+
+class shared_semaphore:
+	""" simulator.semaphore whose fields live in a shared table row ; runners are kept by index """
+
+	def __init__ (self,row,runners):
+		self.__dict__['row'] = row
+		self.__dict__['runners'] = runners
+
+	def __getattr__ (self,name):
+		if name not in SEMAPHORE_FIELDS:
+			raise AttributeError(name)
+		value = int(self.row[SEMAPHORE_FIELDS.index(name)])
+		if name in SEMAPHORE_FLAGS:
+			return value != 0
+		if name in SEMAPHORE_RUNNERS:
+			if value < 0:
+				return 0
+			return self.runners[value]
+		return value
+
+	def __setattr__ (self,name,value):
+		if name not in SEMAPHORE_FIELDS:
+			raise AttributeError(name)
+		if name in SEMAPHORE_RUNNERS:
+			if value in self.runners:
+				value = self.runners.index(value)
+			else:
+				value = -1
+		self.row[SEMAPHORE_FIELDS.index(name)] = value
+
+class spsc_ring:
+	""" single producer, single consumer ring of RING_WORDS word records in shared memory ;
+		only the producer moves head and only the consumer moves tail, so no lock is taken """
+
+	def __init__ (self,slots=RING_SLOTS):
+		self.slots = slots
+		# head, tail
+		self.control = shared_array(2,numpy.int64)
+		self.records = shared_array(slots * RING_WORDS,numpy.uint64).reshape(slots,RING_WORDS)
+
+	def put (self,record):
+		""" 0 when the ring is full """
+		head = int(self.control[0])
+		if head - int(self.control[1]) >= self.slots:
+			return 0
+		self.records[head % self.slots] = record
+		self.control[0] = head + 1
+		return 1
+
+	def get (self):
+		""" the oldest record, None when the ring is empty """
+		tail = int(self.control[1])
+		if tail == int(self.control[0]):
+			return None
+		record = tuple([ int(v) for v in self.records[tail % self.slots] ])
+		self.control[1] = tail + 1
+		return record
+
+class barrier:
+	""" every runner process waits here at the end of a quantum ; a stopped runner leaves """
+
+	def __init__ (self,parties):
+		self.condition = multiprocessing.Condition()
+		self.parties = multiprocessing.RawValue('i',parties)
+		self.count = multiprocessing.RawValue('i',0)
+		self.generation = multiprocessing.RawValue('i',0)
+
+	def release (self):
+		self.count.value = 0
+		self.generation.value += 1
+		self.condition.notify_all()
+
+	def wait (self):
+		self.condition.acquire()
+		generation = self.generation.value
+		self.count.value += 1
+		if self.count.value >= self.parties.value:
+			self.release()
+		else:
+			while generation == self.generation.value:
+				self.condition.wait()
+		self.condition.release()
+
+	def leave (self):
+		self.condition.acquire()
+		self.parties.value -= 1
+		if self.count.value > 0 and self.count.value >= self.parties.value:
+			self.release()
+		self.condition.release()
+
+def share (simulator,runners):
+	""" move the state runners share into shared mappings : common segment, DDR, packet SRAM and semaphores.
+		the semaphores are only taken and released under simulator.semaphore_lock """
+	common = shared_array(len(simulator.common_segment),'>u4')
+	common[:] = simulator.common_segment
+	simulator.common_segment = common
+	# the other processes write common memory without touching this one's CAM and hash indexes
+	simulator.common_cams.clear()
+	simulator.common_cams.enabled = 0
+	simulator.hash_tables.disable()
+	for name in ('ddr','packet_sram'):
+		current = getattr(simulator,name)
+		shared = memory.shared_memory(len(current))
+		shared.load(current)
+		setattr(simulator,name,shared)
+	if simulator.semaphores:
+		# a zero length mapping cannot be made
+		table = shared_array(len(simulator.semaphores) * len(SEMAPHORE_FIELDS),numpy.int64)
+		table = table.reshape(len(simulator.semaphores),len(SEMAPHORE_FIELDS))
+		semaphores = []
+		for i in range(len(simulator.semaphores)):
+			s = shared_semaphore(table[i],runners)
+			for name in SEMAPHORE_FIELDS:
+				setattr(s,name,getattr(simulator.semaphores[i],name))
+			semaphores.append(s)
+		simulator.semaphores = semaphores
+	simulator.semaphore_lock = multiprocessing.Lock()
+
+def separate_trace (r):
+	""" a forked runner cannot share its parent's trace writer : it gets its own file """
+	if isinstance(r.trace,tracing.binary_sink):
+		r.set_trace(r.trace.reopen('.%d' % (r.id)))
+	elif isinstance(r.trace,tracing.text_sink):
+		r.fio = open('sim%d.log' % (r.id),'w')
+		r.set_trace(tracing.text_sink(r.fio))
+	elif r.fio:
+		r.fio = open('sim%d.log' % (r.id),'w')
+
+def post (rings,runners,index,receiver,message):
+	if not rings[receiver][index].put(message):
+		print "ERROR: message ring to runner %d is full" % (runners[receiver].id)
+
+def run_process (simulator,runners,index,quantum,sync,rings,left):
+	""" body of a runner process : quantum clocks, post the status when it changed and the
+		co-runner's lock, wait for the others, read theirs. nothing is posted to a runner that
+		has left : its rings are no longer read """
+	r = runners[index]
+	separate_trace(r)
+	r.co_runner_locks = []
+	posted = None
+	try:
+		while True:
+			start = simulator.clock
+			running = r.run_until(start + quantum)
+			status = (r.counters_lock,r.hw_accelerators.cntup_count)
+			if status != posted:
+				for i in range(len(runners)):
+					if i != index and not left[i]:
+						post(rings,runners,index,i,(MESSAGE_STATUS,index,status[0],status[1]))
+				posted = status
+			# the co-runner here is a copy : its own process takes the last lock written to it
+			sent = r.co_runner_locks[-1:]
+			if sent:
+				receiver = runners.index(r.co_runner)
+				if not left[receiver]:
+					post(rings,runners,index,receiver,(MESSAGE_LOCK,index,sent[0],0))
+				r.co_runner_locks = []
+			if not running:
+				break
+			sync.wait()
+			for ring in rings[index]:
+				while True:
+					message = ring.get()
+					if message is None:
+						break
+					(kind,sender,lock,count) = message
+					if kind == MESSAGE_STATUS:
+						runners[sender].counters_lock = lock
+						runners[sender].hw_accelerators.cntup_count = count
+					elif kind == MESSAGE_LOCK:
+						r.counters_lock = lock
+			if sent:
+				# the co-runner's status was posted before it took the lock
+				r.co_runner.counters_lock = sent[0]
+	finally:
+		# the others stop waiting for this runner and posting to it, even when it failed
+		left[index] = 1
+		sync.leave()
+	r.stop()
+	if isinstance(r.trace,tracing.binary_sink):
+		r.trace.close()
+	if r.fio:
+		r.fio.close()
+	return {'clock':simulator.clock,'pc':int(r.pc),'stall':int(r.stall)}
+
+def run_parallel (simulator,runners,quantum=1):
+	""" simulator.lockstep with every runner in its own forked process, synchronized every
+		quantum clocks ; returns each runner's final clock, pc and stall """
+	share(simulator,runners)
+	sync = barrier(len(runners))
+	# rings[receiver][sender] : one producer and one consumer each
+	rings = [ [ spsc_ring() for sender in runners ] for receiver in runners ]
+	# 1 once the runner's process has stopped
+	left = shared_array(len(runners),numpy.int8)
+	for r in runners:
+		if r.fio:
+			r.fio.flush()
+	children = []
+	for index in range(len(runners)):
+		(rfd,wfd) = os.pipe()
+		pid = os.fork()
+		if pid == 0:
+			os.close(rfd)
+			status = 1
+			try:
+				data = cPickle.dumps(run_process(simulator,runners,index,quantum,sync,rings,left))
+				while data:
+					data = data[os.write(wfd,data):]
+				status = 0
+			except:
+				traceback.print_exc()
+			finally:
+				os._exit(status)
+		os.close(wfd)
+		children.append((pid,rfd))
+	results = []
+	for (pid,rfd) in children:
+		data = []
+		while True:
+			chunk = os.read(rfd,65536)
+			if not chunk:
+				break
+			data.append(chunk)
+		os.close(rfd)
+		os.waitpid(pid,0)
+		if data:
+			results.append(cPickle.loads(''.join(data)))
+		else:
+			results.append(None)
+	simulator.clock = max([ result['clock'] for result in results if result ] + [simulator.clock])
+	return results
@@ -2,11 +2,25 @@
 import array
 import sys
 import struct
-from bitstring import BitString
 from numpy import zeros,uint32
 from time import time
 import opcodes
+import blocks
+import tracing
+import image
+import crc
+import cam
+import lookup
+import memory
+import counters
+import checksum
+import crypto
+from tracing import logfile
+from tracing import CHANGE_REG,CHANGE_ST,CHANGE_SRAM,CHANGE_IO,CHANGE_STALL,CHANGE_NEXT, \
+	CHANGE_THREAD,CHANGE_JUMP,CHANGE_CAM,CHANGE_CRC,CHANGE_SRAM_VIOLATION
 import random
+import heapq
+import math
 
 SIMULATE = True
 
@@ -16,6 +30,8 @@ BPM_SRAM_ADDRESS           = 0x1000
 VALID_BUFFER_MASK          = 0x0001
 BPM_BUFFERS_BASE           = 0x1D0000
 DDR_BUFFER_PAYLOAD_OFFSET  = 0x08
+PACKET_DDR_BUFFER_SIZE     = 0x800
+PACKET_SRAM_BUFFER_SIZE    = 0x80
 STALL_NORMAL = 0
 STALL_NO_CONTEXT = 1
 STALL_DMA = 2
@@ -24,6 +40,8 @@ STALL_BBMSG = 4
 STALL_LDIO = 5
 STALL_RAMMAN = 6
 STALL_CNTUP = 7
+STALL_HASH = 8
+STALL_CRYPT = 9
 
 BBMSG_FIFO_DEPTH = 4 
 BBTX_FIFO_DEPTH = 4 
@@ -35,6 +53,7 @@ USEC_TO_CLOCKS  = 300
 CLOCK_TYPE_NORMAL = 0
 MEMORY_OFFSET = 3
 NUMBER_OF_THREADS = 32 
+THREADS_MASK = ( 1 << NUMBER_OF_THREADS ) - 1
 NUMBER_OF_GLOBAL_REGISTERS  = 8 
 NUMBER_OF_PRIVATE_REGISTERS = 24 
 DATA_SEGMENT_SIZE  = 48 * 1024
@@ -150,6 +169,7 @@ CRYPT_MIN = 5
 CRYPT_MAX = 15 
 
 PC_MASK = 0x00007FFC
+NOP_OPCODE = 0xFC000000
 CHANGES = 0x5000
 
 CRC_TYPE_32 = 0
@@ -177,26 +197,36 @@ CRC_HEC_LENGTH = 3
 CRC_HEC_MASK   = 0x0007FFFF 
 
 def unsigned(val):
-	return struct.unpack('L',uint32(val))[0]
-logfile = []
-def log(listfile,line):
-	""" print current line to list file,
-	 if it is an error or warning message print it to stdout also """ 
-	if listfile != 0:
-		#print line
-		if line.startswith("ERROR") or line.startswith("WARNING"):
-			print line
-
-		if not line.endswith('\n'):
-			line += '\n'
-		#listfile.write(line)
-		logfile.append(line)
-		if len(logfile) >= 1: #:
-			for i in range(len(logfile)):
-				listfile.write(logfile[i])
-			logfile[:] = []
-	else:
-		print line
+	return int(val) & 0xFFFFFFFF
+
+# byte_shift field of the ALU opcodes : bits source b is shifted left by, negative to the right
+ALU_SHIFTS = {
+	opcodes.OPCODE_BYTE_SHIFT_LEFT_1 : 8,
+	opcodes.OPCODE_BYTE_SHIFT_LEFT_2 : 16,
+	opcodes.OPCODE_BYTE_SHIFT_LEFT_3 : 24,
+	opcodes.OPCODE_BYTE_SHIFT_RIGHT_1 : -8,
+	opcodes.OPCODE_BYTE_SHIFT_RIGHT_2 : -16,
+	opcodes.OPCODE_BYTE_SHIFT_RIGHT_3 : -24 }
+
+def alu_shift (source_b,shift,invert):
+	""" source b of an ALU opcode after its byte shift and invert """
+	if shift > 0:
+		source_b <<= shift
+	elif shift < 0:
+		source_b >>= -shift
+	if invert:
+		source_b = ~ source_b
+	return source_b
+
+# operation of the ALU opcodes run by the blocks, as execute_alu does it
+ALU_STEPS = {
+	opcodes.OPCODE_CODE_ADD : lambda a,b: a + b,
+	opcodes.OPCODE_CODE_SUB : lambda a,b: a - b,
+	opcodes.OPCODE_CODE_MULT : lambda a,b: a * b,
+	opcodes.OPCODE_CODE_AND : lambda a,b: a and b,
+	opcodes.OPCODE_CODE_OR : lambda a,b: a or b,
+	opcodes.OPCODE_CODE_XOR : lambda a,b: a ^ b }
+
 class CRC:
 	crcinit_direct = 0
 	crcinit_nondirect = 0
@@ -210,6 +240,9 @@ class CRC:
 	reflect_in = 0
 	reflect_out = 0
 
+	def __init__ (self):
+		self.engines = {}
+
 	def CRC_32_init (self):
 		self.crcinit_direct = 0
 		self.crcinit_nondirect = 0
@@ -222,6 +255,7 @@ class CRC:
 		self.crc_xor = 0xFFFFFFFF
 		self.reflect_in = 0
 		self.reflect_out = 0
+		return self
 	def CRC_16_init (self):
 		self.crcinit_direct = 0
 		self.crcinit_nondirect = 0
@@ -234,6 +268,7 @@ class CRC:
 		self.crc_xor = 0
 		self.reflect_in = 0
 		self.reflect_out = 0
+		return self
 	def CRC_10_init (self):
 		self.crcinit_direct = 0
 		self.crcinit_nondirect = 0
@@ -246,6 +281,7 @@ class CRC:
 		self.crc_xor = 0
 		self.reflect_in = 0
 		self.reflect_out = 0
+		return self
 	def CRC_5_init (self):
 		self.crcinit_direct = 0
 		self.crcinit_nondirect = 0
@@ -258,6 +294,40 @@ class CRC:
 		self.crc_xor = 0
 		self.reflect_in = 0
 		self.reflect_out = 0
+		return self
+
+	def prepare (self):
+		""" register masks and the direct / nondirect forms of the init value """
+		self.crc_mask = ( 1 << self.order ) - 1
+		self.crc_high_bit = 1 << ( self.order - 1 )
+		if not self.direct:
+			self.crcinit_nondirect = self.crc_init
+			crc = self.crc_init
+			for i in range(self.order):
+				bit = crc & self.crc_high_bit
+				crc <<= 1
+				if bit:
+					crc ^= self.polynom
+			crc &= self.crc_mask
+			self.crcinit_direct = crc
+		else:
+			self.crcinit_direct = self.crc_init
+			crc = self.crc_init
+			for i in range(self.order):
+				bit = crc & 1
+				if bit:
+					crc ^= self.polynom
+				crc >>= 1
+				if bit:
+					crc |= self.crc_high_bit
+			self.crcinit_nondirect = crc
+
+	def engine (self):
+		""" table driven engine for the current reflect in / out setting """
+		key = (self.reflect_in,self.reflect_out)
+		if key not in self.engines:
+			self.engines[key] = crc.crc_engine(self.order,self.polynom,self.crc_init,self.crc_xor,self.reflect_in,self.reflect_out)
+		return self.engines[key]
 
 class timer:
 
@@ -294,6 +364,8 @@ class hash:
 	mt  = 0
 	table_number = 0
 	thread = 0
+	key = 0
+	sa = 0
 	
 class ramman:
 	valid = 0
@@ -312,6 +384,7 @@ class ramman:
 	res_slot = 0
 	invoke  = 0
 	thread  = 0
+	common  = 0
 
 class bbtx:
 	valid  = 0
@@ -392,38 +465,91 @@ class  hw_accelerators:
 
 	def __init__(self):
 		self.crypt = crypt()		
-		for t in range(HASH_FIFO_DEPTH):
-			self.hash.append(hash())
-		for t in range(COUNTERS_FIFO_DEPTH):
-			self.cntup.append(cntup())
-		for t in range(DMA_FIFO_DEPTH):
-			self.dma.append(dma())
-		for t in range(BBTX_FIFO_DEPTH):
-			self.bbtx.append(bbtx())
-		for t in range(BBMSG_FIFO_DEPTH):
-			self.bbmsg.append(bbmsg())
+		self.hash = [ hash() for t in range(HASH_FIFO_DEPTH) ]
+		self.cntup = [ cntup() for t in range(COUNTERS_FIFO_DEPTH) ]
+		self.dma = [ dma() for t in range(DMA_FIFO_DEPTH) ]
+		self.bbtx = [ bbtx() for t in range(BBTX_FIFO_DEPTH) ]
+		self.bbmsg = [ bbmsg() for t in range(BBMSG_FIFO_DEPTH) ]
 		self.ramman = ramman()
 
+# lowest set bit of every byte value, -1 for 0
+FIRST_SET_TABLE = [-1] + [ ( i & -i ).bit_length() - 1 for i in range(1,256) ]
+
+def find_first_set (bits):
+	""" number of the lowest set bit, -1 when bits is 0 """
+	if not bits:
+		return -1
+	n = 0
+	while not bits & 0xFF:
+		bits >>= 8
+		n += 8
+	return n + FIRST_SET_TABLE[bits & 0xFF]
+
+def spread_groups (bits):
+	""" the 4 thread groups of bits, 8 threads each, moved 16 bits apart """
+	return ( bits & 0xFF ) | ( ( bits & 0xFF00 ) << 8 ) | ( ( bits & 0xFF0000 ) << 16 ) | ( ( bits & 0xFF000000 ) << 24 )
+
 class scheduler:
 
-	sync_wakeup_request = []* NUMBER_OF_THREADS  
-	async_wakeup_request_normal = []* NUMBER_OF_THREADS  
-	async_wakeup_request_urgent = []* NUMBER_OF_THREADS  
-	mask = []*NUMBER_OF_THREADS  
-	async_enable = []* NUMBER_OF_THREADS 
+	# one bit per thread
+	sync_wakeup_request = 0
+	async_wakeup_request_normal = 0
+	async_wakeup_request_urgent = 0
+	mask = THREADS_MASK
+	async_enable = 0
 	previous_context = 0 
 	current_context = 0 
 	next_context = 0 
 	next_context_valid = 0 
 	save_context = 0 
 
+	def select (self):
+		""" pick next_context : thread groups of 8 in order, in a group the urgent and the
+			sync requests before the normal ones, the lowest thread first.
+			returns 2 for a sync wakeup, 1 for an async one, 0 when no thread is ready """
+		bit = find_first_set(self.candidates())
+		if bit < 0:
+			return 0
+		thread = ( bit // 16 ) * 8 + bit % 8
+		self.next_context = thread
+		if self.sync_wakeup_request & ( 1 << thread ):
+			return 2
+		return 1
+
+	def candidates (self):
+		""" the threads select() may pick, one bit each in priority order ; 0 when none is ready """
+		ready = ~self.mask & self.async_enable
+		urgent = ( ready & self.async_wakeup_request_urgent ) | ( ~self.mask & self.sync_wakeup_request )
+		normal = ready & self.async_wakeup_request_normal
+		# group g urgent in bits 16g..16g+7, normal in bits 16g+8..16g+15
+		return spread_groups(urgent) | ( spread_groups(normal) << 8 )
+
+	def clear_wakeup (self,thread):
+		""" the thread got the context : drop its wakeup requests """
+		bit = 1 << thread
+		if self.async_enable & bit:
+			self.async_enable &= ~bit
+			self.async_wakeup_request_normal &= ~bit
+			self.async_wakeup_request_urgent &= ~bit
+		self.sync_wakeup_request &= ~bit
+
+class event_queue:
+	""" completion clocks of the accelerator requests, earliest first. an entry whose request
+		completed or went away only makes a stalled runner look one clock early """
+
 	def __init__ (self):
-		for i in range(NUMBER_OF_THREADS):
-			self.sync_wakeup_request.append(0)
-			self.async_wakeup_request_normal.append(0)
-			self.async_wakeup_request_urgent.append(0)
-			self.mask.append(1)
-			self.async_enable.append(0)
+		self.clocks = []
+
+	def push (self,clock):
+		heapq.heappush(self.clocks,int(math.ceil(clock)))
+
+	def next (self,clock):
+		""" first event after clock, 0 for none """
+		while self.clocks and self.clocks[0] <= clock:
+			heapq.heappop(self.clocks)
+		if self.clocks:
+			return self.clocks[0]
+		return 0
 
 class pipe:
 	opcode_ds1 = 0
@@ -442,7 +568,8 @@ class runner:
 	data_filename = ''
 	context_filename = ''
 	co_runner = 0
-	changes = []*CHANGES
+	co_runners = []
+	changes = 0
 	stall_dma_time = 0
 	stall_bbtx_time = 0
 	stall_bbmsg_time = 0
@@ -460,13 +587,24 @@ class runner:
 	call_stack = []*CALL_STACK_DEPTH
 	code_statistics = [[]*NUMBER_OF_THREADS]*CODE_SEG_SIZE
 	code_segment = array.array('L')
+	decoded_segment = []
+	dispatch = []
+	opcode_counts = []
+	blocks = 0
+	clock_limit = 0
+	events = 0
+	cams = 0
+	crypto = 0
 	data_segment = array.array('L')
 	context_segment = array.array('L')
 	io = []*IO_SIZE
 	timers = []*4
 	counters_lock = 0 
+	# CNTR_LOCK writes to a co-runner that runs in another process, sent on by parallel
+	co_runner_locks = 0
 	crc_constants = []
 	fio = 0
+	trace = 0
 
 	def __init__(self,id,codefile,datafile,contextfile,simulator):
 		self.id = id
@@ -474,75 +612,43 @@ class runner:
 		self.stall_pc = stall_pc()
 		self.stall_pc.enter_stall = STALL_NORMAL
 		self.scheduler = scheduler()
-		for i in range(NUMBER_OF_THREADS):
-			self.threads[i] = i
-		for i in range(CODE_SEG_SIZE):
-			l = []
-			tp = (0,0)
-			for j in range(NUMBER_OF_THREADS):
-				l.append(tp)
-			self.code_statistics[i].append(l)
+		self.threads = range(NUMBER_OF_THREADS)
+		# [clocks stalled, 0] per code word and thread
+		self.code_statistics = [ [ [0,0] for j in range(NUMBER_OF_THREADS) ] for i in range(CODE_SEG_SIZE) ]
 		self.io = zeros(IO_SIZE,'L')
 		self.code_file_name = codefile
 		self.data_file_name = datafile
 		self.ctx_file_name = contextfile
 		self.mode = MODE_DISABLE
 		self.force_update = 0  
-		crcClass = CRC()
-		self.crc_constants.append(crcClass.CRC_32_init())
-		self.crc_constants.append(crcClass.CRC_16_init())
-		self.crc_constants.append(crcClass.CRC_10_init())
-		self.crc_constants.append(crcClass.CRC_5_init())
-		for c in crc_constants:
-			c.crc_mask = (( 1 << (c.order -1) - 1) << 1 ) | 1
-			c.crc_high_bit = (( 1 << (c.order -1) - 1) << 1 )
-			if not c.direct:
-				c.crcinit_nondirect = c.crc_init
-				crc = c.crc_init
-				for i in range(c.order):
-					bit = crc & c.crc_high_bit
-					crc <<= 1
-					if bit:
-						crc ^= c.polynom
-				crc &= c.crc_mask
-				c.crcinit_direct = crc
-			else:
-				c.crcinit_direct = c.crc_init
-				crc = c.crc_init
-				for i in range(c.order):
-					bit = crc & 1
-					if bit:
-						crc ^= c.polynom
-					crc >>= 1
-					if bit:
-						crc |= c.crc_high_bit
-				c.crcinit_nondirect = crc
-		self.previous_opcode = BitString('0x00000000')
+		self.crc_constants = [ CRC().CRC_32_init(), CRC().CRC_16_init(), CRC().CRC_10_init(), CRC().CRC_5_init() ]
+		for c in self.crc_constants:
+			c.prepare()
+		self.previous_opcode = 0
+		self.changes = tracing.change_ring(CHANGES)
+		self.build_dispatch()
+		self.nop_opcode = self.decode_opcode(NOP_OPCODE)
 		self.global_registers = zeros(NUMBER_OF_GLOBAL_REGISTERS,'L')
 		self.private_registers = zeros(NUMBER_OF_PRIVATE_REGISTERS,'L')
 		self.simulator = simulator
 		self.hw_accelerators = hw_accelerators()
+		self.events = event_queue()
+		self.cams = cam.cam_cache()
+		self.crypto = crypto.crypto_engine()
 		self.timer = timer_config()
-		for t in range(4):
-			self.timers.append(timer())
+		self.timers = [ timer() for t in range(4) ]
 		try:
 			self.fio = open("sim.log","w+")
 		except IOError:
 			print "Cannot open file 'sim.log'"
+		self.trace = tracing.text_sink(self.fio)
 		try:
-			fobj = open(self.code_file_name,'rb')
-			self.data_segment.fromfile(fobj,DATA_SEGMENT_SIZE//4)
-			self.code_segment.fromfile(fobj,CODE_SEGMENT_SIZE//4)
-			self.code_segment.byteswap()
-			self.context_segment.fromfile(fobj,CONTEXT_SEGMENT_SIZE//4)
-			fobj.close()
-			fobj = open(self.data_file_name,'rb')
-			self.data_segment.fromfile(fobj,DATA_SEGMENT_SIZE//4)
-			self.data_segment.byteswap()
-			fobj.close()
-			fobj = open(self.ctx_file_name,'rb')
-			self.context_segment.fromfile(fobj,CONTEXT_SEGMENT_SIZE//4)
-			self.context_segment.byteswap()
+			# the object file holds a data image, the code and a context image ;
+			# data and context come from their own files
+			self.code_segment = image.load_segment(self.code_file_name,DATA_SEGMENT_SIZE,CODE_SEGMENT_SIZE)
+			self.predecode()
+			self.data_segment = image.load_segment(self.data_file_name,0,DATA_SEGMENT_SIZE)
+			self.context_segment = image.load_segment(self.ctx_file_name,0,CONTEXT_SEGMENT_SIZE)
 			self.init_io()
 			self.reset_others(id)
 			self.show_scheduler ( "after reset")
@@ -551,7 +657,7 @@ class runner:
 			return
 	def reset_others (self,id):
 		if id == 0:
-
+			pass
 
 	def init_io (self):
 		self.WRITE_IO(FW_CONTROL,4,0x00000001)
@@ -593,8 +699,10 @@ class runner:
 		self.WRITE_IO(BBMSG_2,4,0x00000000)
 
 	def addCorunner(self,corunner):	
-		""" add co-runner pointer """	
-		self.co_runner = corunner
+		""" add co-runner pointer ; the first one shares the counters lock """	
+		if not self.co_runner:
+			self.co_runner = corunner
+		self.co_runners = self.co_runners + [corunner]
 	def run (self):
 		""" run simulator for runner """	
 		if self.mode != MODE_RUNNING:
@@ -602,9 +710,25 @@ class runner:
 		while self.mode == MODE_RUNNING :  
 			if self.continue_work () == 0 : 
 				self.mode = MODE_DISABLE 
+		self.stop()
+	def run_until (self,clock):
+		""" run up to simulator clock, a block never runs past it ; 0 once the runner stops """
+		self.mode = MODE_RUNNING
+		self.clock_limit = clock
+		while self.simulator.clock < clock:
+			if self.simulator_clock() == 0:
+				self.clock_limit = 0
+				return 0
+		self.clock_limit = 0
+		return 1
+	def stop (self):
+		""" runner is done : flush the log and show the profile """
+		self.mode = MODE_DISABLE
 		if self.fio != 0:
 			for i in range(len(logfile)):
 				self.fio.write(logfile[i])
+		if self.opcode_counts:
+			self.show_profile()
 	def continue_work (self):
 		""" continue simulation """
 		if self.mode == MODE_RUNNING:
@@ -627,114 +751,149 @@ class runner:
 		if self.pipe.clock == 2:
 			self.pc = self.pipe.pc_ds1
 			self.pipe.clock -= 1
-			if self.execute_opcode(self.pipe.opcode_ds1,0)[0] == 0:
-				print "invalid delay slot opcode %08X at address %08X" % ( self.pipe.opcode_ds1, self.pipe.pc_ds1 )
+			if self.execute_opcode(self.pipe.opcode_ds1,0) == 0:
+				print "invalid delay slot opcode %08X at address %08X" % ( self.pipe.opcode_ds1[2], self.pipe.pc_ds1 )
 			self.pc = old_pc
 		elif self.pipe.clock == 1:
 			self.pc = self.pipe.pc_ds2
 			self.pipe.clock -= 1
-			if self.execute_opcode(self.pipe.opcode_ds2,0)[0] == 0:
-				print "invalid delay slot opcode %08X at address %08X" % ( self.pipe.opcode_ds1, self.pipe.pc_ds2 )
+			if self.execute_opcode(self.pipe.opcode_ds2,0) == 0:
+				print "invalid delay slot opcode %08X at address %08X" % ( self.pipe.opcode_ds2[2], self.pipe.pc_ds2 )
 			self.pc = old_pc
-			self.previous_opcode[opcodes.nopOpcode['opcode'][0]:opcodes.nopOpcode['opcode'][1]] = opcodes.OPCODE_CODE_NOP
+			self.previous_opcode = NOP_OPCODE
 		else:
 			old_pc = self.pc//4
 			olt_st = self.st
-			if self.stall_pc.enter_stall == STALL_NORMAL:
-				if old_pc < CODE_SEGMENT_SIZE/4:
-					try:							
-						opcode = BitString(uint=self.code_segment[old_pc],length=32)
-						buffer = self.execute_opcode(opcode,0)[1]
-						if not buffer :
-							log(self.fio,"clock=%d id=%d : 0x%08x => 0x%08x\tError ????" % (self.simulator.clock,self.id,old_pc*4,self.code_segment[old_pc]))
-							return 0
-						log(self.fio,"clock=%d id=%d : 0x%08x => 0x%08x\t%s" % (self.simulator.clock,self.id,old_pc*4,self.code_segment[old_pc],buffer))
-						if len(self.changes) > 0:
-							log(self.fio,"clock=%d id=%d : CHANGES: %s" % (self.simulator.clock,self.id,self.changes))
-							self.changes[:] = [] # clear the list
-						if not self.increment_clock():
-							return 0
-					except IndexError:
-						print 'error %d %d' % (old_pc,CODE_SEGMENT_SIZE/4)		
-						self.pc += 4
-				else: return 0
+			if self.stall != STALL_NORMAL:
+				return self.idle_clock()
+			if old_pc < CODE_SEGMENT_SIZE/4:
+				try:							
+					if self.blocks:
+						(block,step) = self.blocks.lookup(old_pc)
+						if block:
+							return block.run(self,step)
+					opcode = self.fetch_opcode(old_pc)
+					self.execute_opcode(opcode,0)
+					if not self.trace_opcode(old_pc,opcode):
+						return 0
+					if not self.increment_clock():
+						return 0
+				except IndexError:
+					print 'error %d %d' % (old_pc,CODE_SEGMENT_SIZE/4)		
+					self.pc += 4
+			else: return 0
+		return 1
+
+	def idle_clock (self):
+		""" a clock with the runner stalled : only the accelerators, the timer and the scheduler run.
+			until the next event none of them can change anything, so the clock jumps there.
+			their changes stay in the ring and are traced with the next executed opcode """
+		clock = self.simulator.clock
+		wake = self.wake_clock(clock)
+		if self.clock_limit and ( wake == 0 or wake > self.clock_limit ):
+			wake = self.clock_limit
+		if wake > clock:
+			self.skip_clocks(clock,wake)
+			self.simulator.clock = wake
+		return self.increment_clock()
+
+	def wake_clock (self,clock):
+		""" first clock from clock on where increment_clock can change this runner : clock when
+			it is not stalled, else the next accelerator completion or the next scheduler clock
+			that has a thread to pick ; 0 when nothing is pending """
+		if self.stall == STALL_NORMAL or self.pipe.clock != 0:
+			return clock
+		wake = self.events.next(clock - 1)
+		if self.scheduler.next_context_valid or self.scheduler.candidates():
+			tick = clock + ( -clock % SCHEDULER_CLOCKS )
+			if not wake or tick < wake:
+				wake = tick
+		return wake
+
+	def quiet_clocks (self,clock):
+		""" how many clocks from clock on increment_clock would only move the timer : up to the
+			next scheduler clock or accelerator completion, none while a CAM or CRC is in flight """
+		if self.hw_accelerators.ramman.valid:
+			return 0
+		quiet = -clock % SCHEDULER_CLOCKS
+		wake = self.events.next(clock - 1)
+		if wake and wake - clock < quiet:
+			quiet = wake - clock
+		return quiet
+
+	def skip_clocks (self,first,last):
+		""" clocks first to last - 1 pass without increment_clock : only the timer moves """
+		if self.timer.pause == 0:
+			ticks = ( last - 1 ) // USEC_TO_CLOCKS - ( first - 1 ) // USEC_TO_CLOCKS
+			if ticks > 0:
+				self.timer.value += ticks
+				self.WRITE_IO(TIMER_IO_ADDRESS,4,self.timer.value)
+
+	def trace_opcode (self,ind,opcode):
+		""" hand the opcode executed at word index ind and the changes it made to the trace sink """
+		if self.trace:
+			self.trace.opcode(self.simulator.clock,self.id,ind,opcode,self.changes)
+		if opcode[0] is None:
+			return 0
+		self.changes.publish(self.simulator.clock,self.id)
+		self.changes.clear()
 		return 1
 
+	def subscribe (self,kind,callback):
+		""" callback(clock, id, kind, index, value) for every change record of kind (tracing.CHANGE_*) """
+		self.changes.subscribe(kind,callback)
+
+	def set_trace (self,sink):
+		""" send the trace to sink in place of sim.log """
+		self.trace = sink
+
+	def disable_trace (self):
+		""" run without a trace sink ; no disassembly text is built """
+		self.trace = 0
+
+	def enable_blocks (self):
+		""" execute straight-line code through translated basic blocks """
+		self.blocks = blocks.block_cache(self)
+
 	def increment_clock(self):
 		""" for every simulator clock """
 		if self.simulator.clock % USEC_TO_CLOCKS == 0 and self.timer.pause == 0:
 			self.timer.value += 1
-			self.WRITE_IO(TIMER_IO_ADDRESS,self.timer.value,4)
+			self.WRITE_IO(TIMER_IO_ADDRESS,4,self.timer.value)
 		#self.check_timers()
 		#self.check_semaphores()
 		self.execute_ramman()
-		#self.execute_dma()
+		self.execute_hash()
+		self.execute_dma()
 		#self.execute_bbtx()
 		#self.execute_bbmsg()
-		#self.execute_cntup()
+		self.execute_cntup()
+		self.execute_crypt()
 		if self.simulator.clock % SCHEDULER_CLOCKS == 0:
-			next_context = self.scheduler.next_context
-			found = 0
-			g = 0
-			t = 0
-			thread = 0
-			for g in range(8):
-				if found != 0: break
-				for t in range(8):
-					if found != 0: break
-					thread = (g//2)*8 + t
-					if self.scheduler.async_wakeup_request_urgent[thread] == 1 and \
-						self.scheduler.mask[thread] == 0 and \
-						self.scheduler.async_enable[thread] == 1:
-						self.scheduler.next_context = thread
-						found = 1
-					if self.scheduler.sync_wakeup_request[thread] == 1 and \
-						self.scheduler.mask[thread] == 0 :
-						self.scheduler.next_context = thread
-						found = 2
-				for t in range(8):
-					if found != 0: break
-					thread = (g//2)*8 + t
-					if self.scheduler.async_wakeup_request_normal[thread] == 1 and \
-						self.scheduler.mask[thread] == 0 and \
-						self.scheduler.async_enable[thread] == 1:
-						self.scheduler.next_context = thread
-						found = 1
-					if self.scheduler.sync_wakeup_request[thread] == 1 and \
-						self.scheduler.mask[thread] == 0 :
-						self.scheduler.next_context = thread
-						found = 2
+			found = self.scheduler.select()
 			if found != 0:
 				self.scheduler.next_context_valid = 1
-				self.changes.append(" NEXT: %08X " % (self.scheduler.next_context))
-			else:
-				self.changes.append(" NEXT: ?? ")
+			self.changes.append(CHANGE_NEXT,found,self.scheduler.next_context)
 			if self.scheduler.next_context_valid == 1 and self.stall == STALL_NO_CONTEXT:
 				self.stall_no_context_time += self.simulator.clock - self.stall_pc.enter_stall
 				self.stall = STALL_NORMAL
-				self.changes.append(" STALL: 0 ")
+				self.changes.append(CHANGE_STALL,0,0)
 				for r in range(NUMBER_OF_PRIVATE_REGISTERS):
 					ind = self.scheduler.current_context*NUMBER_OF_PRIVATE_REGISTERS + r
 					if self.scheduler.save_context == 1:
 						self.context_segment[ind] = self.private_registers[r] 
 					self.private_registers[r] = self.context_segment[ind]
-					self.changes.append(" REG: r%d=%08X " % (r+NUMBER_OF_GLOBAL_REGISTERS,self.private_registers[r]))
+					self.changes.append(CHANGE_REG,r+NUMBER_OF_GLOBAL_REGISTERS,self.private_registers[r])
 				self.st = 0
 				self.scheduler.previous_context = self.scheduler.current_context ;
 				self.scheduler.current_context = self.scheduler.next_context ;
-				if self.scheduler.async_enable [ self.scheduler.next_context ] == 1: 
-					self.scheduler.async_enable [self.scheduler.next_context ] = 0 
-					self.scheduler.async_wakeup_request_normal [ self.scheduler.next_context ] = 0 
-					self.scheduler.async_wakeup_request_urgent [ self.scheduler.next_context ] = 0 
-					self.scheduler.sync_wakeup_request [ self.scheduler.next_context ] = 0
-				else:
-					self.scheduler.sync_wakeup_request [ self.scheduler.next_context ] = 0 
+				self.scheduler.clear_wakeup(self.scheduler.next_context)
 				self.scheduler.next_context_valid = 0
 				self.pc = self.private_registers[16] >> 16
 				self.pc &= PC_MASK
 				if self.pc == 0:
 					print "PANIC: Program counter wrapped around to address 0"
-				self.changes.append(" THREAD: %08X " % (self.scheduler.current_context))
+				self.changes.append(CHANGE_THREAD,0,self.scheduler.current_context)
 				self.show_scheduler("scheduler clock")
 				if not (self.hw_accelerators.hash_count >0 or \
 				self.hw_accelerators.ramman.valid == 1 or \
@@ -751,225 +910,324 @@ class runner:
 		if self.hw_accelerators.ramman.valid == 1:
 			r=self.hw_accelerators.ramman.clock - self.simulator.clock
 			if self.hw_accelerators.ramman.type == 1:
-				self.changes.append(" CAM: %08X " % (r))
+				self.changes.append(CHANGE_CAM,0,r)
 			else:
-				self.changes.append(" CRCCALC: %08X " % (r))
+				self.changes.append(CHANGE_CRC,0,r)
 			if r <= 0:
 				if self.hw_accelerators.ramman.type == 1:
 					self.hw_accelerators.ramman.result = self.camlkup(self.hw_accelerators.ramman.source_a, \
-					self.hw_accelerators.ramman.key,self.hw_accelerators.ramman.key_size,self.hw_accelerators.ramman.mask)
+					self.hw_accelerators.ramman.key,self.hw_accelerators.ramman.key_size,self.hw_accelerators.ramman.mask, \
+					self.hw_accelerators.ramman.common)
 					if self.hw_accelerators.ramman.result != -1:
 						cam_result = self.hw_accelerators.ramman.result | (1 << 8)
 						if self.hw_accelerators.ramman.res_slot == 0:
 							self.WRITE_IO(CAM_RESULT_IO_ADDRESS0,4,cam_result)
 							r = self.READ_IO(CAM_RESULT_IO_ADDRESS0,4)
-							self.changes.append(" IO: word %08X=%08X " % (CAM_RESULT_IO_ADDRESS0,r))
+							self.changes.append(CHANGE_IO,CAM_RESULT_IO_ADDRESS0,r[1])
 						elif self.hw_accelerators.ramman.res_slot == 1:
 							self.WRITE_IO(CAM_RESULT_IO_ADDRESS1,4,cam_result)
 							r = self.READ_IO(CAM_RESULT_IO_ADDRESS1,4)
-							self.changes.append(" IO: word %08X=%08X " % (CAM_RESULT_IO_ADDRESS1,r))
+							self.changes.append(CHANGE_IO,CAM_RESULT_IO_ADDRESS1,r[1])
 						elif self.hw_accelerators.ramman.res_slot == 2:
 							self.WRITE_IO(CAM_RESULT_IO_ADDRESS2,4,cam_result)
 							r = self.READ_IO(CAM_RESULT_IO_ADDRESS2,4)
-							self.changes.append(" IO: word %08X=%08X " % (CAM_RESULT_IO_ADDRESS2,r))
+							self.changes.append(CHANGE_IO,CAM_RESULT_IO_ADDRESS2,r[1])
 						elif self.hw_accelerators.ramman.res_slot == 3:
 							self.WRITE_IO(CAM_RESULT_IO_ADDRESS3,4,cam_result)
 							r = self.READ_IO(CAM_RESULT_IO_ADDRESS3,4)
-							self.changes.append(" IO: word %08X=%08X " % (CAM_RESULT_IO_ADDRESS3,r))
+							self.changes.append(CHANGE_IO,CAM_RESULT_IO_ADDRESS3,r[1])
 						if self.hw_accelerators.ramman.invoke == 1:
-							self.scheduler.sync_wakeup_request [self.hw_accelerators.ramman.thread ] = 1 
+							self.scheduler.sync_wakeup_request |= 1 << self.hw_accelerators.ramman.thread
 						self.show_scheduler ( "after CAMLKUP completion")
 				else:
-					crc_buffer_length = self.hw_accelerators.ramman.length
-					s_address = self.hw_accelerators.ramman.source_c
-					local_buffer = []
+					crc_buffer = self.sram_bytes(self.hw_accelerators.ramman.source_c,self.hw_accelerators.ramman.length)
 					crc_result = 0
-					for i in range(crc_buffer_length) :
-						r = self.READ_SRAM(s_address,8)
-						local_buffer.append(r)
-						s_address += 1
 					if self.hw_accelerators.ramman.type == 0: # crc_32
 						if self.hw_accelerators.ramman.eth == 1: # eth
 							self.crc_constants[CRC_TYPE_32].reflect_in = 1
 						else:
 							self.crc_constants[CRC_TYPE_32].reflect_in = 0
 						self.crc_constants[CRC_TYPE_32].reflect_out = 0
-						self.hw_accelerators.ramman.result = self.crc ( local_buffer, self.hw_accelerators.ramman.length, self.hw_accelerators.ramman.source_a, CRC_TYPE_32 )
+						self.hw_accelerators.ramman.result = self.crc ( crc_buffer, self.hw_accelerators.ramman.source_a, CRC_TYPE_32, self.hw_accelerators.ramman.last )
 						crc_result = self.hw_accelerators.ramman.result
 					self.WRITE_IO(CRC_RESULT_IO_ADDRESS,4,crc_result)
 					r = self.READ_IO(CRC_RESULT_IO_ADDRESS,4)
-					self.changes.append(" IO: word %08X=%08X " % (CRC_RESULT_IO_ADDRESS,r))
+					self.changes.append(CHANGE_IO,CRC_RESULT_IO_ADDRESS,r[1])
 				if self.stall == STALL_RAMMAN:
 					self.stall = STALL_NORMAL
-					self.changes.append(" STALL: 0 ")
+					self.changes.append(CHANGE_STALL,0,0)
 				self.hw_accelerators.ramman.ready = 1
 				self.hw_accelerators.ramman.valid = 0
 				if self.stall == STALL_LDIO:
-					self.stall_ldio_time += self.simulator.clock
-					self.pc = self.stall_pc.pc & PC_MASK
-					i=self.pc//4
-					self.code_statistics[i][self.scheduler.current_context][0] = self.simulator.clock - self.stall_pc.enter_stall
-					self.stall = STALL_NORMAL
-					opcode = BitString(uint=self.code_segment[i],length=32)
-					self.changes.append(" STALL: 0 ")
-					buffer = self.execute_opcode(opcode,1)[1]
-					if not buffer :
-						log(self.fio,"clock=%d id=%d : 0x%08x => 0x%08x\tError ????" % (self.simulator.clock,self.id,i*4,self.code_segment[i]))
-						return 0
-					log(self.fio,"clock=%d id=%d : 0x%08x => 0x%08x\t%s" % (self.simulator.clock,self.id,i*4,self.code_segment[i],buffer))
-					if len(self.changes) > 0:
-						log(self.fio,"clock=%d id=%d : CHANGES: %s" % (self.simulator.clock,self.id,self.changes))
-						self.changes[:] = [] # clear the list
-					if self.stall_pc.delay_pc != 0:
-						self.pc = self.stall_pc.delay_pc & PC_MASK
-						i = self.pc //4
-						opcode = BitString(uint=self.code_segment[i],length=32)
-						buffer = self.execute_opcode(opcode,0)[1]
-						if not buffer :
-							log(self.fio,"clock=%d id=%d : 0x%08x => 0x%08x\tError ????" % (self.simulator.clock,self.id,i*4,self.code_segment[i]))
-							return 0
-						log(self.fio,"clock=%d id=%d : 0x%08x => 0x%08x\t%s" % (self.simulator.clock,self.id,i*4,self.code_segment[i],buffer))
-						if len(self.changes) > 0:
-							log(self.fio,"clock=%d id=%d : CHANGES: %s" % (self.simulator.clock,self.id,self.changes))
-							self.changes[:] = [] # clear the list
-
-	def camlkup (self,start, key, key_size, use_mask):
-		res = -1
-		#if key_size == 0: # 16bit
-
-		#elif key_size == 1: # 32bit
-							 
-		#elif key_size == 2: # 64bit
-							
-		
-		return res
+					return self.resume_ldio()
+
+	def resume_ldio (self):
+		""" an accelerator result is in : run the LDIO that stalled on it again """
+		self.stall_ldio_time += self.simulator.clock
+		self.pc = self.stall_pc.pc & PC_MASK
+		i=self.pc//4
+		self.code_statistics[i][self.scheduler.current_context][0] = self.simulator.clock - self.stall_pc.enter_stall
+		self.stall = STALL_NORMAL
+		opcode = self.fetch_opcode(i)
+		self.changes.append(CHANGE_STALL,0,0)
+		self.execute_opcode(opcode,1)
+		if not self.trace_opcode(i,opcode):
+			return 0
+		if self.stall_pc.delay_pc != 0:
+			self.pc = self.stall_pc.delay_pc & PC_MASK
+			i = self.pc //4
+			opcode = self.fetch_opcode(i)
+			self.execute_opcode(opcode,0)
+			if not self.trace_opcode(i,opcode):
+				return 0
+		return 1
+
+	def execute_hash (self):
+		""" complete the lookups at the head of the hash FIFO """
+		while self.hw_accelerators.hash_count > 0:
+			h = self.hw_accelerators.hash[self.hw_accelerators.hash_out]
+			if h.clock > self.simulator.clock:
+				return 1
+			h.result = self.simulator.hash_tables.lookup(self.simulator,h.table_number,h.key,h.key_size,h.sa,h.rq)
+			address = HASH_RESULT_IO_ADDRESS0 + h.res_slot * 4
+			self.WRITE_IO(address,4,h.result)
+			r = self.READ_IO(address,4)
+			self.changes.append(CHANGE_IO,address,r[1])
+			if h.invoke == 1:
+				self.scheduler.sync_wakeup_request |= 1 << h.thread
+			h.ready = 1
+			h.valid = 0
+			self.hw_accelerators.hash_out = ( self.hw_accelerators.hash_out + 1 ) % HASH_FIFO_DEPTH
+			self.hw_accelerators.hash_count -= 1
+			if self.stall == STALL_HASH:
+				# the HASH that found the FIFO full is issued again
+				self.stall = STALL_NORMAL
+				self.pc = self.stall_pc.pc
+				self.changes.append(CHANGE_STALL,0,0)
+			elif self.stall == STALL_LDIO:
+				if not self.resume_ldio():
+					return 0
+		return 1
+
+	def execute_cntup (self):
+		""" complete the counter updates at the head of the FIFO : the ones due on the same
+			clock are applied to common memory together """
+		updates = []
+		while self.hw_accelerators.cntup_count > len(updates):
+			c = self.hw_accelerators.cntup[( self.hw_accelerators.cntup_out + len(updates) ) % COUNTERS_FIFO_DEPTH]
+			if c.clock > self.simulator.clock:
+				break
+			address = c.group_offset + c.counter_number * counters.CNTR_SIZE_BYTES[c.size]
+			if c.operation == counters.CNTR_DECREMENT:
+				updates.append((address,c.size,-c.value,c.mode))
+			else:
+				updates.append((address,c.size,c.value,c.mode))
+			c.valid = 0
+		if not updates:
+			return 1
+		segment = self.simulator.common_segment
+		try:
+			words = counters.apply(segment,updates)
+		except IndexError:
+			print "ERROR: counter update out of common memory"
+			words = []
+		for word in words:
+			if self.simulator.common_cams.tables:
+				self.simulator.common_cams.touch(segment,word)
+			self.simulator.hash_tables.touch(segment,lookup.HASH_TABLE_COMMON,word)
+		self.hw_accelerators.cntup_out = ( self.hw_accelerators.cntup_out + len(updates) ) % COUNTERS_FIFO_DEPTH
+		self.hw_accelerators.cntup_count -= len(updates)
+		if self.stall == STALL_CNTUP:
+			# the CNTUP that found the FIFO full is issued again
+			self.stall = STALL_NORMAL
+			self.pc = self.stall_pc.pc
+			self.changes.append(CHANGE_STALL,0,0)
+		return 1
+
+	def execute_crypt (self):
+		""" complete the chunk in the crypt accelerator : crypt encrypts it in place, auth
+			writes the digest of the packet after its last chunk """
+		c = self.hw_accelerators.crypt
+		if not c.valid or c.clock > self.simulator.clock:
+			return 1
+		data = self.sram_bytes(c.chunk_address,c.chunk_size)
+		result = self.crypto.chunk(c.thread,c.hash,data,c.first,c.last)
+		if result:
+			if c.hash:
+				self.sram_write_bytes(c.chunk_address + c.chunk_size,result)
+			else:
+				self.sram_write_bytes(c.chunk_address,result)
+		if c.invoke == 1:
+			self.scheduler.sync_wakeup_request |= 1 << c.thread
+		c.valid = 0
+		if self.stall == STALL_CRYPT:
+			# the CRYPT that found the accelerator busy is issued again
+			self.stall = STALL_NORMAL
+			self.pc = self.stall_pc.pc
+			self.changes.append(CHANGE_STALL,0,0)
+		return 1
+
+	def camlkup (self,start, key, key_size, use_mask, common=0):
+		""" index of the first entry of the CAM table at byte address start of SRAM or common
+			memory that key matches, -1 for none """
+		if common:
+			segment = self.simulator.common_segment
+			cams = self.simulator.common_cams
+		else:
+			segment = self.data_segment
+			cams = self.cams
+		return cams.lookup(segment,start // 4,key_size,use_mask,key)
+
+	def sram_bytes (self,address,length):
+		""" length bytes of the data segment from byte address, in memory order """
+		return memory.read_bytes(self.data_segment,address,length)
+
+	def sram_write_bytes (self,address,data):
+		""" write data to the data segment from byte address, for the accelerators """
+		try:
+			(first,last) = memory.write_bytes(self.data_segment,address,data)
+		except IndexError, e:
+			print "ERROR: SRAM %s" % (e)
+			return 0
+		for word in range(first,last):
+			self.changes.append(CHANGE_SRAM,word * 4,self.data_segment[word])
+			if self.cams.tables:
+				self.cams.touch(self.data_segment,word)
+		return 1
 
-	def crc (self):
-		print "CRC"
+	def crc (self,data,start,crc_type,last):
+		""" CRC of data from register start : the algorithm's init value for the first span of a
+			frame, the previous result for the next ones. the last span gets the output
+			reflection and xor, the others return the bare register to chain """
+		engine = self.crc_constants[crc_type].engine()
+		register = engine.update(data,start)
+		if last:
+			return engine.finish(register)
+		return register
 	def check_finish(self,ind):
 		print "check_finish"
 		return 0
 
-	def execute_opcode (self,opcode,exitstall):
-		""" execute one opcode """
-		r = 0
-		op5 = opcode[opcodes.jmpOpcode['opcode'][0]:opcodes.jmpOpcode['opcode'][1]].unpack('uint:5')[0]
-		op4 = opcode[opcodes.dmaOpcode['opcode'][0]:opcodes.dmaOpcode['opcode'][1]].unpack('uint:4')[0]
-		op = opcode[opcodes.ldOpcode['opcode'][0]:opcodes.ldOpcode['opcode'][1]].unpack('uint:6')[0]
-		if op4 == opcodes.OPCODE_CODE_DMARD >>2:
-			r = self.opcode_dmard(opcode,op4)
-		elif op4 == opcodes.OPCODE_CODE_DMAWR >>2:
-			r = self.opcode_dmawr(opcode,op4)
-		elif op4 == opcodes.OPCODE_CODE_DMALU >>2:
-			r = self.opcode_dmaalu(opcode)
-		elif op5 == opcodes.OPCODE_CODE_JMP:
-			r = self.opcode_jmp(opcode)
-		else:
-			dict = {
-				opcodes.OPCODE_CODE_LJMP:self.opcode_ljmp,
-				opcodes.OPCODE_CODE_BEZ:self.opcode_jmpz,
-				opcodes.OPCODE_CODE_CMPJMP:self.opcode_jmp_cmp,
-				opcodes.OPCODE_CODE_ADD:self.opcode_add, 
-				opcodes.OPCODE_CODE_SUB:self.opcode_sub, 
-				opcodes.OPCODE_CODE_AND:self.opcode_and, 
-				opcodes.OPCODE_CODE_OR: self.opcode_or,  
-				opcodes.OPCODE_CODE_XOR:self.opcode_xor,
-				opcodes.OPCODE_CODE_MULT:self.opcode_mult,
-				opcodes.OPCODE_CODE_RET:self.opcode_ret,
-				opcodes.OPCODE_CODE_LD:self.opcode_ld, 
-				opcodes.OPCODE_CODE_ST:self.opcode_st, 
-				opcodes.OPCODE_CODE_LDC:self.opcode_ldc, 
-				opcodes.OPCODE_CODE_STC:self.opcode_stc, 
-				opcodes.OPCODE_CODE_LDIO:self.opcode_ldio,
-				opcodes.OPCODE_CODE_STIO:self.opcode_stio,
-				opcodes.OPCODE_CODE_MOVEIMM:self.opcode_mov,
-				opcodes.OPCODE_CODE_SHIFT:self.opcode_shift,
-				opcodes.OPCODE_CODE_EXTRACT:self.opcode_extract,
-				opcodes.OPCODE_CODE_INSERT:self.opcode_insert,
-				opcodes.OPCODE_CODE_CSSVR:self.opcode_ctxswap,
-				opcodes.OPCODE_CODE_HASH:self.opcode_hash,
-				opcodes.OPCODE_CODE_CRCCALC:self.opcode_ramman,
-				opcodes.OPCODE_CODE_BBTX:self.opcode_bbtx,
-				opcodes.OPCODE_CODE_BBMSG:self.opcode_bbmsg,
-				opcodes.OPCODE_CODE_FFI:self.opcode_ffi,
-				opcodes.OPCODE_CODE_ICHECK:self.opcode_chksm,
-				opcodes.OPCODE_CODE_CNTUP:self.opcode_counter,
-				opcodes.OPCODE_CODE_CRYPT:self.opcode_crypt,
-				opcodes.OPCODE_CODE_SIGNEXT:self.opcode_signext,
-				opcodes.OPCODE_CODE_NOP:self.opcode_nop
-				}
-			if op in dict:
-				functionToCall = dict[op]
-				r = functionToCall(opcode,op)
+	def build_dispatch (self):
+		""" 64-entry handler table, indexed by the 6-bit opcode field """
+		handlers = {
+			opcodes.OPCODE_CODE_JMP:self.opcode_jmp,
+			opcodes.OPCODE_CODE_DMARD:self.opcode_dmard,
+			opcodes.OPCODE_CODE_DMAWR:self.opcode_dmawr,
+			opcodes.OPCODE_CODE_DMALU:self.opcode_dmaalu,
+			opcodes.OPCODE_CODE_LJMP:self.opcode_ljmp,
+			opcodes.OPCODE_CODE_BEZ:self.opcode_jmpz,
+			opcodes.OPCODE_CODE_CMPJMP:self.opcode_jmp_cmp,
+			opcodes.OPCODE_CODE_ADD:self.opcode_add, 
+			opcodes.OPCODE_CODE_SUB:self.opcode_sub, 
+			opcodes.OPCODE_CODE_AND:self.opcode_and, 
+			opcodes.OPCODE_CODE_OR: self.opcode_or,  
+			opcodes.OPCODE_CODE_XOR:self.opcode_xor,
+			opcodes.OPCODE_CODE_MULT:self.opcode_mult,
+			opcodes.OPCODE_CODE_RET:self.opcode_ret,
+			opcodes.OPCODE_CODE_LD:self.opcode_ld, 
+			opcodes.OPCODE_CODE_ST:self.opcode_st, 
+			opcodes.OPCODE_CODE_LDC:self.opcode_ldc, 
+			opcodes.OPCODE_CODE_STC:self.opcode_stc, 
+			opcodes.OPCODE_CODE_LDIO:self.opcode_ldio,
+			opcodes.OPCODE_CODE_STIO:self.opcode_stio,
+			opcodes.OPCODE_CODE_MOVEIMM:self.opcode_mov,
+			opcodes.OPCODE_CODE_SHIFT:self.opcode_shift,
+			opcodes.OPCODE_CODE_EXTRACT:self.opcode_extract,
+			opcodes.OPCODE_CODE_INSERT:self.opcode_insert,
+			opcodes.OPCODE_CODE_CSSVR:self.opcode_ctxswap,
+			opcodes.OPCODE_CODE_HASH:self.opcode_hash,
+			opcodes.OPCODE_CODE_CRCCALC:self.opcode_ramman,
+			opcodes.OPCODE_CODE_BBTX:self.opcode_bbtx,
+			opcodes.OPCODE_CODE_BBMSG:self.opcode_bbmsg,
+			opcodes.OPCODE_CODE_FFI:self.opcode_ffi,
+			opcodes.OPCODE_CODE_ICHECK:self.opcode_chksm,
+			opcodes.OPCODE_CODE_CNTUP:self.opcode_counter,
+			opcodes.OPCODE_CODE_CRYPT:self.opcode_crypt,
+			opcodes.OPCODE_CODE_SIGNEXT:self.opcode_signext,
+			opcodes.OPCODE_CODE_NOP:self.opcode_nop
+			}
+		self.dispatch = []
+		for op in range(64):
+			code = opcodes.opcodeCodes[op]
+			if code is None:
+				self.dispatch.append(None)
 			else:
-				print 'Wrong opcode : 0x%x' % (op)
-		return r
+				self.dispatch.append(handlers[code])
+
+	def enable_profile (self):
+		""" count executed opcodes per 6-bit opcode field """
+		self.opcode_counts = [0] * 64
+		for op in range(64):
+			if self.dispatch[op]:
+				self.dispatch[op] = self.profiled_handler(self.dispatch[op])
+		self.nop_opcode = self.decode_opcode(NOP_OPCODE)
+		self.predecode()
+		if self.blocks:
+			self.enable_blocks()
+
+	def profiled_handler (self,handler):
+		counts = self.opcode_counts
+		def count (opcode,op):
+			counts[op] += 1
+			return handler(opcode,op)
+		return count
+
+	def show_profile (self):
+		print "runner %d opcode profile :" % (self.id)
+		for op in range(64):
+			if self.opcode_counts[op]:
+				print "  0x%02x : %d" % (op,self.opcode_counts[op])
+
+	def decode_opcode (self,word):
+		""" predecode one code word : (handler, op, word, fields) """
+		word = int(word)
+		op = ( word >> opcodes.OP_SHIFT ) & opcodes.OP_MASK
+		handler = self.dispatch[op]
+		if handler:
+			return (handler,op,word,opcodes.opcodeDecoders[opcodes.opcodeCodes[op]](word))
+		return (handler,op,word,{})
+
+	def predecode (self):
+		""" decode the whole code segment once, after the object file is loaded """
+		self.decoded_segment = []
+		for i in range(len(self.code_segment)):
+			self.decoded_segment.append(self.decode_opcode(self.code_segment[i]))
+
+	def fetch_opcode (self,ind):
+		""" predecoded opcode at word index ind """
+		opcode = self.decoded_segment[ind]
+		if opcode is None:
+			opcode = self.decode_opcode(self.code_segment[ind])
+			self.decoded_segment[ind] = opcode
+		return opcode
 
-	def opcode_jmp (self,opcode):
+	def execute_opcode (self,opcode,exitstall):
+		""" execute one predecoded opcode """
+		(handler,op,word,fields) = opcode
+		if handler is None:
+			print 'Wrong opcode : 0x%x' % (op)
+			return 0
+		return handler(fields,op)
+
+	def opcode_jmp (self,opcode,op):
 		""" OPCODE = JMP """
 		evaluation = 0
 		execute = 0
-		buff = ''
 		pc = self.pc
 		self.pc += 4
-		jc = opcode[opcodes.jmpOpcode['call'][0]:opcodes.jmpOpcode['call'][1]].unpack('uint:1')[0]
-		if jc == 1 :
-			buff = 'call'
-		else:
-			buff = 'jmp'
-		condition = opcode[opcodes.jmpOpcode['condition'][0]:opcodes.jmpOpcode['condition'][1]].unpack('uint:5')[0]
-		invert = opcode[opcodes.jmpOpcode['invert_condition'][0]:opcodes.jmpOpcode['invert_condition'][1]].unpack('uint:1')[0]
-		set_clr = opcode[opcodes.jmpOpcode['jmp_register'][0]:opcodes.jmpOpcode['jmp_register'][1]].unpack('uint:1')[0]
-		if condition == opcodes.OPCODE_CONDITION_EQUAL:
-			if invert:
-				buff += '!=0\t'
-			else:
-				buff += '=0\t'
-		elif condition == opcodes.OPCODE_CONDITION_LESS:
-			if invert :
-				buff += '<0\t'
-			else:
-				buff += '>=0\t'
-		elif condition == opcodes.OPCODE_CONDITION_GREATER:
-			if invert :
-				buff += '>0\t'
-			else:
-				buff += '<=0\t'
-		elif  set_clr:
-			if invert :
-				buff += '_clr\t'
-			else:
-				buff += '_set\t'			
-			offset = opcode[opcodes.jmpOpcode['condition_bit_offset'][0]:opcodes.jmpOpcode['condition_bit_offset'][1]].unpack('uint:5')[0]			
-		else:
-			buff += '\t'
-		immediate = opcode[opcodes.jmpOpcode['immediate_or_register'][0]:opcodes.jmpOpcode['immediate_or_register'][1]].unpack('uint:1')[0]		
+		jc = opcode['call']
+		condition = opcode['condition']
+		invert = opcode['invert_condition']
+		set_clr = opcode['jmp_register']
+		if set_clr:
+			offset = opcode['condition_bit_offset']			
+		immediate = opcode['immediate_or_register']		
 		if immediate :
-			dst = opcode[opcodes.jmpOpcode['immediate_value'][0]:opcodes.jmpOpcode['immediate_value'][1]].unpack('uint:10')[0]
-			buff += '0x%x\t' % (dst)
+			dst = opcode['immediate_value']
 		else:
-			dst = opcode[opcodes.jmpOpcode['address_register'][0]:opcodes.jmpOpcode['address_register'][1]].unpack('uint:5')[0]
-			buff += 'r%d\t' % (dst)
-		delay_slot = opcode[opcodes.jmpOpcode['execute_delay_slot'][0]:opcodes.jmpOpcode['execute_delay_slot'][1]].unpack('uint:2')[0]	
-		if set_clr:
-			buff += 'r%d\td.%d\t' % (condition,offset)
-			if  delay_slot == 1:
-				buff += 'ds1\t'
-			elif delay_slot == 2:
-				buff += 'ds2\t'
-			if not immediate:	
-				predict = opcode[opcodes.jmpOpcode['update'][0]:opcodes.jmpOpcode['update'][1]].unpack('uint:1')[0]
-				if  predict :
-					buff += 'predict'
-		elif condition != opcodes.OPCODE_CONDITION_ALWAYS :			
-			if  delay_slot == 1:
-				buff += 'ds1\t'
-			elif delay_slot == 2:
-				buff += 'ds2\t'
-			if not immediate:
-				predict = opcode[opcodes.jmpOpcode['update'][0]:opcodes.jmpOpcode['update'][1]].unpack('uint:1')[0]
-				if  predict :
-					buff += 'predict'
+			dst = opcode['address_register']
+		delay_slot = opcode['execute_delay_slot']	
 		if SIMULATE:
 			if not set_clr and not invert and not condition:
 				evaluation = 1
@@ -1013,16 +1271,16 @@ class runner:
 					if jc:
 						self.push_call_stack(( pc + execute * 4 ) & PC_MASK)
 					ind = self.pc//4
-					opcode = BitString(uint=self.code_segment[ind],length=32)
+					opcode = self.fetch_opcode(ind)
 					self.pipe.opcode_ds1 = opcode
 					self.pipe.pc_ds1 = self.pc
 					if execute == 2:
 						ind += 1
-						opcode = BitString(uint=self.code_segment[ind],length=32)
+						opcode = self.fetch_opcode(ind)
 						self.pipe.opcode_ds2 = opcode
 						self.pipe.pc_ds2 = self.pc + 4
 					else:
-						self.pipe.opcode_ds2 = BitString('0xfc000000')
+						self.pipe.opcode_ds2 = self.nop_opcode
 						self.pipe.pc_ds2 = self.pc + 4
 					self.pipe.clock = 2
 				else:
@@ -1032,9 +1290,9 @@ class runner:
 				if evaluation == 1:
 					if jc:
 						self.push_call_stack(( pc - (2 - execute) * 4 ) & PC_MASK)
-					self.pipe.opcode_ds1 = BitString('0xfc000000')
+					self.pipe.opcode_ds1 = self.nop_opcode
 					self.pipe.pc_ds1 = self.pc 
-					self.pipe.opcode_ds2 = BitString('0xfc000000')
+					self.pipe.opcode_ds2 = self.nop_opcode
 					self.pipe.pc_ds2 = self.pc + 4
 					self.pipe.clock = 2
 
@@ -1046,12 +1304,12 @@ class runner:
 					else:
 						jump_address = pc + (dst & 0x1ff ) << 2
 				else:
-					jump_address = self.REGISTER(dst)
+					jump_address = int(self.REGISTER(dst))
 				self.pc = jump_address & PC_MASK
-				self.changes.append(" JUMP: %08X " % (self.pc))
+				self.changes.append(CHANGE_JUMP,0,self.pc)
 		else:
 			evaluation = 1
-		return (evaluation,buff)
+		return evaluation
 		
 	def pop_call_stack(self):
 		print 'pop_call_stack - len=' + str(len(self.call_stack))
@@ -1072,40 +1330,16 @@ class runner:
 		execute = 0
 		pc = self.pc
 		self.pc += 4
-		buff = ''
-		jc = opcode[opcodes.bezOpcode['call'][0]:opcodes.bezOpcode['call'][1]].unpack('uint:1')[0]
-		if jc:
-			buff = 'call'
-		else:
-			buff = 'jmp'
-		immediate = opcode[opcodes.bezOpcode['immediate_or_register'][0]:opcodes.bezOpcode['immediate_or_register'][1]].unpack('uint:1')[0]
-		invert =  opcode[opcodes.bezOpcode['invert_condition'][0]:opcodes.bezOpcode['invert_condition'][1]].unpack('uint:1')[0]
-		if invert:
-			buff += 'nz\t'
-		else:
-			buff += 'z\t'
+		jc = opcode['call']
+		immediate = opcode['immediate_or_register']
+		invert =  opcode['invert_condition']
 		if immediate :
-			dst = opcode[opcodes.bezOpcode['immediate_value'][0]:opcodes.bezOpcode['immediate_value'][1]].unpack('uint:10')[0]
-			buff += '0x%x\t' % (dst)
+			dst = opcode['immediate_value']
 		else:
-			dst = opcode[opcodes.bezOpcode['address_register'][0]:opcodes.bezOpcode['address_register'][1]].unpack('uint:5')[0]
-			buff += 'r%d\t' % (dst)
-		cond = opcode[opcodes.bezOpcode['source_a'][0]:opcodes.bezOpcode['source_a'][1]].unpack('uint:5')[0]
-		buff += 'r%d\t' % (cond)
-		delay_slot = opcode[opcodes.bezOpcode['execute_delay_slot'][0]:opcodes.bezOpcode['execute_delay_slot'][1]].unpack('uint:2')[0]
-		if delay_slot == 1:
-			buff += 'ds1\t'
-		elif delay_slot == 2:
-			buff += 'ds2\t'
-		if not immediate:
-			predict = opcode[opcodes.bezOpcode['update'][0]:opcodes.bezOpcode['update'][1]].unpack('uint:1')[0]
-			if predict:
-				buff += 'predict'
-		size = opcode[opcodes.bezOpcode['size'][0]:opcodes.bezOpcode['size'][1]].unpack('uint:2')[0]
-		if size == opcodes.OPCODE_16MSB:
-			buff += '16msb'
-		elif size == opcodes.OPCODE_16LSB:
-			buff += '16lsb'
+			dst = opcode['address_register']
+		cond = opcode['source_a']
+		delay_slot = opcode['execute_delay_slot']
+		size = opcode['size']
 		if SIMULATE:
 			condition_register = self.REGISTER(cond)
 			if size == opcodes.OPCODE_16MSB:
@@ -1132,16 +1366,16 @@ class runner:
 					if jc:
 						self.push_call_stack ( ( pc + execute * 4 ) & PC_MASK)
 					ind = self.pc//4
-					opcode = BitString(uint=self.code_segment[ind],length=32)
+					opcode = self.fetch_opcode(ind)
 					self.pipe.opcode_ds1 = opcode
 					self.pipe.pc_ds1 = self.pc
 					if execute == 2:
 						ind += 1
-						opcode = BitString(uint=self.code_segment[ind],length=32)
+						opcode = self.fetch_opcode(ind)
 						self.pipe.opcode_ds2 = opcode
 						self.pipe.pc_ds2 = self.pc + 4
 					else:
-						self.pipe.opcode_ds2 = BitString('0xfc000000')
+						self.pipe.opcode_ds2 = self.nop_opcode
 						self.pipe.pc_ds2 = self.pc + 4
 					self.pipe.clock = 2
 				else:
@@ -1151,64 +1385,32 @@ class runner:
 				if evaluation == 1:
 					if jc:
 						self.push_call_stack(( pc - (2 - execute) * 4 ) & PC_MASK)
-					self.pipe.opcode_ds1 = BitString('0xfc000000')
+					self.pipe.opcode_ds1 = self.nop_opcode
 					self.pipe.pc_ds1 = self.pc 
-					self.pipe.opcode_ds2 = BitString('0xfc000000')
+					self.pipe.opcode_ds2 = self.nop_opcode
 					self.pipe.pc_ds2 = self.pc + 4
 					self.pipe.clock = 2
 			if evaluation == 1:
 				jump_address &= PC_MASK 
 				self.pc = jump_address & PC_MASK
-			return (evaluation,buff)
-		return (1,buff)  
+			return evaluation
+		return 1
 
 	def opcode_jmp_cmp (self,opcode,op):
 		evaluation = 0
 		execute = 0
-		buff = 'jmp_cmp\t'
 		pc = self.pc
 		self.pc += 4
-		immediate = opcode[opcodes.cmpjmpOpcode['immediate_or_register'][0]:opcodes.cmpjmpOpcode['immediate_or_register'][1]].unpack('uint:1')[0]
+		immediate = opcode['immediate_or_register']
 		if  immediate :
-			dst = opcode[opcodes.cmpjmpOpcode['immediate_value'][0]:opcodes.cmpjmpOpcode['immediate_value'][1]].unpack('uint:10')[0]
-			buff += '0x%x\t' % (dst)
-		else:
-			dst = opcode[opcodes.cmpjmpOpcode['address_register'][0]:opcodes.cmpjmpOpcode['address_register'][1]].unpack('uint:5')[0]
-			buff += 'r%d\t' % (dst)
-		srca = opcode[opcodes.cmpjmpOpcode['source_a'][0]:opcodes.cmpjmpOpcode['source_a'][1]].unpack('uint:5')[0]
-		buff += 'r%d\t' % (srca)
-		condition = opcode[opcodes.cmpjmpOpcode['operation'][0]:opcodes.cmpjmpOpcode['operation'][1]].unpack('uint:2')[0]
-		invert = opcode[opcodes.cmpjmpOpcode['invert_condition'][0]:opcodes.cmpjmpOpcode['invert_condition'][1]].unpack('uint:1')[0]
-		if condition == opcodes.OPCODE_OPERATION_EQUAL:
-			if invert :
-				buff += '!=\t'
-			else:
-				buff += '==\t'
-		elif condition == opcodes.OPCODE_OPERATION_GREATER:
-			if invert :
-				buff += '<=\t'
-			else:
-				buff += '>\t'
-		elif condition == opcodes.OPCODE_OPERATION_BIT_OR:
-			if invert :
-				buff += '!or\t'
-			else:
-				buff += 'or\t'
-		elif condition == opcodes.OPCODE_OPERATION_BIT_AND:
-			if invert :
-				buff += '!and\t'
-			else:
-				buff += 'and\t'
-		srcb = opcode[opcodes.cmpjmpOpcode['source_b'][0]:opcodes.cmpjmpOpcode['source_b'][1]].unpack('uint:5')[0]
-		bsel = opcode[opcodes.cmpjmpOpcode['bsel'][0]:opcodes.cmpjmpOpcode['bsel'][1]].unpack('uint:1')[0]
-		if bsel :
-			buff += '0x%x\t' % (srcb)
+			dst = opcode['immediate_value']
 		else:
-			buff += 'r%d\t' % (srcb)
-		if not immediate:
-			predict = opcode[opcodes.cmpjmpOpcode['update'][0]:opcodes.cmpjmpOpcode['update'][1]].unpack('uint:1')[0]
-			if predict :
-				buff += 'predict'
+			dst = opcode['address_register']
+		srca = opcode['source_a']
+		condition = opcode['operation']
+		invert = opcode['invert_condition']
+		srcb = opcode['source_b']
+		bsel = opcode['bsel']
 		if SIMULATE:
 			source_a = self.REGISTER(srca)
 			if bsel:
@@ -1251,7 +1453,7 @@ class runner:
 				if evaluation == 1:
 					self.stall_pc.delay_pc = jump_address					
 					ind = self.pc//4
-					opcode = BitString(uint=self.code_segment[ind],length=32)
+					opcode = self.fetch_opcode(ind)
 					self.pipe.opcode_ds1 = opcode
 					self.pipe.pc_ds1 = self.pc
 					self.pipe.clock = 2
@@ -1260,27 +1462,21 @@ class runner:
 				self.stall_pc.delay_pc &= PC_MASK
 			else:
 				if evaluation == 1:	
-					self.pipe.opcode_ds1 = BitString('0xfc000000')
+					self.pipe.opcode_ds1 = self.nop_opcode
 					self.pipe.pc_ds1 = self.pc 					
 					self.pipe.clock = 2
 			if evaluation == 1:
 				self.pc = jump_address & PC_MASK
-			return (evaluation,buff)
-		return (1,buff)
+			return evaluation
+		return 1
 
 	def opcode_ljmp (self,opcode,op):
 		""" OPCODE = LJMP """
-		buff = ''
 		execute = 2
 		pc = self.pc
 		self.pc += 4
-		jc = opcode[opcodes.jmplngOpcode['call'][0]:opcodes.jmplngOpcode['call'][1]].unpack('uint:1')[0]
-		if jc == 1:
-			buff = 'lcall\t'
-		else:
-			buff = 'ljmp\t'
-		dst = opcode[opcodes.jmplngOpcode['immediate_value'][0]:opcodes.jmplngOpcode['immediate_value'][1]].unpack('uint:14')[0]
-		buff += '0x%x' % (dst)
+		jc = opcode['call']
+		dst = opcode['immediate_value']
 		if SIMULATE:
 			jump_address = (dst << 2) & PC_MASK
 			self.stall_pc.delay_pc = jump_address
@@ -1288,14 +1484,70 @@ class runner:
 			if jc == 1:
 				self.push_call_stack ( ( pc + execute * 4 ) & PC_MASK)
 			ind = self.pc // 4
-			opcode = BitString(uint=self.code_segment[ind],length=32)
+			opcode = self.fetch_opcode(ind)
 			self.pipe.opcode_ds1 = opcode
 			self.pipe.pc_ds1 = self.pc
 			self.pipe.clock = 2
 			self.stall_pc.delay_pc &= PC_MASK
 			self.pc = jump_address & PC_MASK
 
-		return (1,buff)
+		return 1
+
+	def execute_dma (self):
+		""" complete the transfers at the head of the DMA FIFO """
+		while self.hw_accelerators.dma_count > 0:
+			d = self.hw_accelerators.dma[self.hw_accelerators.dma_out]
+			if d.clock > self.simulator.clock:
+				return 1
+			self.dma_transfer(d)
+			if d.invoke == 1:
+				self.scheduler.sync_wakeup_request |= 1 << d.thread
+			d.valid = 0
+			self.hw_accelerators.dma_out = ( self.hw_accelerators.dma_out + 1 ) % DMA_FIFO_DEPTH
+			self.hw_accelerators.dma_count -= 1
+			if self.stall == STALL_DMA:
+				# the DMA that found the FIFO full is issued again
+				self.stall = STALL_NORMAL
+				self.pc = self.stall_pc.pc
+				self.changes.append(CHANGE_STALL,0,0)
+		return 1
+
+	def dma_transfer (self,d):
+		""" move the bytes of one DMA between DDR or packet SRAM and the data segment or common memory """
+		if d.mem:
+			external = self.simulator.packet_sram
+		else:
+			external = self.simulator.ddr
+		if d.common_or_private:
+			local = self.simulator.common_segment
+		else:
+			local = self.data_segment
+		if d.sram_to_ddr:
+			(source,destination) = (local,external)
+		else:
+			(source,destination) = (external,local)
+		data = memory.read_bytes(source,d.source,d.length)
+		try:
+			if len(data) != d.length:
+				raise IndexError('read of %d bytes at 0x%x out of memory' % (d.length,d.source))
+			(first,last) = memory.write_bytes(destination,d.destination,data)
+		except IndexError, e:
+			print "ERROR: DMA %s" % (e)
+			return 0
+		if destination is self.data_segment:
+			for word in range(first,last):
+				self.changes.append(CHANGE_SRAM,word * 4,self.data_segment[word])
+				if self.cams.tables:
+					self.cams.touch(self.data_segment,word)
+		elif destination is self.simulator.common_segment:
+			for word in range(first,last):
+				if self.simulator.common_cams.tables:
+					self.simulator.common_cams.touch(self.simulator.common_segment,word)
+				self.simulator.hash_tables.touch(self.simulator.common_segment,lookup.HASH_TABLE_COMMON,word)
+		elif destination is self.simulator.ddr:
+			for word in range(first,last):
+				self.simulator.hash_tables.touch(self.simulator.ddr,lookup.HASH_TABLE_DDR,word)
+		return 1
 
 	def calc_dma_length (self,MIN):
 		min_dma_clock = 0
@@ -1314,13 +1566,13 @@ class runner:
 
 	def dma_ctx_swap (self):
 		ind = self.pc//4
-		opcode = BitString(uint=self.code_segment[ind],length=32)
+		opcode = self.fetch_opcode(ind)
 		self.execute_opcode(opcode,0)
 		if self.stall != STALL_NORMAL:
 			self.stall_pc.delay_pc = self.pc
 			return 0
 		ind = self.pc//4
-		opcode = BitString(uint=self.code_segment[ind],length=32)
+		opcode = self.fetch_opcode(ind)
 		self.execute_opcode(opcode,0)
 		if self.stall != STALL_NORMAL:
 			self.stall_pc.delay_pc = self.pc
@@ -1334,71 +1586,43 @@ class runner:
 			if self.scheduler.save_context == 1:
 				self.context_segment[ind] = self.private_registers[r] 
 			self.private_registers[r] = self.context_segment[ind]
-			self.changes.append(" REG: r%d=%08X " % (reg,self.private_registers[reg]))
+			self.changes.append(CHANGE_REG,r+NUMBER_OF_GLOBAL_REGISTERS,self.private_registers[r])
 		self.scheduler.previous_context = self.scheduler.current_context
 		self.scheduler.current_context = self.scheduler.next_context
-		if self.scheduler.async_enable[self.scheduler.next_context] == 1:
-			self.scheduler.async_wakeup_request_normal[self.scheduler.next_context] = 0
-			self.scheduler.async_wakeup_request_urgent[self.scheduler.next_context] = 0
-			self.scheduler.async_wakeup_request[self.scheduler.next_context] = 0
-			self.scheduler.async_enable[self.scheduler.next_context] = 0
-		else:
-			self.scheduler.async_wakeup_request[self.scheduler.next_context] = 0
+		self.scheduler.clear_wakeup(self.scheduler.next_context)
 		self.scheduler.next_context_valid = 0
 		self.pc = self.private_registers[16] >> 16
 		self.pc &= PC_MASK
-		self.changes.append(" THREAD: %08X " % (self.scheduler.current_context))
+		self.changes.append(CHANGE_THREAD,0,self.scheduler.current_context)
 
 	def opcode_dmard(self,opcode,op):
 		pc = self.pc
 		self.pc += 4
-		buff = 'dma_rd\t'
-		dst = opcode[opcodes.dmaOpcode['source_a'][0]:opcodes.dmaOpcode['source_a'][1]].unpack('uint:5')[0]
-		buff += 'r%d\t' % (dst)
-		srcc = opcode[opcodes.dmaOpcode['source_a'][0]:opcodes.dmaOpcode['source_a'][1]].unpack('uint:5')[0]
-		buff += 'r%d\t' % (srcc)
-		srcb = opcode[opcodes.dmaOpcode['source_b_or_immediate'][0]:opcodes.dmaOpcode['source_b_or_immediate'][1]].unpack('uint:8')[0]
-		immediate = opcode[opcodes.dmaOpcode['immediate_or_register'][0]:opcodes.dmaOpcode['immediate_or_register'][1]].unpack('uint:1')[0]
-		if immediate:
-			buff += '0x%x\t' % ( srcb)
-		else:
-			buff += 'r%d\t' % ( srcb)
-		invoke = opcode[opcodes.dmaOpcode['invoke'][0]:opcodes.dmaOpcode['invoke'][1]].unpack('uint:1')[0]
-		addr_calc = opcode[opcodes.dmaOpcode['addr_calc'][0]:opcodes.dmaOpcode['addr_calc'][1]].unpack('uint:1')[0]
-		mask = opcode[opcodes.dmaOpcode['mask'][0]:opcodes.dmaOpcode['mask'][1]].unpack('uint:1')[0]
-		update = opcode[opcodes.dmaOpcode['update_r16'][0]:opcodes.dmaOpcode['update_r16'][1]].unpack('uint:1')[0]
-		context_swap = opcode[opcodes.dmaOpcode['context_swap'][0]:opcodes.dmaOpcode['context_swap'][1]].unpack('uint:1')[0]
-		async_en = opcode[opcodes.dmaOpcode['async_enable'][0]:opcodes.dmaOpcode['async_enable'][1]].unpack('uint:1')[0]
-		common = opcode[opcodes.dmaOpcode['common_or_private'][0]:opcodes.dmaOpcode['common_or_private'][1]].unpack('uint:1')[0]
-		mem = opcode[opcodes.dmaOpcode['mem'][0]:opcodes.dmaOpcode['mem'][1]].unpack('uint:1')[0]
-		if invoke:
-			buff += 'invoke\t'
-		if mask:
-			buff += 'mask\t'
-		if mem:
-			buff += 'mem\t'				
-		if update:
-			buff += 'update\t'
-		if common:
-			buff += 'common\t'		
-		if addr_calc:
-			buff += 'addr_calc\t'	
-		if context_swap:
-			buff += 'ctx_swap\t'
-		if async_en:
-			buff += 'async_en\t'
+		srca = opcode['source_a']
+		srcc = opcode['source_c']
+		srcb = opcode['source_b_or_immediate']
+		immediate = opcode['immediate_or_register']
+		invoke = opcode['invoke']
+		addr_calc = opcode['addr_calc']
+		mask = opcode['mask']
+		update = opcode['update_r16']
+		context_swap = opcode['context_swap']
+		async_en = opcode['async_enable']
+		common = opcode['common_or_private']
+		mem = opcode['mem']
+		stall = opcode['stall']
 		if SIMULATE:
 			if immediate:
 				length = srcb & 0xff
 			else:
-				length = self.REGISTER(srcb)  & 0xff
+				length = int(self.REGISTER(srcb))  & 0xff
 			if self.hw_accelerators.dma_count < DMA_FIFO_DEPTH:
 				min_dma_clock = self.calc_dma_length(DMA_DDR_TO_SRAM_MIN)
 				self.hw_accelerators.dma [ self.hw_accelerators.dma_in ].clock = self.hw_accelerator_clock( min_dma_clock, ( DMA_DDR_TO_SRAM_MAX - DMA_DDR_TO_SRAM_MIN ) + min_dma_clock)
 				self.hw_accelerators.dma [ self.hw_accelerators.dma_in ].thread = self.scheduler.current_context
 				self.hw_accelerators.dma [ self.hw_accelerators.dma_in ].invoke = invoke
 				self.hw_accelerators.dma [ self.hw_accelerators.dma_in ].sram_to_ddr = 0
-				self.hw_accelerators.dma [ self.hw_accelerators.dma_in ].destination = self.REGISTER(srcc) & 0xffff
+				self.hw_accelerators.dma [ self.hw_accelerators.dma_in ].destination = int(self.REGISTER(srcc)) & 0xffff
 				self.hw_accelerators.dma [ self.hw_accelerators.dma_in ].common_or_private = common
 				self.hw_accelerators.dma [ self.hw_accelerators.dma_in ].mem = mem
 				self.hw_accelerators.dma [ self.hw_accelerators.dma_in ].mask = mask
@@ -1407,96 +1631,74 @@ class runner:
 					if self.hw_accelerators.dma [ self.hw_accelerators.dma_in ].mem == 0:
 						self.hw_accelerators.dma [ self.hw_accelerators.dma_in ].source = \
 						BPM_BUFFERS_BASE + DDR_BUFFER_PAYLOAD_OFFSET + \
-						( self.REGISTER(srca) & 0x00001FFF ) * PACKET_DDR_BUFFER_SIZE
+						( int(self.REGISTER(srca)) & 0x00001FFF ) * PACKET_DDR_BUFFER_SIZE
 					else:
 						self.hw_accelerators.dma [ self.hw_accelerators.dma_in ].source = \
-						( self.REGISTER(srca) & 0x0000FFF ) * PACKET_SRAM_BUFFER_SIZE
+						( int(self.REGISTER(srca)) & 0x0000FFF ) * PACKET_SRAM_BUFFER_SIZE
 				else:
 					self.hw_accelerators.dma [ self.hw_accelerators.dma_in ].source = \
-						self.REGISTER(srca) & 0x03FFFFFF
+						int(self.REGISTER(srca)) & 0x03FFFFFF
 				self.hw_accelerators.dma [ self.hw_accelerators.dma_in ].length = length
 				self.hw_accelerators.dma [ self.hw_accelerators.dma_in ].dmalu = False
 				self.hw_accelerators.dma [ self.hw_accelerators.dma_in ].valid = 1
+				# queued before the delay slots run : a stall in them returns early
+				self.hw_accelerators.dma_count += 1
+				self.hw_accelerators.dma_in = ( self.hw_accelerators.dma_in + 1 ) % DMA_FIFO_DEPTH
+				if self.max_dma_fifo < self.hw_accelerators.dma_count:
+					self.max_dma_fifo = self.hw_accelerators.dma_count
 				if async_en:
-					self.scheduler.async_enable[self.scheduler.current_context] = 1
+					self.scheduler.async_enable |= 1 << self.scheduler.current_context
 				if update:
 					self.private_registers[16] = ( self.private_registers[16] & 0xffff ) \
 					| ( (( self.pc + 4 ) & PC_MASK) << 16 )
 					if self.scheduler.next_context_valid == 0:
-						self.changes.append(" REG: r16=%08X " % (self.private_registers[16]))
+						self.changes.append(CHANGE_REG,16,self.private_registers[16])
 				if context_swap:
 					if not self.dma_ctx_swap():
-						return (1,buff)
+						return 1
 					if self.scheduler.next_context_valid == 1:
 						self.dma_context_valid()
 				else:
 					self.stall_pc.enter_stall = self.simulator.clock
 					self.stall = STALL_NO_CONTEXT
 					self.scheduler.save_context = 1
-					self.changes.append(" STALL: 1 ")
+					self.changes.append(CHANGE_STALL,0,1)
 				self.show_scheduler("after DMA_RD")
-				self.hw_accelerators.dma_count += 1
-				self.hw_accelerators.dma_in = ( self.hw_accelerators.dma_in + 1 ) % DMA_FIFO_DEPTH
-				if self.max_dma_fifo < self.hw_accelerators.dma_count:
-					self.max_dma_fifo = self.hw_accelerators.dma_count
 			else:
 				self.stall_pc.enter_stall = self.simulator.clock
 				self.stall = STALL_DMA
 				self.stall_pc.pc = pc
-				self.changes.append(" STALL: 1 ")
+				self.changes.append(CHANGE_STALL,0,1)
 
-		return (1,buff)
+		return 1
 	
 	def opcode_dmawr(self,opcode,op):
 		pc = self.pc
 		self.pc += 4
-		buff = 'dma_wr\t'
-		dst = opcode[opcodes.dmaOpcode['source_a'][0]:opcodes.dmaOpcode['source_a'][1]].unpack('uint:5')[0]
-		buff += 'r%d\t' % (dst)
-		srcc = opcode[opcodes.dmaOpcode['source_a'][0]:opcodes.dmaOpcode['source_a'][1]].unpack('uint:5')[0]
-		buff += 'r%d\t' % (srcc)
-		srcb = opcode[opcodes.dmaOpcode['source_b_or_immediate'][0]:opcodes.dmaOpcode['source_b_or_immediate'][1]].unpack('uint:8')[0]
-		immediate = opcode[opcodes.dmaOpcode['immediate_or_register'][0]:opcodes.dmaOpcode['immediate_or_register'][1]].unpack('uint:1')[0]
-		if immediate:
-			buff += '0x%x\t' % ( srcb)
-		else:
-			buff += 'r%d\t' % ( srcb)
-		invoke = opcode[opcodes.dmaOpcode['invoke'][0]:opcodes.dmaOpcode['invoke'][1]].unpack('uint:1')[0]
-		addr_calc = opcode[opcodes.dmaOpcode['addr_calc'][0]:opcodes.dmaOpcode['addr_calc'][1]].unpack('uint:1')[0]
-		mask = opcode[opcodes.dmaOpcode['mask'][0]:opcodes.dmaOpcode['mask'][1]].unpack('uint:1')[0]
-		update = opcode[opcodes.dmaOpcode['update_r16'][0]:opcodes.dmaOpcode['update_r16'][1]].unpack('uint:1')[0]
-		context_swap = opcode[opcodes.dmaOpcode['context_swap'][0]:opcodes.dmaOpcode['context_swap'][1]].unpack('uint:1')[0]
-		async_en = opcode[opcodes.dmaOpcode['async_enable'][0]:opcodes.dmaOpcode['async_enable'][1]].unpack('uint:1')[0]
-		common = opcode[opcodes.dmaOpcode['common_or_private'][0]:opcodes.dmaOpcode['common_or_private'][1]].unpack('uint:1')[0]
-		mem = opcode[opcodes.dmaOpcode['mem'][0]:opcodes.dmaOpcode['mem'][1]].unpack('uint:1')[0]
-		if invoke:
-			buff += 'invoke\t'
-		if mask:
-			buff += 'mask\t'
-		if mem:
-			buff += 'mem\t'				
-		if update:
-			buff += 'update\t'
-		if common:
-			buff += 'common\t'		
-		if addr_calc:
-			buff += 'addr_calc\t'	
-		if context_swap:
-			buff += 'ctx_swap\t'
-		if async_en:
-			buff += 'async_en\t'
+		srca = opcode['source_a']
+		srcc = opcode['source_c']
+		srcb = opcode['source_b_or_immediate']
+		immediate = opcode['immediate_or_register']
+		invoke = opcode['invoke']
+		addr_calc = opcode['addr_calc']
+		mask = opcode['mask']
+		update = opcode['update_r16']
+		context_swap = opcode['context_swap']
+		async_en = opcode['async_enable']
+		common = opcode['common_or_private']
+		mem = opcode['mem']
 		if SIMULATE:
 			if immediate:
 				length = srcb & 0xff
 			else:
-				length = self.REGISTER(srcb)  & 0xff
+				length = int(self.REGISTER(srcb))  & 0xff
 			if self.hw_accelerators.dma_count < DMA_FIFO_DEPTH:
 				min_dma_clock = self.calc_dma_length(DMA_SRAM_TO_DDR_MIN)
 				self.hw_accelerators.dma [ self.hw_accelerators.dma_in ].clock = self.hw_accelerator_clock( min_dma_clock, ( DMA_SRAM_TO_DDR_MAX - DMA_SRAM_TO_DDR_MIN ) + min_dma_clock)
 				self.hw_accelerators.dma [ self.hw_accelerators.dma_in ].thread = self.scheduler.current_context
 				self.hw_accelerators.dma [ self.hw_accelerators.dma_in ].invoke = invoke
 				self.hw_accelerators.dma [ self.hw_accelerators.dma_in ].sram_to_ddr = 1
-				self.hw_accelerators.dma [ self.hw_accelerators.dma_in ].destination = self.REGISTER(srcc) & 0xffff
+				self.hw_accelerators.dma [ self.hw_accelerators.dma_in ].destination = int(self.REGISTER(srcc)) & 0xffff
 				self.hw_accelerators.dma [ self.hw_accelerators.dma_in ].common_or_private = common
 				self.hw_accelerators.dma [ self.hw_accelerators.dma_in ].mem = mem
 				self.hw_accelerators.dma [ self.hw_accelerators.dma_in ].mask = mask
@@ -1504,88 +1706,69 @@ class runner:
 					if self.hw_accelerators.dma [ self.hw_accelerators.dma_in ].mem == 0:
 						self.hw_accelerators.dma [ self.hw_accelerators.dma_in ].destination = \
 						BPM_BUFFERS_BASE + DDR_BUFFER_PAYLOAD_OFFSET + \
-						( self.REGISTER(srca) & 0x00001FFF ) * PACKET_DDR_BUFFER_SIZE
+						( int(self.REGISTER(srca)) & 0x00001FFF ) * PACKET_DDR_BUFFER_SIZE
 					else:
 						self.hw_accelerators.dma [ self.hw_accelerators.dma_in ].destination = \
-						( self.REGISTER(srca) & 0x0000FFF ) * PACKET_SRAM_BUFFER_SIZE
+						( int(self.REGISTER(srca)) & 0x0000FFF ) * PACKET_SRAM_BUFFER_SIZE
 				else:
 					self.hw_accelerators.dma [ self.hw_accelerators.dma_in ].destination = \
-						self.REGISTER(srca) & 0x03FFFFFF
+						int(self.REGISTER(srca)) & 0x03FFFFFF
 				self.hw_accelerators.dma [ self.hw_accelerators.dma_in ].source = \
-						self.REGISTER(srcc) & 0x0000FFFF
+						int(self.REGISTER(srcc)) & 0x0000FFFF
 				self.hw_accelerators.dma [ self.hw_accelerators.dma_in ].length = length
 				self.hw_accelerators.dma [ self.hw_accelerators.dma_in ].dmalu = False
 				self.hw_accelerators.dma [ self.hw_accelerators.dma_in ].valid = 1
+				# queued before the delay slots run : a stall in them returns early
+				self.hw_accelerators.dma_count += 1
+				self.hw_accelerators.dma_in = ( self.hw_accelerators.dma_in + 1 ) % DMA_FIFO_DEPTH
+				if self.max_dma_fifo < self.hw_accelerators.dma_count:
+					self.max_dma_fifo = self.hw_accelerators.dma_count
 				if async_en:
-					self.scheduler.async_enable[self.scheduler.current_context] = 1
+					self.scheduler.async_enable |= 1 << self.scheduler.current_context
 				if mask:
-					self.scheduler.async_enable[self.scheduler.current_context] = 1
+					self.scheduler.async_enable |= 1 << self.scheduler.current_context
 				if update:
 					self.private_registers[16] = ( self.private_registers[16] & 0xffff ) \
 					| ( (( self.pc + 4 ) & PC_MASK) << 16 )
 					if self.scheduler.next_context_valid == 0:
-						self.changes.append(" REG: r16=%08X " % (self.private_registers[16]))
+						self.changes.append(CHANGE_REG,16,self.private_registers[16])
 				if context_swap:
 					if not self.dma_ctx_swap():
-						return (1,buff)
+						return 1
 					if self.scheduler.next_context_valid == 1:
 						self.dma_context_valid()
 				else:
 					self.stall_pc.enter_stall = self.simulator.clock
 					self.stall = STALL_NO_CONTEXT
 					self.scheduler.save_context = 1
-					self.changes.append(" STALL: 1 ")
+					self.changes.append(CHANGE_STALL,0,1)
 				self.show_scheduler("after DMA_WR")
-				self.hw_accelerators.dma_count += 1
-				self.hw_accelerators.dma_in = ( self.hw_accelerators.dma_in + 1 ) % DMA_FIFO_DEPTH
-				if self.max_dma_fifo < self.hw_accelerators.dma_count:
-					self.max_dma_fifo = self.hw_accelerators.dma_count
 			else:
 				self.stall_pc.enter_stall = self.simulator.clock
 				self.stall = STALL_DMA
 				self.stall_pc.pc = pc
-				self.changes.append(" STALL: 1 ")
-		return (1,buff)
+				self.changes.append(CHANGE_STALL,0,1)
+		return 1
 
-	def opcode_dmaalu (self,opcode):
+	def opcode_dmaalu (self,opcode,op):
 		pc = self.pc
 		self.pc += 4
-		buff = 'dma_lkup\t'
-		srca = opcode[opcodes.dmaaluOpcode['source_a'][0]:opcodes.dmaaluOpcode['source_a'][1]].unpack('uint:5')[0]
-		srcc = opcode[opcodes.dmaaluOpcode['source_c'][0]:opcodes.dmaaluOpcode['source_c'][1]].unpack('uint:5')[0]
-		srcb = opcode[opcodes.dmaaluOpcode['source_b'][0]:opcodes.dmaaluOpcode['source_b'][1]].unpack('uint:5')[0]
-		buff += 'r%d\tr%d\t' % (srca,srcc)
-		immediate = opcode[opcodes.dmaaluOpcode['immediate_or_register'][0]:opcodes.dmaaluOpcode['immediate_or_register'][1]].unpack('uint:1')[0]
-		if immediate:
-			buff += '0x%x\t' % (srcb)
-		else:
-			buff += 'r%d\t' % (srcb)
-		rs = opcode[opcodes.dmaaluOpcode['res_slot'][0]:opcodes.dmaaluOpcode['res_slot'][1]].unpack('uint:3')[0]
-		buff += '0x%x\t' % (rs)
-		invoke = opcode[opcodes.dmaaluOpcode['invoke'][0]:opcodes.dmaaluOpcode['invoke'][1]].unpack('uint:1')[0]
-		mask = opcode[opcodes.dmaaluOpcode['mask'][0]:opcodes.dmaaluOpcode['mask'][1]].unpack('uint:1')[0]
-		update = opcode[opcodes.dmaaluOpcode['update_r16'][0]:opcodes.dmaaluOpcode['update_r16'][1]].unpack('uint:1')[0]
-		context_swap = opcode[opcodes.dmaaluOpcode['context_swap'][0]:opcodes.dmaaluOpcode['context_swap'][1]].unpack('uint:1')[0]
-		async_en = opcode[opcodes.dmaaluOpcode['async_enable'][0]:opcodes.dmaaluOpcode['async_enable'][1]].unpack('uint:1')[0]
-		common = opcode[opcodes.dmaaluOpcode['common_or_private'][0]:opcodes.dmaaluOpcode['common_or_private'][1]].unpack('uint:1')[0]
-		mem = opcode[opcodes.dmaaluOpcode['mem'][0]:opcodes.dmaaluOpcode['mem'][1]].unpack('uint:1')[0]
-		if invoke:
-			buff += 'invoke\t'		
-		if mask:
-			buff += 'mask\t'
-		if update:
-			buff += 'update\t'
-		if context_swap:
-			buff += 'ctx_swap\t'
-		if async_en:
-			buff += 'async_en\t'
-		if common:
-			buff += 'common\t'
-		if mem:
-			buff += 'sram\t'
+		srca = opcode['source_a']
+		srcc = opcode['source_c']
+		srcb = opcode['source_b_or_immediate']
+		immediate = opcode['immediate_or_register']
+		res_slot = opcode['res_slot']
+		global_mask = opcode['global_mask']
+		invoke = opcode['invoke']
+		mask = opcode['mask']
+		update = opcode['update_r16']
+		context_swap = opcode['context_swap']
+		async_en = opcode['async_enable']
+		common = opcode['common_or_private']
+		mem = opcode['mem']
 		if SIMULATE:
 			if not immediate:
-				length = self.REGISTER(srcb) & 0xff
+				length = int(self.REGISTER(srcb)) & 0xff
 			else:
 				length = srcb & 0xff
 			if self.hw_accelerators.dma_count < DMA_FIFO_DEPTH:
@@ -1595,87 +1778,53 @@ class runner:
 				self.hw_accelerators.dma [ self.hw_accelerators.dma_in ].invoke = invoke
 				self.hw_accelerators.dma [ self.hw_accelerators.dma_in ].dmalu = True
 				self.hw_accelerators.dma [ self.hw_accelerators.dma_in ].sram_to_ddr = 0
-				self.hw_accelerators.dma [ self.hw_accelerators.dma_in ].destination = self.REGISTER(srcc) & 0xffff
-				self.hw_accelerators.dma [ self.hw_accelerators.dma_in ].source = self.REGISTER(srca) & 0x03ffffff
+				self.hw_accelerators.dma [ self.hw_accelerators.dma_in ].destination = int(self.REGISTER(srcc)) & 0xffff
+				self.hw_accelerators.dma [ self.hw_accelerators.dma_in ].source = int(self.REGISTER(srca)) & 0x03ffffff
 				self.hw_accelerators.dma [ self.hw_accelerators.dma_in ].common_or_private = common
 				self.hw_accelerators.dma [ self.hw_accelerators.dma_in ].mem = mem
-				self.hw_accelerators.dma [ self.hw_accelerators.dma_in ].global_mask = mask
+				self.hw_accelerators.dma [ self.hw_accelerators.dma_in ].mask = mask
+				self.hw_accelerators.dma [ self.hw_accelerators.dma_in ].global_mask = global_mask
 				self.hw_accelerators.dma [ self.hw_accelerators.dma_in ].res_slot = res_slot
 				self.hw_accelerators.dma [ self.hw_accelerators.dma_in ].valid = 1
+				# queued before the delay slots run : a stall in them returns early
+				self.hw_accelerators.dma_count += 1
+				self.hw_accelerators.dma_in = ( self.hw_accelerators.dma_in + 1 ) % DMA_FIFO_DEPTH
+				if self.max_dma_fifo < self.hw_accelerators.dma_count:
+					self.max_dma_fifo = self.hw_accelerators.dma_count
 				if async_en:
-					self.scheduler.async_enable[self.scheduler.current_context] = 1
+					self.scheduler.async_enable |= 1 << self.scheduler.current_context
 				if update:
 					self.private_registers[16] = ( self.private_registers[16] & 0xffff ) \
 					| ( (( self.pc + 4 ) & PC_MASK) << 16 )
 					if self.scheduler.next_context_valid == 0:
-						self.changes.append(" REG: r16=%08X " % (self.private_registers[16]))
+						self.changes.append(CHANGE_REG,16,self.private_registers[16])
 				if context_swap:
 					if not self.dma_ctx_swap():
-						return (1,buff)
+						return 1
 					if self.scheduler.next_context_valid == 1:
 						self.dma_context_valid()
 				else:
 					self.stall_pc.enter_stall = self.simulator.clock
 					self.stall = STALL_NO_CONTEXT
 					self.scheduler.save_context = 1
-					self.changes.append(" STALL: 1 ")
+					self.changes.append(CHANGE_STALL,0,1)
 				self.show_scheduler("after DMA_LKP")
-				self.hw_accelerators.dma_count += 1
-				self.hw_accelerators.dma_in = ( self.hw_accelerators.dma_in + 1 ) % DMA_FIFO_DEPTH
-				if self.max_dma_fifo < self.hw_accelerators.dma_count:
-					self.max_dma_fifo = self.hw_accelerators.dma_count
 			else:
 				self.stall_pc.enter_stall = self.simulator.clock
 				self.stall = STALL_DMA
 				self.stall_pc.pc = pc
-				self.changes.append(" STALL: 1 ")
-		return (1,buff)
+				self.changes.append(CHANGE_STALL,0,1)
+		return 1
 
-	def disassembly_alu(self,opcode,op):
+	def execute_alu (self,opcode,op):
 		self.pc += 4
-		buff = 'alu\t'
-		dst = opcode[opcodes.aluOpcode['destination_register'][0]:opcodes.aluOpcode['destination_register'][1]].unpack('uint:5')[0]	
-		buff += 'r%d\t' % (dst)
-		srca = opcode[opcodes.aluOpcode['source_a'][0]:opcodes.aluOpcode['source_a'][1]].unpack('uint:5')[0]
-		buff += 'r%d\t' % (srca)
-		invert = opcode[opcodes.aluOpcode['invert_source'][0]:opcodes.aluOpcode['invert_source'][1]].unpack('uint:1')[0]
-		srcb = opcode[opcodes.aluOpcode['source_b_or_immediate'][0]:opcodes.aluOpcode['source_b_or_immediate'][1]].unpack('uint:8')[0]
-		immediate = opcode[opcodes.aluOpcode['immediate_or_register'][0]:opcodes.aluOpcode['immediate_or_register'][1]].unpack('uint:1')[0]
-		update_flags = opcode[opcodes.aluOpcode['update_flags'][0]:opcodes.aluOpcode['update_flags'][1]].unpack('uint:1')[0]
-		shift = opcode[opcodes.aluOpcode['byte_shift'][0]:opcodes.aluOpcode['byte_shift'][1]].unpack('uint:3')[0]		
-		if shift == opcodes.OPCODE_BYTE_SHIFT_LEFT_1:
-			buff += '<<8'
-		elif shift == opcodes.OPCODE_BYTE_SHIFT_LEFT_2:
-			buff += '<<16'
-		elif shift == opcodes.OPCODE_BYTE_SHIFT_LEFT_3:
-			buff += '<<24'
-		elif shift == opcodes.OPCODE_BYTE_SHIFT_RIGHT_1:
-			buff += '>>8'
-		elif shift == opcodes.OPCODE_BYTE_SHIFT_RIGHT_2:
-			buff += '>>16'
-		elif shift == opcodes.OPCODE_BYTE_SHIFT_RIGHT_3:
-			buff += '>>24'
-		elif not update_flags:
-			buff += 'bypass_flags'
-		if op == opcodes.OPCODE_CODE_ADD:
-			buff += '+'
-		elif op == opcodes.OPCODE_CODE_SUB:
-			buff += '-'
-		elif op == opcodes.OPCODE_CODE_MULT:
-			buff += '*'
-		elif op == opcodes.OPCODE_CODE_AND:
-			buff += 'and'
-		elif op == opcodes.OPCODE_CODE_OR:
-			buff += 'or'
-		else:
-			buff += 'xor'
-		if invert:
-			buff += '~'
-		buff +='\t'
-		if immediate :
-			buff += 'd.%d\t' % (srcb)
-		else:
-			buff += 'r%d\t' % (srcb)
+		dst = opcode['destination_register']	
+		srca = opcode['source_a']
+		invert = opcode['invert_source']
+		srcb = opcode['source_b_or_immediate']
+		immediate = opcode['immediate_or_register']
+		update_flags = opcode['update_flags']
+		shift = opcode['byte_shift']		
 		if SIMULATE:
 			old_value = self.REGISTER(dst)
 			source_a = self.REGISTER(srca)
@@ -1724,24 +1873,129 @@ class runner:
 				if self.N_FLAG_IS_SET(new_st) != self.CY_FLAG_IS_SET(new_st):
 					new_st |= OVF_FLAG
 				self.st = new_st
-				self.changes.append(" ST: 0x%08X " % (new_st))
-			self.changes.append(" REG: r%d=0x%08X " % (dst,new_value))
-
-		return buff
+				self.changes.append(CHANGE_ST,0,new_st)
+			self.changes.append(CHANGE_REG,dst,new_value)
+		return 1
 
 	def opcode_add (self,opcode,op):
 		""" OPCODE = ALU """
-		return self.disassembly_alu(opcode,op)       
+		return self.execute_alu(opcode,op)
 	def opcode_sub (self,opcode,op):
-		return self.disassembly_alu(opcode,op)       
+		return self.execute_alu(opcode,op)
 	def opcode_and (self,opcode,op):
-		return self.disassembly_alu(opcode,op)       
+		return self.execute_alu(opcode,op)
 	def opcode_or (self,opcode,op):
-		return self.disassembly_alu(opcode,op)        
+		return self.execute_alu(opcode,op)
 	def opcode_xor (self,opcode,op):
-		return disassembly_alu(opcode,op)       
+		return self.execute_alu(opcode,op)
 	def opcode_mult (self,opcode,op):
-		return self.disassembly_alu(opcode,op)  
+		return self.execute_alu(opcode,op)
+
+	def register_slot (self,r):
+		""" (private, index) of register r as REGISTER reads it : None past the private registers """
+		if r & 0xf < NUMBER_OF_GLOBAL_REGISTERS:
+			return (0,r & 0xf)
+		ind = (r - NUMBER_OF_GLOBAL_REGISTERS) & 0x3f
+		if ind < NUMBER_OF_PRIVATE_REGISTERS:
+			return (1,ind)
+		return None
+
+	def block_step (self,opcode):
+		""" a function of no arguments running a predecoded opcode for the untraced blocks : the
+			fields are looked at once, and no change records are made. the handler itself where
+			the opcode is not an ALU, MOV or NOP one, a register is out of range or the opcodes
+			are being counted """
+		(handler,op,word,fields) = opcode
+		step = None
+		if SIMULATE and not self.opcode_counts:
+			if op in ALU_STEPS:
+				step = self.alu_step(fields,op)
+			elif op == opcodes.OPCODE_CODE_MOVEIMM:
+				step = self.mov_step(fields)
+			elif op == opcodes.OPCODE_CODE_NOP:
+				step = self.nop_step
+		if step is None:
+			step = lambda: handler(fields,op)
+		return step
+
+	def alu_step (self,opcode,op):
+		""" execute_alu for one opcode ; an immediate source b is shifted and inverted once """
+		dst = opcode['destination_register']
+		srca = self.register_slot(opcode['source_a'])
+		srcb = opcode['source_b_or_immediate']
+		invert = opcode['invert_source']
+		immediate = opcode['immediate_or_register']
+		update_flags = opcode['update_flags']
+		shift = ALU_SHIFTS.get(opcode['byte_shift'],0)
+		if not immediate:
+			srcb = self.register_slot(srcb)
+		target = self.register_slot(dst)
+		if srca is None or srcb is None or target is None:
+			return None
+		if immediate:
+			srcb = alu_shift(srcb,shift,invert)
+		operation = ALU_STEPS[op]
+		runner = self
+		def step ():
+			runner.pc += 4
+			registers = ( runner.global_registers,runner.private_registers )
+			source_a = registers[srca[0]][srca[1]]
+			if immediate:
+				source_b = srcb
+			else:
+				source_b = registers[srcb[0]][srcb[1]]
+				if shift or invert:
+					source_b = alu_shift(source_b,shift,invert)
+			new_value = operation(source_a,source_b)
+			new_st = runner.st & 0xFFFFFFF0
+			if dst > 0:
+				try:
+					registers[target[0]][target[1]] = new_value
+				except OverflowError:
+					registers[target[0]][target[1]] = unsigned(new_value)
+					new_st |= OVF_FLAG
+			if update_flags:
+				if new_value == 0:
+					new_st |= Z_FLAG
+				if new_value & 0x80000000 != 0:
+					new_st |= N_FLAG
+				if new_value > 0xFFFFFFFF:
+					new_st |= CY_FLAG
+				if ( new_st & N_FLAG == N_FLAG ) != ( new_st & CY_FLAG == CY_FLAG ):
+					new_st |= OVF_FLAG
+				runner.st = new_st
+		return step
+
+	def mov_step (self,opcode):
+		""" opcode_mov for one opcode """
+		dst = opcode['destination_register']
+		immediate = opcode['immediate_value']
+		high = opcode['high_or_low']
+		clear = opcode['clear']
+		target = self.register_slot(dst)
+		if target is None:
+			return None
+		if high:
+			immediate <<= 16
+		runner = self
+		def step ():
+			runner.pc += 4
+			if dst > 0:
+				registers = ( runner.global_registers,runner.private_registers )[target[0]]
+				if clear:
+					new_value = immediate
+				elif high:
+					new_value = ( immediate & 0xffff0000 ) | ( registers[target[1]] & 0x0000ffff )
+				else:
+					new_value = ( immediate & 0x0000ffff ) | ( registers[target[1]] & 0xffff0000 )
+				try:
+					registers[target[1]] = new_value
+				except OverflowError:
+					registers[target[1]] = unsigned(new_value)
+		return step
+
+	def nop_step (self):
+		self.pc += 4
 
 	def opcode_ret (self,opcode,op):
 		""" OPCODE = RET """
@@ -1750,52 +2004,34 @@ class runner:
 		print 'ret: 0x%x ' % (pc)
 		if SIMULATE:
 			ind = self.pc//4
-			opcode = BitString(uint=self.code_segment[ind],length=32)
+			opcode = self.fetch_opcode(ind)
 			self.pipe.opcode_ds1 = opcode
 			self.pipe.pc_ds1 = self.pc
 			ind += 1
-			opcode = BitString(uint=self.code_segment[ind],length=32)
+			opcode = self.fetch_opcode(ind)
 			self.pipe.opcode_ds2 = opcode
 			self.pipe.pc_ds2 = self.pc + 4			
 			self.pipe.clock = 2
 			jump_address = self.pop_call_stack()
 			self.stall_pc.delay_pc = jump_address
 			self.pc = jump_address
-		return (1,'ret') 
+		return 1
 
-	def disassembly_ld (self,opcode,op):
+	def execute_ld (self,opcode,op):
 		self.pc += 4
-		buff = ''
-		size = opcode[opcodes.ldOpcode['size'][0]:opcodes.ldOpcode['size'][1]].unpack('uint:2')[0]
-		if size == opcodes.OPCODE_SIZE_16:
-			buff += '16\t'
-		elif size == opcodes.OPCODE_SIZE_32:
-			buff += '32\t'
-		elif size == opcodes.OPCODE_SIZE_64:
-			buff += '64\t'
-		else:
-			buff += '8\t'
-		dst = opcode[opcodes.ldOpcode['destination_register'][0]:opcodes.ldOpcode['destination_register'][1]].unpack('uint:5')[0]	
-		buff += 'r%d\t' % (dst)
-		direct = opcode[opcodes.ldOpcode['direct_or_index'][0]:opcodes.ldOpcode['direct_or_index'][1]].unpack('uint:1')[0]
-		immediate = opcode[opcodes.ldOpcode['immediate_or_register'][0]:opcodes.ldOpcode['immediate_or_register'][1]].unpack('uint:1')[0]
-		high = opcode[opcodes.ldOpcode['high_or_low'][0]:opcodes.ldOpcode['high_or_low'][1]].unpack('uint:1')[0]	
+		size = opcode['size']
+		dst = opcode['destination_register']	
+		direct = opcode['direct_or_index']
+		immediate = opcode['immediate_or_register']
+		high = opcode['high_or_low']	
 		if direct:
-			immed = opcode[opcodes.ldOpcode['base_address'][0]:opcodes.ldOpcode['base_address'][1]].unpack('uint:5')[0]
-			buff += 'r%d\t' % (immed)
-			offset = opcode[opcodes.ldOpcode['offset'][0]:opcodes.ldOpcode['offset'][1]].unpack('uint:11')[0]
-			if immed:
-				buff += '0x%x\t' % (offset)
+			immed = opcode['base_address']
+			offset = opcode['offset']
 		else:
 			if immediate: 
-				immed = opcode[opcodes.ldOpcode['immediate'][0]:opcodes.ldOpcode['immediate'][1]].unpack('uint:16')[0]
-				buff += '0x%x\t' % (immed)
+				immed = opcode['immediate']
 			else:
-				immed = opcode[opcodes.ldOpcode['base_address'][0]:opcodes.ldOpcode['base_address'][1]].unpack('uint:5')[0]
-				buff += 'r%d\t' % (immed)
-		if direct and not immed:
-			if high :
-				buff += 'high'
+				immed = opcode['base_address']
 		if SIMULATE:
 			if direct:
 				if immed:
@@ -1822,8 +2058,8 @@ class runner:
 				else:
 					immed = immed & 0xffff0000 
 			if immed >= DATA_SEGMENT_SIZE:
-				self.changes.append("ERROR: SRAM access violation on load/store from/to 0x%x" % (immed))
-				return (0,buff)
+				self.changes.append(CHANGE_SRAM_VIOLATION,immed,0)
+				return 0
 			self.show_ram ("Before ld", immed )
 			if op == opcodes.OPCODE_CODE_LD or op == opcodes.OPCODE_CODE_LDC:
 				old_value = self.REGISTER(dst)
@@ -1856,10 +2092,10 @@ class runner:
 					new_value = nw[1]
 					if dst > 0:
 						self.SET_REGISTER(dst,new_value)
-						self.changes.append( " REG: r%d=0x%08X " % (dst,new_value))
+						self.changes.append(CHANGE_REG,dst,new_value)
 						if size == opcodes.OPCODE_SIZE_64:
 							self.SET_REGISTER(dst+1,new_value1)
-							self.changes.append( " REG: r%d=0x%08X " % (dst+1,new_value1))
+							self.changes.append(CHANGE_REG,dst+1,new_value1)
 				else:
 					print ("EROOR")
 			else: # store
@@ -1895,31 +2131,27 @@ class runner:
 				if ov[0]:
 					old_value = ov[1]
 					self.show_ram ("After st", immed )
-					self.changes.append( " SRAM: word %08X=%08X " % (immed,new_value))
+					self.changes.append(CHANGE_SRAM,immed,new_value)
 					if size == opcodes.OPCODE_SIZE_64:
-						self.changes.append( " SRAM: word %08X=%08X  SRAM: word %08X=%08X " % (immed,new_value,immed+4,new_value1))
+						self.changes.append(CHANGE_SRAM,immed+4,new_value1)
 				else:'ERRROR'
-		return buff
+		return 1
 
 	def opcode_ld (self,opcode,op):
 		""" OPCODE = LD """
-		buff = 'ld' + self.disassembly_ld(opcode,op)
-		return (1,buff) 
+		return self.execute_ld(opcode,op)
 
 	def opcode_st (self,opcode,op):
 		""" OPCODE = ST """
-		buff = 'st' + self.disassembly_ld(opcode,op)
-		return (1,buff)  
+		return self.execute_ld(opcode,op)
 
 	def opcode_ldc (self,opcode,op):
 		""" OPCODE = LDC """
-		buff = 'ldc' + self.disassembly_ld(opcode,op)
-		return (1,buff) 
+		return self.execute_ld(opcode,op)
 
 	def opcode_stc (self,opcode,op):
 		""" OPCODE = STC """
-		buff = 'stc' + self.disassembly_ld(opcode,op)
-		return (1,buff)
+		return self.execute_ld(opcode,op)
 
 	def set_semaphore(self,ind,new_value,cnt):
 		if self.simulator.semaphores[ind].status and self.simulator.semaphores[ind].owner_runner == self:
@@ -1947,29 +2179,28 @@ class runner:
 	
 	def opcode_ldio (self,opcode,op):
 		""" OPCODE = LDIO """
+		if self.simulator.semaphore_lock:
+			# a semaphore is tested and set within one LDIO or STIO : not while another process is
+			self.simulator.semaphore_lock.acquire()
+			try:
+				return self.load_io(opcode,op)
+			finally:
+				self.simulator.semaphore_lock.release()
+		return self.load_io(opcode,op)
+
+	def load_io (self,opcode,op):
 		self.pc += 4
-		buff = 'ldio\t'
-		size = opcode[opcodes.ldioOpcode['size'][0]:opcodes.ldioOpcode['size'][1]].unpack('uint:2')[0]
-		if size == opcodes.OPCODE_SIZE_16:
-			buff += '16\t'
-		elif size == opcodes.OPCODE_SIZE_32:
-			buff += '32\t'
-		else:
-			buff += '8\t'
-		dst = opcode[opcodes.ldioOpcode['destination_register'][0]:opcodes.ldioOpcode['destination_register'][1]].unpack('uint:5')[0]
-		buff += 'r%d\t' % (dst)
-		immediate = opcode[opcodes.ldioOpcode['immediate_or_register'][0]:opcodes.ldioOpcode['immediate_or_register'][1]].unpack('uint:1')[0]
+		size = opcode['size']
+		dst = opcode['destination_register']
+		immediate = opcode['immediate_or_register']
 		if immediate:
-			io_address = opcode[opcodes.ldioOpcode['immediate'][0]:opcodes.ldioOpcode['immediate'][1]].unpack('uint:10')[0]
-			buff += '0x%x\t' % (io_address)
+			io_address = opcode['immediate']
 		else:
-			io_address = opcode[opcodes.ldioOpcode['address'][0]:opcodes.ldioOpcode['address'][1]].unpack('uint:5')[0]
-			buff += 'r%d\t' % (io_address)
-			high = opcode[opcodes.ldioOpcode['high_or_low'][0]:opcodes.ldioOpcode['high_or_low'][1]].unpack('uint:1')[0]
+			io_address = opcode['address']
+			high = opcode['high_or_low']
 		if SIMULATE:
 			if not immediate:
 				if high:
-					buff += 'high'
 					io_address = (io_address & 0xFFFF0000) >> 16
 				else:
 					io_address = io_address & 0x0000ffff		
@@ -2040,7 +2271,7 @@ class runner:
 					self.stall_pc.enter_stall = self.simulator.clock
 					self.stall = STALL_LDIO
 					self.stall_pc.pc = self.pc
-					self.changes.append( "  STALL: 1 " )
+					self.changes.append(CHANGE_STALL,0,1)
 			elif io_address == HASH_RESULT_IO_ADDRESS0 or \
 			io_address == HASH_RESULT_IO_ADDRESS1 or \
 			io_address == HASH_RESULT_IO_ADDRESS2 or \
@@ -2052,7 +2283,7 @@ class runner:
 					self.stall_pc.enter_stall = self.simulator.clock
 					self.stall = STALL_LDIO
 					self.stall_pc.pc = self.pc
-					self.changes.append( "  STALL: 1 ")
+					self.changes.append(CHANGE_STALL,0,1)
 			if self.stall != STALL_LDIO:
 				old_value = dst
 				if dst > 0:
@@ -2064,8 +2295,8 @@ class runner:
 			if dst == 0:
 				new_value = 0
 			if old_value != new_value:
-				self.changes.append( "  REG: r%d=%08X " % (dst,new_value))	
-		return (1,buff)
+				self.changes.append(CHANGE_REG,dst,new_value)	
+		return 1
 
 	def set_extended_timer(self,ind,new_value):
 		self.timers[ind].status = new_value & 1 
@@ -2075,34 +2306,32 @@ class runner:
 		
 	def opcode_stio (self,opcode,op):
 		""" OPCODE = STIO """
+		if self.simulator.semaphore_lock:
+			self.simulator.semaphore_lock.acquire()
+			try:
+				return self.store_io(opcode,op)
+			finally:
+				self.simulator.semaphore_lock.release()
+		return self.store_io(opcode,op)
+
+	def store_io (self,opcode,op):
 		self.pc += 4
-		buff = 'stio\t'
-		size = opcode[opcodes.ldioOpcode['size'][0]:opcodes.ldioOpcode['size'][1]].unpack('uint:2')[0]
-		if size == opcodes.OPCODE_SIZE_16:
-			buff += '16\t'
-		elif size == opcodes.OPCODE_SIZE_32:
-			buff += '32\t'
-		else:
-			buff += '8\t'
-		src = opcode[opcodes.ldioOpcode['source_address'][0]:opcodes.ldioOpcode['source_address'][1]].unpack('uint:5')[0]
-		buff += 'r%d\t' % (src)
-		immediate = opcode[opcodes.ldioOpcode['immediate_or_register'][0]:opcodes.ldioOpcode['immediate_or_register'][1]].unpack('uint:1')[0]
+		size = opcode['size']
+		src = opcode['source_address']
+		immediate = opcode['immediate_or_register']
 		if immediate:
-			io_address = opcode[opcodes.ldioOpcode['immediate'][0]:opcodes.ldioOpcode['immediate'][1]].unpack('uint:10')[0]
-			buff += '0x%x\t' % (io_address)
+			io_address = opcode['immediate']
 		else:
-			io_address = opcode[opcodes.ldioOpcode['address'][0]:opcodes.ldioOpcode['address'][1]].unpack('uint:5')[0]
-			buff += 'r%d\t' % (io_address)
-			high = opcode[opcodes.ldioOpcode['high_or_low'][0]:opcodes.ldioOpcode['high_or_low'][1]].unpack('uint:1')[0]
+			io_address = opcode['address']
+			high = opcode['high_or_low']
 		if SIMULATE:
 			if not immediate:
 				if high:
-					buff += 'high'
 					io_address = (io_address & 0xFFFF0000) >> 16
 				else:
 					io_address = io_address & 0x0000ffff		
 			io_address = io_address & 0x3ff
-			new_value = self.REGISTER(src)
+			new_value = int(self.REGISTER(src))
 			old_value = new_value
 			ioaddr = io_address & 0xFFFFFFFC
 			if ioaddr == PERIPHERAL_CTS or \
@@ -2121,7 +2350,7 @@ class runner:
 			ioaddr == PARSER_SUM or \
 			ioaddr == PARSER_CHKSUM or \
 			ioaddr == MS_CNT_VAL:
-				return (1,buff)
+				return 1
 			if size == opcodes.OPCODE_SIZE_8:
 				tp = self.READ_IO( io_address, 1 )
 				if tp[0]:
@@ -2140,7 +2369,7 @@ class runner:
 					io_address == DDR_OFFSET + 3 or  \
 					io_address == FW_WAKEUP_REG + 2 or  \
 					io_address == FW_WAKEUP_REG + 3:
-						return (1,buff)
+						return 1
 					elif io_address == TIMER_CONTROL_IO_ADDRESS:
 						new_value &= 0x03
 						self.timer.reset = new_value & 1
@@ -2220,7 +2449,7 @@ class runner:
 					io_address == LKUP_CAM_FWCFG_1 + 2 or \
 					io_address == DDR_OFFSET + 2 or \
 					io_address == FW_WAKEUP_REG + 2:
-						return (1,buff)
+						return 1
 					if io_address == TIMER_CONTROL_IO_ADDRESS:
 						new_value &= 0x0103
 						self.timer.reset = new_value & 1
@@ -2380,6 +2609,8 @@ class runner:
 								self.co_runner.counters_lock = 1
 							else:
 								self.co_runner.counters_lock = 0
+							if self.co_runner_locks != 0:
+								self.co_runner_locks.append(self.co_runner.counters_lock)
 					elif io_address == FW_INT_CTRL0:
 						new_value &= 0x0101FFFF
 					elif io_address == FW_INT_CTRL1 or io_address == FW_INT_CTRL2:
@@ -2394,15 +2625,15 @@ class runner:
 					elif thread == 1:
 						thread = ( new_value & 0x000001F0 ) >> 4
 					if new_value & 0x00000004 >> 2 == 1:
-						self.scheduler.async_enable [ thread ] = 1 
+						self.scheduler.async_enable |= 1 << thread
 						enable = "enable"
 					else:
 						enable = ""
 					if new_value & 0x00000008 >> 3 == 1:
-						self.scheduler.async_wakeup_request_urgent [ thread ] = 1 ;
+						self.scheduler.async_wakeup_request_urgent |= 1 << thread
 						urgent = "urgent" ;
 					else:
-						self.scheduler.async_wakeup_request_normal [ thread ] = 1 ;
+						self.scheduler.async_wakeup_request_normal |= 1 << thread
 						urgent = "normal"
 					self.show_scheduler ( "after stio 0x18" )
 				#if size == opcodes.OPCODE_SIZE_8 and io_address <= INT11_8_ADDR and io_address >= INT3_0_ADDR:
@@ -2410,26 +2641,19 @@ class runner:
 				#	cpu_interrupt.message.interrupt.vector = h_to_nl(io_address & 0x0F ) ;
 				#	 send_cpu(& cpu_interrupt);
 			if old_value != new_value:
-				self.changes.append( "  IO: %d %02X=%08X " % (size, io_address, new_value))
+				self.changes.append(CHANGE_IO,io_address,new_value)
 			
-		return (1,buff)
+		return 1
 	def show_scheduler(self,text):
 		print text
 		
 	def opcode_mov (self,opcode,op):
 		""" OPCODE = MOV """
 		self.pc += 4
-		buff = 'mov\t'		
-		dst = opcode[opcodes.movOpcode['destination_register'][0]:opcodes.movOpcode['destination_register'][1]].unpack('uint:5')[0]
-		buff += 'r%d\t' % (dst)
-		immediate = opcode[opcodes.movOpcode['immediate_value'][0]:opcodes.movOpcode['immediate_value'][1]].unpack('uint:16')[0]
-		buff += '0x%x\t' % (dst)
-		high = opcode[opcodes.movOpcode['high_or_low'][0]:opcodes.movOpcode['high_or_low'][1]].unpack('uint:1')[0]
-		clear = opcode[opcodes.movOpcode['clear'][0]:opcodes.movOpcode['clear'][1]].unpack('uint:1')[0]
-		if high:
-			buff += '<<16\t'
-		if clear:
-			buff += 'clear'
+		dst = opcode['destination_register']
+		immediate = opcode['immediate_value']
+		high = opcode['high_or_low']
+		clear = opcode['clear']
 		if SIMULATE:
 			old_value = self.REGISTER(dst)
 			new_value = old_value
@@ -2449,36 +2673,19 @@ class runner:
 			else:
 				new_value = 0
 			if old_value != new_value:
-				self.changes.append(" REG: r%d=%08X " % (dst,new_value))
+				self.changes.append(CHANGE_REG,dst,new_value)
 
-		return (1,buff) 
+		return 1
 
 	def opcode_shift (self,opcode,op):
 		""" OPCODE = SHIFT """
 		self.pc += 4
-		buff = 'shift\t'
-		dst = opcode[opcodes.shiftOpcode['destination_register'][0]:opcodes.shiftOpcode['destination_register'][1]].unpack('uint:5')[0]
-		buff += 'r%d\t' % (dst)
-		mode = opcode[opcodes.shiftOpcode['mode'][0]:opcodes.shiftOpcode['mode'][1]].unpack('uint:2')[0]
-		if mode == opcodes.OPCODE_SHIFT_MODE_ASR:
-			buff += 'asr\t'
-		elif mode == opcodes.OPCODE_SHIFT_MODE_ASL:
-			buff += 'asl\t'
-		elif mode == opcodes.OPCODE_SHIFT_MODE_RSR:
-			buff += 'rsr\t'
-		else:
-			buff += 'rsr16\t'
-		srca = opcode[opcodes.shiftOpcode['source_a'][0]:opcodes.shiftOpcode['source_a'][1]].unpack('uint:5')[0]
-		buff += 'r%d\t' % (srca)
-		srcb = opcode[opcodes.shiftOpcode['source_b_or_immediate'][0]:opcodes.shiftOpcode['source_b_or_immediate'][1]].unpack('uint:5')[0]
-		immediate = opcode[opcodes.shiftOpcode['immediate_or_register'][0]:opcodes.shiftOpcode['immediate_or_register'][1]].unpack('uint:1')[0]
-		if immediate:			
-			buff += 'd.%d\t' % (srcb)
-		else:
-			buff += 'r%d\t' % (srcb) 
-		update = opcode[opcodes.shiftOpcode['update_flags'][0]:opcodes.shiftOpcode['update_flags'][1]].unpack('uint:1')[0]
-		if update:
-			buff += 'update_flags'
+		dst = opcode['destination_register']
+		mode = opcode['mode']
+		srca = opcode['source_a']
+		srcb = opcode['source_b_or_immediate']
+		immediate = opcode['immediate_or_register']
+		update = opcode['update_flags']
 		if SIMULATE:
 			old_value = self.REGISTER(dst)
 			new_value = old_value
@@ -2514,21 +2721,16 @@ class runner:
 			else:
 				new_value = 0
 			if old_value != new_value:
-				self.changes.append(" REG: r%d=%08X " % (dst,new_value))
-		return (1,buff)
+				self.changes.append(CHANGE_REG,dst,new_value)
+		return 1
 
 	def opcode_extract (self,opcode,op):
 		""" OPCODE = EXTRACT """
 		self.pc += 4
-		buff = 'extract\t'
-		dst = opcode[opcodes.insertOpcode['destination_register'][0]:opcodes.insertOpcode['destination_register'][1]].unpack('uint:5')[0]
-		buff += 'r%d\t' % (dst)
-		srca = opcode[opcodes.insertOpcode['source_a'][0]:opcodes.insertOpcode['source_a'][1]].unpack('uint:5')[0]
-		buff += 'r%d\t' % (srca)
-		off = opcode[opcodes.insertOpcode['offset'][0]:opcodes.insertOpcode['offset'][1]].unpack('uint:5')[0]
-		buff += 'd.%d\t' % (off)
-		width = opcode[opcodes.insertOpcode['width'][0]:opcodes.insertOpcode['width'][1]].unpack('uint:5')[0]
-		buff += 'd.%d\t' % (width)
+		dst = opcode['destination_register']
+		srca = opcode['source_a']
+		off = opcode['offset']
+		width = opcode['width']
 		if SIMULATE:
 			old_value = self.REGISTER(dst)
 			new_value = old_value
@@ -2543,22 +2745,17 @@ class runner:
 			else:
 				new_value = 0
 			if old_value != new_value:
-				self.changes.append(" REG: r%d=%08X " % (dst,new_value))
+				self.changes.append(CHANGE_REG,dst,new_value)
 		
-		return (1,buff)
+		return 1
 
 	def opcode_insert (self,opcode,op):
 		""" OPCODE = INSERT """
 		self.pc += 4
-		buff = 'insert\t'
-		dst = opcode[opcodes.insertOpcode['destination_register'][0]:opcodes.insertOpcode['destination_register'][1]].unpack('uint:5')[0]
-		buff += 'r%d\t' % (dst)
-		srca = opcode[opcodes.insertOpcode['source_a'][0]:opcodes.insertOpcode['source_a'][1]].unpack('uint:5')[0]
-		buff += 'r%d\t' % (srca)
-		off = opcode[opcodes.insertOpcode['offset'][0]:opcodes.insertOpcode['offset'][1]].unpack('uint:5')[0]
-		buff += 'd.%d\t' % (off)
-		width = opcode[opcodes.insertOpcode['width'][0]:opcodes.insertOpcode['width'][1]].unpack('uint:5')[0]
-		buff += 'd.%d\t' % (width)
+		dst = opcode['destination_register']
+		srca = opcode['source_a']
+		off = opcode['offset']
+		width = opcode['width']
 		if SIMULATE:
 			old_value = self.REGISTER(dst)
 			new_value = old_value
@@ -2574,154 +2771,130 @@ class runner:
 			else:
 				new_value = 0
 			if old_value != new_value:
-				self.changes.append(" REG: r%d=%08X " % (dst,new_value))
+				self.changes.append(CHANGE_REG,dst,new_value)
 		
-		return (1,buff) 
+		return 1
 	def opcode_ctxswap (self,opcode,op):
 		""" OPCODE = CTX_SWAP """
 		pc = self.pc
 		self.pc += 4
-		buff = 'ctx_swap\t'
-		update = opcode[opcodes.ctxswapOpcode['update_r16'][0]:opcodes.ctxswapOpcode['update_r16'][1]].unpack('uint:1')[0]
+		update = opcode['update_r16']
 		if update:
-			immed = opcode[opcodes.ctxswapOpcode['immediate_value'][0]:opcodes.ctxswapOpcode['immediate_value'][1]].unpack('uint:16')[0]
-			buff += '0x%x\t' % (immed)
-		save = opcode[opcodes.ctxswapOpcode['save'][0]:opcodes.ctxswapOpcode['save'][1]].unpack('uint:1')[0]
-		async = opcode[opcodes.ctxswapOpcode['async_en'][0]:opcodes.ctxswapOpcode['async_en'][1]].unpack('uint:1')[0]
-		if not save:
-			buff += 'dont_save'
-		elif async:
-			buff += 'async_en'
+			immed = opcode['immediate_value']
+		save = opcode['save']
+		async = opcode['async_en']
 		if SIMULATE:
 			ind = self.pc//4
-			opcode = BitString(uint=self.code_segment[ind],length=32)
+			opcode = self.fetch_opcode(ind)
 			self.execute_opcode(opcode,0)
 			if self.stall != STALL_NORMAL:
 				self.stall_pc.delay_pc = self.pc
 				print 'exit 1 %d' % (self.stall)
-				return (1,buff)
+				return 1
 			ind = self.pc//4
-			opcode = BitString(uint=self.code_segment[ind],length=32)
+			opcode = self.fetch_opcode(ind)
 			self.execute_opcode(opcode,0)
 			if self.stall != STALL_NORMAL:
 				self.stall_pc.delay_pc = self.pc
-				return (1,buff)
+				return 1
 			if update:
 				self.private_registers[16] = (self.private_registers[16] & 0xffff) | \
 				(immed << 16 )
 				if self.scheduler.next_context_valid == 0:
-					self.changes.append(" REG: r16=%08X " % (self.private_registers[16]))
+					self.changes.append(CHANGE_REG,16,self.private_registers[16])
 			if async:
-				self.scheduler.async_enable[self.scheduler.current_context] = 1
+				self.scheduler.async_enable |= 1 << self.scheduler.current_context
 			self.st = 0
 			if self.scheduler.next_context_valid == 1:
 				for r in range(NUMBER_OF_PRIVATE_REGISTERS):
 					ind = self.scheduler.current_context*NUMBER_OF_PRIVATE_REGISTERS + r
 					if save:
 						self.context_segment[ind] = self.private_registers[r] 
-					self.changes.append(" REG: r%d=%08X " % (reg,self.private_registers[reg]))
+					self.changes.append(CHANGE_REG,reg,self.private_registers[reg])
 				self.scheduler.previous_context = self.scheduler.current_context
 				self.scheduler.current_context = self.scheduler.next_context
-				if self.scheduler.async_enable[self.scheduler.next_context] == 1:
-					self.scheduler.async_enable[self.scheduler.next_context] = 0
-					self.scheduler.async_wakeup_request_normal[self.scheduler.next_context] = 0
-					self.scheduler.async_wakeup_request_urgent[self.scheduler.next_context] = 0
-					self.scheduler.sync_wakeup_request[self.scheduler.next_context] = 0
-				else:
-					self.scheduler.sync_wakeup_request[self.scheduler.next_context] = 0
+				self.scheduler.clear_wakeup(self.scheduler.next_context)
 				self.scheduler.next_context_valid = 0
 				self.pc = (self.private_registers[16] >> 16 ) & PC_MASK
-				self.changes.append(" THREAD: %08X " % (self.scheduler.current_context))
+				self.changes.append(CHANGE_THREAD,0,self.scheduler.current_context)
 			else:
 				self.stall_pc.enter_stall = self.simulator.clock
 				self.stall = STALL_NO_CONTEXT
 				self.scheduler.save_context = save
-				self.changes.append(" STALL: 1 ")
+				self.changes.append(CHANGE_STALL,0,1)
 			self.show_scheduler("after ctx_swap")
-		return (1,buff)
+		return 1
 	
 	def opcode_hash (self,opcode,op):
+		pc = self.pc
 		self.pc += 4
-		buff = 'hash\t'
-		srcc = opcode[opcodes.hashOpcode['source_c'][0]:opcodes.hashOpcode['source_c'][1]].unpack('uint:5')[0]
-		srca = opcode[opcodes.hashOpcode['source_a'][0]:opcodes.hashOpcode['source_a'][1]].unpack('uint:5')[0]
-		buff += 'r%d\tr%d\t' % ( srcc,srca)
-		ks = opcode[opcodes.hashOpcode['ks'][0]:opcodes.hashOpcode['ks'][1]].unpack('uint:1')[0]
-		sa = opcode[opcodes.hashOpcode['sa'][0]:opcodes.hashOpcode['sa'][1]].unpack('uint:1')[0]		
-		if not ks:
-			buff += '48bit\t'
-		else:
-			buff += '60bit\t'
-		if sa:
-			buff += 'src\t'
-		else:
-			buff += 'dst\t'
-		res_slot = opcode[opcodes.hashOpcode['res_slot'][0]:opcodes.hashOpcode['res_slot'][1]].unpack('unit:3')[0]
-		table = opcode[opcodes.hashOpcode['table'][0]:opcodes.hashOpcode['table'][1]].unpack('unit:2')[0]
-		buff += 'd.%d\td.%d\t' % (res_slot,table)
-		invoke = opcode[opcodes.hashOpcode['invoke'][0]:opcodes.hashOpcode['invoke'][1]].unpack('unit:1')[0]
-		rq = opcode[opcodes.hashOpcode['rq'][0]:opcodes.hashOpcode['rq'][1]].unpack('unit:1')[0]
-		cs = opcode[opcodes.hashOpcode['cs'][0]:opcodes.hashOpcode['cs'][1]].unpack('unit:1')[0]
-		update = opcode[opcodes.hashOpcode['update_r16'][0]:opcodes.hashOpcode['update_r16'][1]].unpack('unit:1')[0]
-		if invoke:
-			buff += 'invoke\t'
-		if rq:
-			buff += 'refresh\t'
-		if cs:
-			buff += 'ctx_swap\t'
-		if update:
-			buff += 'update'						
-		return (1,buff)
+		srcc = opcode['source_c']
+		srca = opcode['source_a']
+		ks = opcode['ks']
+		sa = opcode['sa']		
+		res_slot = opcode['res_slot']
+		table = opcode['table']
+		invoke = opcode['invoke']
+		rq = opcode['rq']
+		cs = opcode['cs']
+		update = opcode['update_r16']
+		if SIMULATE:
+			if self.hw_accelerators.hash_count < HASH_FIFO_DEPTH:
+				h = self.hw_accelerators.hash[self.hw_accelerators.hash_in]
+				h.clock = self.hw_accelerator_clock(HASH_MIN,HASH_MAX)
+				h.source_a = int(self.REGISTER(srca))
+				h.source_c = int(self.REGISTER(srcc))
+				# key bits above 32 in source_a, the low 32 in source_c
+				h.key = ( h.source_a << 32 ) | h.source_c
+				h.key_size = ks
+				h.sa = sa
+				h.res_slot = res_slot & 3
+				h.table_number = table
+				h.invoke = invoke
+				h.rq = rq
+				h.cs = cs
+				h.update_r16 = update
+				h.thread = self.scheduler.current_context
+				h.ready = 0
+				h.valid = 1
+				if update:
+					self.private_registers[16] = ( self.private_registers[16] & 0xffff ) \
+					| ( (( self.pc + 4 ) & PC_MASK) << 16 )
+					if self.scheduler.next_context_valid == 0:
+						self.changes.append(CHANGE_REG,16,self.private_registers[16])
+				if cs:
+					self.stall_pc.enter_stall = self.simulator.clock
+					self.stall = STALL_NO_CONTEXT
+					self.scheduler.save_context = 1
+					self.changes.append(CHANGE_STALL,0,1)
+				self.hw_accelerators.hash_count += 1
+				self.hw_accelerators.hash_in = ( self.hw_accelerators.hash_in + 1 ) % HASH_FIFO_DEPTH
+			else:
+				self.stall_pc.enter_stall = self.simulator.clock
+				self.stall = STALL_HASH
+				self.stall_pc.pc = pc
+				self.changes.append(CHANGE_STALL,0,1)
+		return 1
 	
 	def opcode_ramman (self,opcode,op):
 		self.pc += 4
 		""" OPCODE = CRCCALC and CAM_LKP """
-		srca = opcode[opcodes.crcOpcode['source_a'][0]:opcodes.crcOpcode['source_a'][1]].unpack('uint:5')[0]
-		srcc = opcode[opcodes.crcOpcode['source_c'][0]:opcodes.crcOpcode['source_c'][1]].unpack('uint:5')[0]
-		typ = opcode[opcodes.crcOpcode['type'][0]:opcodes.crcOpcode['type'][1]].unpack('uint:1')[0]
-		immediate = opcode[opcodes.crcOpcode['immediate_or_register'][0]:opcodes.crcOpcode['immediate_or_register'][1]].unpack('uint:1')[0]
-		if typ == 1:
-			buff = 'cam_lkp\t'
-		else:
-			buff = 'crc32\t'
-			srcb = opcode[opcodes.crcOpcode['source_b_or_immediate'][0]:opcodes.crcOpcode['source_b_or_immediate'][1]].unpack('uint:8')[0]
-		buff += 'r%d\t' % (srca)
-		common = opcode[opcodes.crcOpcode['common_or_private'][0]:opcodes.crcOpcode['common_or_private'][1]].unpack('uint:1')[0]
+		srca = opcode['source_a']
+		srcc = opcode['source_c']
+		typ = opcode['type']
+		immediate = opcode['immediate_or_register']
 		if typ == 0:
-			if immediate:
-				buff += '0x%x\tr%d\t' % (srcb,srcc)
-			else:
-				buff += 'r%d\tr%d\t' % (srcb,srcc)
-			eth = opcode[opcodes.crcOpcode['eth'][0]:opcodes.crcOpcode['eth'][1]].unpack('uint:1')[0]
-			last = opcode[opcodes.crcOpcode['last'][0]:opcodes.crcOpcode['last'][1]].unpack('uint:1')[0]
-			if eth:
-				buff += 'eth\t'
-			if last:
-				buff += 'last\t'
-			if common:
-				buff += 'common'
+			srcb = opcode['source_b_or_immediate']
+		common = opcode['common_or_private']
+		if typ == 0:
+			eth = opcode['eth']
+			last = opcode['last']
 		else:
-			buff += 'r%d\t' % (srcc)
-			invoke = opcode[opcodes.camOpcode['invoke'][0]:opcodes.camOpcode['invoke'][1]].unpack('uint:1')[0]
-			res_slot = opcode[opcodes.camOpcode['res_slot'][0]:opcodes.camOpcode['res_slot'][1]].unpack('uint:2')[0]
-			use_128 = opcode[opcodes.camOpcode['use_128'][0]:opcodes.camOpcode['use_128'][1]].unpack('uint:1')[0]
-			key_size = opcode[opcodes.camOpcode['key_size'][0]:opcodes.camOpcode['key_size'][1]].unpack('uint:2')[0]
-			mask = opcode[opcodes.camOpcode['mask'][0]:opcodes.camOpcode['mask'][1]].unpack('uint:1')[0]
-			if key_size == 0:
-				buff += '16bit\t'
-			elif key_size == 1:
-				buff += '32bit\t'
-			elif key_size == 2:
-				buff += '64bit\t'
-			else:
-				buff += '128bit\t'
-			buff += 'd.%d\t' % (res_slot)
-			if invoke:
-				buff += 'invoke\t'
-			if mask:
-				buff += 'mask\t'
-			if common:
-				buff += 'common'
+			invoke = opcode['invoke']
+			res_slot = opcode['res_slot']
+			use_128 = opcode['use_128']
+			key_size = opcode['key_size']
+			mask = opcode['mask']
 		if SIMULATE:
 			if self.hw_accelerators.ramman.valid == 0:
 				if typ == 1:
@@ -2733,12 +2906,16 @@ class runner:
 					self.hw_accelerators.ramman.mask = mask
 					self.hw_accelerators.ramman.invoke = invoke
 					self.hw_accelerators.ramman.thread = self.scheduler.current_context
+					self.hw_accelerators.ramman.common = common
 					if key_size == 0:
 						self.hw_accelerators.ramman.key = self.REGISTER( srcc ) & 0x0000FFFF
 					elif key_size == 1:
 						self.hw_accelerators.ramman.key = self.REGISTER( srcc )
 					else :
-						self.hw_accelerators.ramman.key = self.REGISTER( srcc ) << 32 + self.REGISTER( srcc + 1)
+						key = 0
+						for i in range(cam.CAM_KEY_WORDS[key_size]):
+							key = ( key << 32 ) | self.REGISTER( srcc + i )
+						self.hw_accelerators.ramman.key = key
 				else:
 					if immediate:
 						length = srcb
@@ -2757,57 +2934,37 @@ class runner:
 				self.stall_pc.enter_stall = self.simulator.clock
 				self.stall = STALL_RAMMAN 
 				self.stall_pc.pc = self.pc
-				self.changes.append( "  STALL: 1 " )
-		return (1,buff)
+				self.changes.append(CHANGE_STALL,0,1)
+		return 1
 
 	def hw_accelerator_clock (self,min,max):
 		rr = random.uniform(min,max)
-		return self.simulator.clock + min + rr
+		clock = self.simulator.clock + min + rr
+		self.events.push(clock)
+		return clock
 
 	def opcode_bbtx (self,opcode,op):
 		self.pc += 4
-		buff = 'bbtx\t'
-		srcc = opcode[opcodes.bbtxOpcode['source_c'][0]:opcodes.bbtxOpcode['source_c'][1]].unpack('uint:5')[0]
-		srca = opcode[opcodes.bbtxOpcode['source_a'][0]:opcodes.bbtxOpcode['source_a'][1]].unpack('uint:5')[0]
-		srcb = opcode[opcodes.bbtxOpcode['source_b_or_immediate'][0]:opcodes.bbtxOpcode['source_b_or_immediate'][1]].unpack('uint:8')[0]
-		immediate = opcode[opcodes.bbtxOpcode['immediate_or_register'][0]:opcodes.bbtxOpcode['immediate_or_register'][1]].unpack('uint:1')[0]
-		if immediate:
-			buff += 'r%d\tr%d\t0x%x\t' % (srcc,srca,srcb)
-		else:
-			buff += 'r%d\tr%d\tr%d\t' % (srcc,srca,srcb)
-		last = opcode[opcodes.bbtxOpcode['last'][0]:opcodes.bbtxOpcode['last'][1]].unpack('uint:1')[0]
-		if last:	
-			buff += 'last\t'
-		inc = opcode[opcodes.bbtxOpcode['inc'][0]:opcodes.bbtxOpcode['inc'][1]].unpack('uint:1')[0]
-		if inc:	
-			buff += 'incremental\t'	
-		wait = opcode[opcodes.bbtxOpcode['wait'][0]:opcodes.bbtxOpcode['wait'][1]].unpack('uint:1')[0]
-		if wait:	
-			buff += 'wait\t'
-		common = opcode[opcodes.bbtxOpcode['common_or_private'][0]:opcodes.bbtxOpcode['common_or_private'][1]].unpack('uint:1')[0]
-		if common:	
-			buff += 'common'
-		return (1,buff)  
+		srcc = opcode['source_c']
+		srca = opcode['source_a']
+		srcb = opcode['source_b_or_immediate']
+		immediate = opcode['immediate_or_register']
+		last = opcode['last']
+		inc = opcode['inc']
+		wait = opcode['wait']
+		common = opcode['common_or_private']
+		return 1
 
 	def opcode_bbmsg (self,opcode,op):
 		""" OPCODE = BBMSG """
 		pc = self.pc
 		self.pc += 4
-		buff = 'bbmsg\t'
-		type = opcode[opcodes.bbmsgOpcode['type'][0]:opcodes.bbmsgOpcode['type'][1]].unpack('uint:3')[0]
-		srca = opcode[opcodes.bbmsgOpcode['source_a'][0]:opcodes.bbmsgOpcode['source_a'][1]].unpack('uint:5')[0]
-		srcb = opcode[opcodes.bbmsgOpcode['source_b_or_immediate'][0]:opcodes.bbmsgOpcode['source_b_or_immediate'][1]].unpack('uint:8')[0]
-		immediate = opcode[opcodes.bbmsgOpcode['immediate_or_register'][0]:opcodes.bbmsgOpcode['immediate_or_register'][1]].unpack('uint:1')[0]
-		if immediate:
-			buff += 'd.%d\tr%d\t0x%x\t' % (type,srca,srcb)
-		else:
-			buff += 'd.%d\tr%d\tr%d\t' % (type,srca,srcb)
-		size = opcode[opcodes.bbmsgOpcode['size'][0]:opcodes.bbmsgOpcode['size'][1]].unpack('uint:1')[0]
-		if size :
-			buff += '64bit\t'
-		wait = opcode[opcodes.bbmsgOpcode['wait'][0]:opcodes.bbmsgOpcode['wait'][1]].unpack('uint:1')[0] 
-		if wait:
-			buff += 'wait'
+		type = opcode['type']
+		srca = opcode['source_a']
+		srcb = opcode['source_b_or_immediate']
+		immediate = opcode['immediate_or_register']
+		size = opcode['size']
+		wait = opcode['wait'] 
 		if SIMULATE:
 			if self.hw_accelerators.bbmsg_count < BBMSG_FIFO_DEPTH:
 				min_bbmsg_clock = 0
@@ -2852,25 +3009,16 @@ class runner:
 				self.stall_pc.enter_stall = self.simulator.clock
 				self.stall = STALL_BBMSG
 				self.stall_pc.pc = pc
-				self.changes.append(" STALL: 1 ")
-		return (1,buff)   
+				self.changes.append(CHANGE_STALL,0,1)
+		return 1
 	def opcode_ffi (self,opcode,op):
 		""" OPCODE = FFI """
 		self.pc += 4
-		buff = 'ffi'
-		size = opcode[opcodes.ffiOpcode['size'][0]:opcodes.ffiOpcode['size'][1]].unpack('uint:1')[0]
-		if size == opcodes.OPCODE_FFI8:
-			buff += '8\t'
-		else:
-			buff += '16\t'
-		dst = opcode[opcodes.ffiOpcode['destination_register'][0]:opcodes.ffiOpcode['destination_register'][1]].unpack('uint:5')[0]
-		srca = opcode[opcodes.ffiOpcode['source_a'][0]:opcodes.ffiOpcode['source_a'][1]].unpack('uint:5')[0]
-		srcb = opcode[opcodes.ffiOpcode['source_b_or_immediate'][0]:opcodes.ffiOpcode['source_b_or_immediate'][1]].unpack('uint:5')[0]
-		immediate = opcode[opcodes.ffiOpcode['immediate_or_register'][0]:opcodes.ffiOpcode['immediate_or_register'][1]].unpack('uint:1')[0]
-		if immediate == 1:
-			buff += 'r%d\tr%d\t0x%x' % (dst,srca,srcb)
-		else:
-			buff += 'r%d\tr%d\tr%d' % (dst,srca,srcb)
+		size = opcode['size']
+		dst = opcode['destination_register']
+		srca = opcode['source_a']
+		srcb = opcode['source_b_or_immediate']
+		immediate = opcode['immediate_or_register']
 		if SIMULATE:
 			new_value = 0x20
 			search = self.REGISTER(srca)
@@ -2904,104 +3052,120 @@ class runner:
 				new_value = self.REGISTER(dst)
 			else:
 				new_value = 0
-			self.changes.append(" REG: r%d=%08X " % (dst,new_value))
-		return (1,buff)  
+			self.changes.append(CHANGE_REG,dst,new_value)
+		return 1
 
 	def opcode_chksm (self,opcode,op):
 		self.pc += 4
-		buff = 'chksm\t'
-		dst = opcode[opcodes.icheckOpcode['destination_register'][0]:opcodes.icheckOpcode['destination_register'][1]].unpack('uint:5')[0]
-		srcb = opcode[opcodes.icheckOpcode['source_b'][0]:opcodes.icheckOpcode['source_b'][1]].unpack('uint:5')[0]
-		srca = opcode[opcodes.icheckOpcode['source_a'][0]:opcodes.icheckOpcode['source_a'][1]].unpack('uint:5')[0]
-		buff += 'r%d\tr%d\tr%d\t' % (dst,srcb,srca)
-		high = opcode[opcodes.icheckOpcode['high_or_low'][0]:opcodes.icheckOpcode['high_or_low'][1]].unpack('uint:1')[0]
-		if high:
-			buff += 'high\t'
-		last = opcode[opcodes.icheckOpcode['last'][0]:opcodes.icheckOpcode['last'][1]].unpack('uint:1')[0]
-		if last:
-			buff += 'last'
-		return (1,buff)  
+		dst = opcode['destination_register']
+		srcb = opcode['source_b']
+		srca = opcode['source_a']
+		high = opcode['high_or_low']
+		last = opcode['last']
+		reverse = opcode['reverse']
+		shift = opcode['byte_shift']
+		if SIMULATE:
+			# span address and length in SRAM from the high or low halves of source_a and source_b
+			address = int(self.REGISTER(srca))
+			length = int(self.REGISTER(srcb))
+			if high:
+				address >>= 16
+				length >>= 16
+			data = self.sram_bytes(address & 0xFFFF,length & 0xFFFF)
+			# the sum so far, a pseudo header or the previous span, comes in dst. byte_shift is
+			# the offset of the span in the packet, after the previous spans : an odd one moves
+			# its bytes to the other half of the 16 bit units
+			total = checksum.partial_sum(data,int(self.REGISTER(dst)) & 0xFFFF,reverse,shift & 1)
+			self.WRITE_IO(PARSER_SUM,4,total)
+			r = self.READ_IO(PARSER_SUM,4)
+			self.changes.append(CHANGE_IO,PARSER_SUM,r[1])
+			if last:
+				total = checksum.checksum(total)
+				self.WRITE_IO(PARSER_CHKSUM,4,total)
+				r = self.READ_IO(PARSER_CHKSUM,4)
+				self.changes.append(CHANGE_IO,PARSER_CHKSUM,r[1])
+			if dst > 0:
+				self.SET_REGISTER(dst,total)
+				self.changes.append(CHANGE_REG,dst,total)
+		return 1
 	def opcode_counter (self,opcode,op):
+		pc = self.pc
 		self.pc += 4
-		buff = 'counter\t'
-		operation = opcode[opcodes.counterOpcode['operation'][0]:opcodes.counterOpcode['operation'][1]].unpack('uint:1')[0]
-		if not operation:
-			buff += 'increment\t'
-		else:
-			buff += 'decrement\t'
-		immeda = opcode[opcodes.counterOpcode['imm_or_reg_a'][0]:opcodes.counterOpcode['imm_or_reg_a'][1]].unpack('uint:1')[0]
-		immedb = opcode[opcodes.counterOpcode['imm_or_reg_b'][0]:opcodes.counterOpcode['imm_or_reg_b'][1]].unpack('uint:1')[0]
-		srca = opcode[opcodes.counterOpcode['source_a'][0]:opcodes.counterOpcode['source_a'][1]].unpack('uint:8')[0]
-		if immeda:
-			buff += '0x%x\t' % (srca)
-		else:
-			buff += 'r%d\t' % (srca)
-		srcb = opcode[opcodes.counterOpcode['source_b'][0]:opcodes.counterOpcode['source_b'][1]].unpack('uint:8')[0]
-		if immedb:
-			buff += '0x%x\t' % (srcb)
-		else:
-			buff += 'r%d\t' % (srcb)
-		size = opcode[opcodes.counterOpcode['size'][0]:opcodes.counterOpcode['size'][1]].unpack('uint:1')[0]
-		mode = opcode[opcodes.counterOpcode['mode'][0]:opcodes.counterOpcode['mode'][1]].unpack('uint:1')[0]
-		if not size:
-			buff += '2bytes\t'
-		else:
-			buff += '4bytes\t'
-		if not mode:
-			buff += 'freeze'
-		else:
-			buff += 'wrap'
-		return (1,buff) 
+		operation = opcode['operation']
+		immeda = opcode['imm_or_reg_a']
+		immedb = opcode['imm_or_reg_b']
+		srca = opcode['source_a']
+		srcb = opcode['source_b']
+		size = opcode['size']
+		mode = opcode['mode']
+		if SIMULATE:
+			if self.hw_accelerators.cntup_count < COUNTERS_FIFO_DEPTH:
+				c = self.hw_accelerators.cntup[self.hw_accelerators.cntup_in]
+				c.clock = self.hw_accelerator_clock(CNTUP_MIN,CNTUP_MAX)
+				# group byte offset in common memory and counter number, immediates or registers
+				if immeda:
+					c.group_offset = srca
+				else:
+					c.group_offset = int(self.REGISTER(srca)) & 0xFFFF
+				if immedb:
+					c.counter_number = srcb
+				else:
+					c.counter_number = int(self.REGISTER(srcb)) & 0xFFFF
+				c.value = 1
+				c.size = size
+				c.operation = operation
+				c.mode = mode
+				c.valid = 1
+				self.hw_accelerators.cntup_count += 1
+				self.hw_accelerators.cntup_in = ( self.hw_accelerators.cntup_in + 1 ) % COUNTERS_FIFO_DEPTH
+			else:
+				self.stall_pc.enter_stall = self.simulator.clock
+				self.stall = STALL_CNTUP
+				self.stall_pc.pc = pc
+				self.changes.append(CHANGE_STALL,0,1)
+		return 1
 	def opcode_crypt (self,opcode,op):
 		self.pc += 4
-		crypt = opcode[opcodes.cryptOpcode['hash'][0]:opcodes.cryptOpcode['hash'][1]].unpack('uint:1')[0]
-		if not crypt:
-			buff = 'crypt\t'
-		else:
-			buff == 'auth\t'
-		srca = opcode[opcodes.cryptOpcode['source_a'][0]:opcodes.cryptOpcode['source_a'][1]].unpack('uint:6')[0]
-		srcb = opcode[opcodes.cryptOpcode['source_b'][0]:opcodes.cryptOpcode['source_b'][1]].unpack('uint:8')[0]
-		immediate = opcode[opcodes.cryptOpcode['immediate_or_register'][0]:opcodes.cryptOpcode['immediate_or_register'][1]].unpack('uint:1')[0]
-		if immediate:
-			buff += 'r%d\t0x%x\t' % (srca,srcb)
-		else:
-			buff += 'r%d\tr%d\t' % (srca,srcb)
-		first = opcode[opcodes.cryptOpcode['first'][0]:opcodes.cryptOpcode['first'][1]].unpack('uint:1')[0]
-		last = opcode[opcodes.cryptOpcode['last'][0]:opcodes.cryptOpcode['last'][1]].unpack('uint:1')[0]
-		if first:
-			if last:
-				buff += 'single\t'
+		crypt = opcode['hash']
+		srca = opcode['source_a']
+		srcb = opcode['source_b']
+		immediate = opcode['immediate_or_register']
+		first = opcode['first']
+		last = opcode['last']
+		invoke = opcode['invoke']
+		if SIMULATE:
+			c = self.hw_accelerators.crypt
+			if not c.valid:
+				c.clock = self.hw_accelerator_clock(CRYPT_MIN,CRYPT_MAX)
+				c.chunk_address = int(self.REGISTER(srca)) & 0xFFFF
+				if immediate:
+					c.chunk_size = srcb
+				else:
+					c.chunk_size = int(self.REGISTER(srcb)) & 0xFFFF
+				c.hash = crypt
+				c.first = first
+				c.last = last
+				c.invoke = invoke
+				c.thread = self.scheduler.current_context
+				c.valid = 1
 			else:
-				buff += 'first\t'
-		elif last:
-			buff += 'last\t'
-		else:
-			buff += 'middle\t'
-		invoke = opcode[opcodes.cryptOpcode['invoke'][0]:opcodes.cryptOpcode['invoke'][1]].unpack('uint:1')[0]
-		if invoke:
-			buff += 'invoke'
-		return (1,buff)   
+				self.stall_pc.enter_stall = self.simulator.clock
+				self.stall = STALL_CRYPT
+				self.stall_pc.pc = self.pc - 4
+				self.changes.append(CHANGE_STALL,0,1)
+		return 1
 	def opcode_signext (self,opcode,op):
 		self.pc += 4
-		buff = 'signext\t'
-		dst = opcode[opcodes.signextOpcode['destination_register'][0]:opcodes.signextOpcode['destination_register'][1]].unpack('uint:5')[0]
-		srca = opcode[opcodes.signextOpcode['source_a'][0]:opcodes.signextOpcode['source_a'][1]].unpack('uint:5')[0]		
-		srcb = opcode[opcodes.signextOpcode['source_b_or_immediate'][0]:opcodes.signextOpcode['source_b_or_immediate'][1]].unpack('uint:5')[0]
-		buff += 'r%d\tr%d\t' % (dst,srca)
-		immediate = opcode[opcodes.signextOpcode['immediate_or_register'][0]:opcodes.signextOpcode['immediate_or_register'][1]].unpack('uint:1')[0]
-		if immediate:
-			if srcb == 0:
-				buff += '8bit'
-			else:
-				buff += '16bit'
-		else:
-			buff += 'r%d' % (srcb)
+		dst = opcode['destination_register']
+		srca = opcode['source_a']		
+		srcb = opcode['source_b_or_immediate']
+		immediate = opcode['immediate_or_register']
 		
-		return (1,buff)
+		return 1
 
 	def opcode_nop (self,opcode,op):
 		self.pc += 4
-		return (1,'nop') 
+		return 1
 
 #   Utilities
 	
@@ -3052,13 +3216,15 @@ class runner:
 		else: return False
 
 	def show_ram (self,text,address):
+		if not self.trace:
+			return
 		base = (address & 0xfffffffc) // 4
-		log(self.fio,"SRAM at 0x%x(0x%x) %s" % (base,address,text))
+		self.trace.line("SRAM at 0x%x(0x%x) %s" % (base,address,text))
 		b = base
 		while b < base + 4 :
 			try:
 				v = self.data_segment[b]
-				log(self.fio," %08x" % (v))
+				self.trace.line(" %08x" % (v))
 			except IndexError:
 				print 'IndexError : address=0x%x base=0x%x b=0x%x' % (address,base,b)
 			b += 1
@@ -3068,7 +3234,7 @@ class runner:
 		ind = base // 4
 		offset = address & 3
 		try:
-			old_value = self.io[ind]
+			old_value = int(self.io[ind])
 			if width == 1:
 				if offset == 0:
 					old_value = ( old_value & 0xff000000 ) >> 24
@@ -3190,7 +3356,8 @@ class runner:
 			self.data_segment[ind] = new_value
 		except OverflowError:
 			self.data_segment[ind] = unsigned(new_value)
-			return (True,old_value)
+		if self.cams.tables:
+			self.cams.touch(self.data_segment,ind)
 		return (True,old_value)
 
 	def WRITE_COMMON(self,address,width,new_value):
@@ -3232,6 +3399,23 @@ class runner:
 		except OverflowError:
 			print "Overflow"
 			return (False,old_value)
+		if self.simulator.common_cams.tables:
+			self.simulator.common_cams.touch(self.simulator.common_segment,ind)
+		self.simulator.hash_tables.touch(self.simulator.common_segment,lookup.HASH_TABLE_COMMON,ind)
+		return (True,old_value)
+
+	def WRITE_CODE(self,address,new_value):
+		""" write one code word and drop its predecoded entry """
+		ind = ( address & 0xfffffffc ) // 4
+		try:
+			old_value = self.code_segment[ind]
+			self.code_segment[ind] = unsigned(new_value)
+		except IndexError:
+			print 'WRITE_CODE: Index Error : %d(%x), address=0x%08x' % (ind,ind,address)
+			return (False,0)
+		self.decoded_segment[ind] = None
+		if self.blocks:
+			self.blocks.invalidate(ind)
 		return (True,old_value)
 
 	def WRITE_IO(self,address,width,new_value):
@@ -3239,7 +3423,7 @@ class runner:
 		ind = base // 4
 		offset = address & 3
 		try:
-			old_value = self.io[ind]
+			old_value = int(self.io[ind])
 			if width == 1:
 				if offset == 0:
 					new_value = ( new_value & 0xff000000 ) >> 24
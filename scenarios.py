@@ -0,0 +1,111 @@
+#!/usr/bin/env python
+import os
+import sys
+import traceback
+import cPickle
+import tracing
+
+def default_summary (simulator,runners,scenario,counts):
+	""" clock, pc, stall and registers of every runner, and how many changes of each kind were made """
+	result = {'clock':int(simulator.clock),'changes':counts,'runners':[]}
+	for r in runners:
+		result['runners'].append({
+			'id':r.id,
+			'pc':int(r.pc),
+			'stall':int(r.stall),
+			'global_registers':[ int(v) for v in r.global_registers ],
+			'private_registers':[ int(v) for v in r.private_registers ],
+		})
+	return result
+
+def cpu_count ():
+	try:
+		return os.sysconf('SC_NPROCESSORS_ONLN')
+	except (ValueError,OSError):
+		return 1
+
+class worker:
+	""" one forked scenario run and the read end of its result pipe """
+
+	def __init__ (self,index,pid,fd):
+		self.index = index
+		self.pid = pid
+		self.fd = fd
+
+	def result (self):
+		data = []
+		while True:
+			chunk = os.read(self.fd,65536)
+			if not chunk:
+				break
+			data.append(chunk)
+		os.close(self.fd)
+		os.waitpid(self.pid,0)
+		if not data:
+			return ('error','worker %d exited without a result' % (self.pid))
+		return cPickle.loads(''.join(data))
+
+def run_scenario (simulator,runners,index,scenario,setup,summary,trace):
+	""" body of a worker : apply the scenario to the forked state, run it and summarize """
+	counts = {}
+	def count (clock,id,kind,index,value):
+		counts[kind] = counts.get(kind,0) + 1
+	sink = 0
+	if trace != '':
+		sink = tracing.binary_sink(trace % (index))
+	for r in runners:
+		# the parent's sim.log is not shared with the workers
+		r.fio = open(os.devnull,'w')
+		if sink:
+			r.set_trace(sink)
+		else:
+			r.disable_trace()
+		for kind in range(tracing.CHANGE_SRAM_VIOLATION + 1):
+			r.subscribe(kind,count)
+	if setup:
+		setup(simulator,runners,scenario)
+	simulator.lockstep(runners)
+	if sink:
+		sink.close()
+	return summary(simulator,runners,scenario,counts)
+
+def run_scenarios (simulator,runners,scenarios,setup=None,summary=default_summary,workers=0,trace=''):
+	""" run every scenario from the current state of simulator and runners, each in a
+		forked worker that shares the parent's pages copy-on-write ; nothing is reloaded.
+		setup(simulator, runners, scenario) prepares a worker, summary(simulator, runners, scenario, counts)
+		returns its picklable result. trace is a binary trace name with %d for the scenario number, '' for none.
+		returns ('ok', result) or ('error', text) per scenario, in scenario order """
+	if workers <= 0:
+		workers = cpu_count()
+	for r in runners:
+		if r.fio:
+			r.fio.flush()
+	sys.stdout.flush()
+	results = [None] * len(scenarios)
+	running = []
+	for index in range(len(scenarios)):
+		if len(running) >= workers:
+			w = running.pop(0)
+			results[w.index] = w.result()
+		(rfd,wfd) = os.pipe()
+		pid = os.fork()
+		if pid == 0:
+			os.close(rfd)
+			status = 0
+			try:
+				result = ('ok',run_scenario(simulator,runners,index,scenarios[index],setup,summary,trace))
+			except:
+				result = ('error',traceback.format_exc())
+				status = 1
+			try:
+				data = cPickle.dumps(result,cPickle.HIGHEST_PROTOCOL)
+				while data:
+					data = data[os.write(wfd,data):]
+				sys.stdout.flush()
+			finally:
+				os._exit(status)
+		os.close(wfd)
+		running.append(worker(index,pid,rfd))
+	for w in running:
+		results[w.index] = w.result()
+	return results
@@ -2,56 +2,107 @@
 import os
 import array
 import runner
+import tracing
+import checkpoint
+import parallel
+import topology
 import simulator
 import opcodes
 from datetime import datetime
 
+def runner_option (arg,files):
+	""" -code<N><file>, -data<N><file> or -context<N><file> into files[N] ; False for any other option """
+	for (i,option) in ((0,'-code'),(1,'-data'),(2,'-context')):
+		if arg.startswith(option):
+			n = len(option)
+			while n < len(arg) and arg[n].isdigit():
+				n += 1
+			if n == len(option):
+				return False
+			id = int(arg[len(option):n])
+			if id not in files:
+				files[id] = ['','','']
+			files[id][i] = arg[n:]
+			return True
+	return False
+
 #-------------
 #	Main
 #-------------
 def main(argv):
 	command_file_name = ''
-	code0 = ''
-	code1 = ''
+	# runner number : [ code, data, context ]
+	files = {}
 	common = ''
-	data0 = ''
-	data1 = ''
-	ctx0 = ''
-	ctx1 = ''
-	runner0 = 0
-	runner1 = 0
+	topology_file = ''
+	lookup_file = ''
 	simulatorins = 0
+	blocks = False
+	profile = False
+	fast = False
+	trace = ''
+	trace_batch = tracing.TRACE_BATCH_SIZE
+	trace_index = tracing.TRACE_INDEX_INTERVAL
+	save = ''
+	quantum = 1
+	processes = False
+	restore = ''
 	if len(argv) == 1:
 		print  "\n Syntax: \n\n"
 #        Options:\n \
 #            -fFile		Commands file\n \
-#		    -code0<file>		Object file for Runner 0\n \
-#		    -code1<file>   	Object file for Runner 1\n \
-#		    -data0<file>		Data file for Runner 0\n \
-#		    -data1<file>   	Data file for Runner 1\n \
-#		    -context0<file>	Context file for Runner 0\n \
-#		    -context1<file>    Context file for Runner 1\n \
-#		    -common<file>		Comman data file\n"
+#		    -code<N><file>		Object file for Runner N\n \
+#		    -data<N><file>		Data file for Runner N\n \
+#		    -context<N><file>	Context file for Runner N\n \
+#		    -common<file>		Comman data file\n \
+#		    -topology<file>	Co-runners and RX/TX peripherals of the runners\n \
+#		    -lookup<file>		Hash lookup tables, runner.cfg when there is one\n \
+#		    -blocks		Run straight-line code as translated blocks\n \
+#		    -profile		Count executed opcodes per runner\n \
+#		    -fast		Run without tracing, no disassembly is built\n \
+#		    -quantum<clocks>	Clocks each runner runs before the other one catches up\n \
+#		    -parallel		Run every runner in its own process, in step every quantum\n \
+#		    -trace<file>		Binary trace file, render it with tracedump.py\n \
+#					( .gz, .bz2 or .xz compress it )\n \
+#		    -tracebatch<bytes>	Trace writer batch size, 0 writes without the background thread\n \
+#		    -traceindex<clocks>	Clocks between trace index entries, 0 writes no index\n \
+#		    -checkpoint<file>	Save the simulator state to file once the runners stop\n \
+#		    -checkpoint<file>@<clock>	Save it when the clock reaches clock, then run on\n \
+#		    -restore<file>		Start from a checkpoint taken with the same images\n"
 	else:
 		print "Start at : "
 		print datetime.now()
 		for i in range (1,len(argv)):
-			if argv[i].startswith ('-f'):
+			if argv[i] == "-fast":
+				fast = True
+			elif argv[i].startswith ('-f'):
 				command_file_name = argv[i][2:]
-			elif argv[i].startswith("-code0"):
-				code0 = argv[i][6:]
-			elif argv[i].startswith("-code1"):
-				code1 = argv[i][6:]
-			elif argv[i].startswith("-data0"):
-				data0 = argv[i][6:]
-			elif argv[i].startswith("-data1"):
-				data1 = argv[i][6:]
-			elif argv[i].startswith("-context0"):
-				ctx0 = argv[i][9:]
-			elif argv[i].startswith("-context1"):
-				ctx1 = argv[i][9:]
+			elif runner_option(argv[i],files):
+				pass
 			elif argv[i].startswith("-common"):
 				common = argv[i][7:]
+			elif argv[i].startswith("-topology"):
+				topology_file = argv[i][9:]
+			elif argv[i].startswith("-lookup"):
+				lookup_file = argv[i][7:]
+			elif argv[i] == "-blocks":
+				blocks = True
+			elif argv[i] == "-profile":
+				profile = True
+			elif argv[i].startswith("-quantum"):
+				quantum = int(argv[i][8:])
+			elif argv[i] == "-parallel":
+				processes = True
+			elif argv[i].startswith("-checkpoint"):
+				save = argv[i][11:]
+			elif argv[i].startswith("-restore"):
+				restore = argv[i][8:]
+			elif argv[i].startswith("-tracebatch"):
+				trace_batch = int(argv[i][11:])
+			elif argv[i].startswith("-traceindex"):
+				trace_index = int(argv[i][11:])
+			elif argv[i].startswith("-trace"):
+				trace = argv[i][6:]
 			else:
 				print "File name needed"
 	if command_file_name != '':
@@ -59,36 +110,83 @@ def main(argv):
 		for line in fobj:
 			args = line.split()
 			for i in range(len(args)):
-				if args[i].startswith("-code0"):
-					code0 = args[i][6:]
-				elif args[i].startswith("-code1"):
-					code1 = args[i][6:]
-				elif args[i].startswith("-data0"):
-					data0 = args[i][6:]
-				elif args[i].startswith("-data1"):
-					data1 = args[i][6:]
-				elif args[i].startswith("-context0"):
-					ctx0 = args[i][9:]
-				elif args[i].startswith("-context1"):
-					ctx1 = args[i][9:]
+				if runner_option(args[i],files):
+					pass
 				elif args[i].startswith("-common"):
 					common = args[i][7:]
+				elif args[i].startswith("-topology"):
+					topology_file = args[i][9:]
+				elif args[i].startswith("-lookup"):
+					lookup_file = args[i][7:]
+				elif args[i] == "-blocks":
+					blocks = True
+				elif args[i] == "-profile":
+					profile = True
+				elif args[i].startswith("-quantum"):
+					quantum = int(args[i][8:])
+				elif args[i] == "-parallel":
+					processes = True
+				elif args[i] == "-fast":
+					fast = True
+				elif args[i].startswith("-checkpoint"):
+					save = args[i][11:]
+				elif args[i].startswith("-restore"):
+					restore = args[i][8:]
+				elif args[i].startswith("-tracebatch"):
+					trace_batch = int(args[i][11:])
+				elif args[i].startswith("-traceindex"):
+					trace_index = int(args[i][11:])
+				elif args[i].startswith("-trace"):
+					trace = args[i][6:]
 		fobj.close()
 
 	simulatorins = simulator.simulator(common)
-	if code0 != '':
-		runner0 = runner.runner(0,code0,data0,ctx0,simulatorins)		
-	if code1 != '':
-		runner1 = runner.runner(1,code1,data1,ctx1,simulatorins)
+	if lookup_file == '' and os.path.exists('runner.cfg'):
+		lookup_file = 'runner.cfg'
+	if lookup_file != '':
+		simulatorins.hash_tables.config.read(lookup_file)
+	runners = []
+	for id in sorted(files.keys()):
+		(code,data,ctx) = files[id]
+		if code != '':
+			runners.append(runner.runner(id,code,data,ctx,simulatorins))
+	for r in runners:
+		if blocks:
+			r.enable_blocks()
+		if profile:
+			r.enable_profile()
+	if trace != '':
+		trace = tracing.binary_sink(trace,trace_batch,None,trace_index)
+		for r in runners:
+			r.set_trace(trace)
+	if fast:
+		for r in runners:
+			r.disable_trace()
+	if restore != '':
+		checkpoint.restore(restore,simulatorins,runners)
 		
-	if runner0:
-		if runner1:
-			runner0.addCorunner(runner1)
-		runner0.run()
-	if runner1:
-		if runner0:
-			runner1.addCorunner(runner0)
-		runner1.run()
+	peers = topology.topology()
+	if topology_file != '':
+		peers.read(topology_file)
+	peers.connect(simulatorins,runners)
+	running = runners
+	if '@' in save:
+		(save,save_clock) = save.rsplit('@',1)
+		# up to the clock in this process, whatever runs the rest
+		running = simulatorins.lockstep(runners,quantum,int(save_clock,0))
+		checkpoint.save(save,simulatorins,runners)
+		save = ''
+	if processes:
+		parallel.run_parallel(simulatorins,running,quantum)
+	else:
+		simulatorins.lockstep(running,quantum)
+	if save != '':
+		if processes:
+			print "WARNING: -checkpoint needs the runners in this process, not saved"
+		else:
+			checkpoint.save(save,simulatorins,runners)
+	if trace:
+		trace.close()
 	print "Stop at : "
 	print datetime.now()
 
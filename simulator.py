@@ -2,10 +2,15 @@
 import array
 from numpy import zeros,uint32
 import opcodes
+import memory
+import image
+import cam
+import lookup
 
 COMMON_SEGMENT_SIZE    = 64 * 1024
 DDR_SIZE         = 64 * 1024 * 1024 
 PACKET_SRAM_SIZE = 512 * 1024 
+NUMBER_OF_SEMAPHORES = 8
 
 class semaphore:
 
@@ -31,7 +36,9 @@ class simulator:
 	SEMAPHORE_6_STATUS = SEMAPHOR_CTRL_1 + 2
 	SEMAPHORE_7_STATUS = SEMAPHOR_CTRL_1 + 3
 	common_segment = array.array('L')
-	semaphores = []*8	
+	semaphores = []*NUMBER_OF_SEMAPHORES
+	# taken around every LDIO and STIO when the runners run in separate processes
+	semaphore_lock = 0
 	common_filename = ""
 	ddr = [] * DDR_SIZE 
 	packet_sram = [] * PACKET_SRAM_SIZE
@@ -40,14 +47,41 @@ class simulator:
 
 	def __init__(self,common_filename):
 		self.common_filename = common_filename
-		for s in range(len(self.semaphores)):
-			self.semaphores.append(semaphore())
-		self.ddr = zeros(DDR_SIZE,'L')
-		self.packet_sram = zeros(PACKET_SRAM_SIZE,'L')
-		fobj = open(self.common_filename,'rb')
-		self.common_segment.fromfile(fobj,COMMON_SEGMENT_SIZE//4)
-		self.common_segment.byteswap()
-		fobj.close()
+		self.semaphores = [ semaphore() for s in range(NUMBER_OF_SEMAPHORES) ]
+		self.ddr = memory.paged_memory(DDR_SIZE)
+		self.packet_sram = memory.paged_memory(PACKET_SRAM_SIZE)
+		self.common_segment = image.load_segment(self.common_filename,0,COMMON_SEGMENT_SIZE)
+		self.common_cams = cam.cam_cache()
+		self.hash_tables = lookup.hash_tables()
 		self.clock = 0
 		self.speed = 50
 		self.current_speed = 0
+
+	def lockstep (self,runners,quantum=1,until=0):
+		""" run the runners on the shared clock until all of them stop, or until the clock
+			reaches until when it is not 0 : each runs quantum clocks in turn from the same
+			starting clock. returns the runners that have not stopped """
+		running = list(runners)
+		while running and ( until == 0 or self.clock < until ):
+			start = self.clock
+			# with every runner stalled the clock jumps to the first one that has work
+			wakes = [ r.wake_clock(start + 1) for r in running ]
+			if 0 not in wakes and min(wakes) > start + 1:
+				wake = min(wakes)
+				if until and wake > until:
+					wake = until
+				for r in running:
+					r.skip_clocks(start + 1,wake)
+				start = wake - 1
+			step = quantum
+			if until and start + step > until:
+				step = until - start
+			end = start
+			for r in running[:]:
+				self.clock = start
+				if r.run_until(start + step) == 0:
+					running.remove(r)
+					r.stop()
+				end = max(end,self.clock)
+			self.clock = end
+		return running
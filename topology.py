@@ -0,0 +1,80 @@
+#!/usr/bin/env python
+
+RUNNER_NAMES = 'ABCDEFGH'
+
+def runner_number (name):
+	""" runner A, B, ... or its number """
+	if name.isdigit():
+		return int(name)
+	if len(name) != 1 or name.upper() not in RUNNER_NAMES:
+		raise ValueError('unknown runner %s' % (name))
+	return RUNNER_NAMES.index(name.upper())
+
+class topology:
+	""" who is whose co-runner and which RX / TX peripherals each runner serves,
+		read from a file laid out like runner.cfg :
+
+		// runner  co-runners, the first one shares CNTR_LOCK
+		co_runner        A   B
+		co_runner        B   A
+		// peripheral  runner
+		rx_runner        eth0   A
+		tx_runner        gpon   B
+
+		runners with no co_runner line are paired 0-1, 2-3, ...
+		only the first co-runner has an effect, through the CNTR_LOCK it shares. the rest of
+		the co-runner list and the peripheral maps are declarative : connect() fills in
+		runner.co_runners and simulator.rx_runners / tx_runners, but nothing in the simulator
+		reads them, as there is no model of the peripherals or of the other peers yet """
+
+	def __init__ (self):
+		self.co_runners = {}
+		self.rx_runners = {}
+		self.tx_runners = {}
+
+	def read (self,name):
+		fobj = open(name,'r')
+		for line in fobj:
+			line = line.split('//')[0]
+			args = line.split()
+			if len(args) < 2:
+				continue
+			try:
+				if args[0] == 'co_runner':
+					self.co_runners[runner_number(args[1])] = [ runner_number(a) for a in args[2:] ]
+				elif args[0] == 'rx_runner' and len(args) > 2:
+					self.rx_runners[args[1]] = runner_number(args[2])
+				elif args[0] == 'tx_runner' and len(args) > 2:
+					self.tx_runners[args[1]] = runner_number(args[2])
+				else:
+					print "WARNING: unknown topology line '%s'" % (line.strip())
+			except ValueError, e:
+				print "WARNING: %s in topology line '%s'" % (e,line.strip())
+		fobj.close()
+
+	def peers (self,id,ids):
+		if id in self.co_runners:
+			return self.co_runners[id]
+		if (id ^ 1) in ids:
+			return [id ^ 1]
+		return []
+
+	def connect (self,simulator,runners):
+		""" wire the runners to their co-runners and the peripherals to their runners """
+		by_id = {}
+		for r in runners:
+			by_id[r.id] = r
+		for r in runners:
+			for peer in self.peers(r.id,by_id):
+				if peer in by_id:
+					r.addCorunner(by_id[peer])
+				else:
+					print "WARNING: runner %d has no co-runner %d" % (r.id,peer)
+		simulator.rx_runners = {}
+		simulator.tx_runners = {}
+		for (peripherals,runner_map) in ((self.rx_runners,simulator.rx_runners),(self.tx_runners,simulator.tx_runners)):
+			for name in peripherals:
+				if peripherals[name] in by_id:
+					runner_map[name] = by_id[peripherals[name]]
+				else:
+					print "WARNING: peripheral %s is served by missing runner %d" % (name,peripherals[name])
@@ -0,0 +1,40 @@
+#!/usr/bin/env python
+import tracing
+
+#-------------
+#	Main
+#-------------
+def main(argv):
+	files = []
+	first = None
+	last = None
+	pc = None
+	for i in range(1,len(argv)):
+		if argv[i].startswith("-clock"):
+			clocks = argv[i][6:].split(':')
+			if clocks[0] != '':
+				first = int(clocks[0])
+			if len(clocks) == 1:
+				last = first
+			elif clocks[1] != '':
+				last = int(clocks[1])
+		elif argv[i].startswith("-pc"):
+			pc = int(argv[i][3:],16)
+		else:
+			files.append(argv[i])
+	if len(files) < 1:
+		print "\n Syntax: tracedump.py <trace file> [<text file>] [-clock<first>[:<last>]] [-pc<hex>]\n"
+		return
+	if len(files) > 1:
+		fout = open(files[1],'w')
+	else:
+		fout = 0
+	for record in tracing.seek_trace(files[0],first,last,pc):
+		for line in tracing.render(record):
+			tracing.log(fout,line)
+	if fout:
+		fout.close()
+
+if __name__ == '__main__':
+	from sys import argv
+	main(argv)
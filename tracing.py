@@ -0,0 +1,493 @@
+#!/usr/bin/env python
+import struct
+import threading
+import Queue
+import gzip
+import bz2
+import disassembler
+try:
+	import lzma
+except ImportError:
+	lzma = None
+
+TRACE_MAGIC = 'RTRC'
+TRACE_VERSION = 2
+TRACE_BUFFER_SIZE = 1 << 20
+TRACE_BATCH_SIZE = 256 * 1024
+TRACE_QUEUE_DEPTH = 16
+TRACE_INDEX_INTERVAL = 10000
+HEADER_FORMAT = '<4sH'
+# record type, clock, runner id, pc, opcode word, number of changes ( text length for lines )
+RECORD_FORMAT = '<BIBIIH'
+RECORD_SIZE = struct.calcsize(RECORD_FORMAT)
+# kind, index, value
+CHANGE_FORMAT = '<BII'
+CHANGE_SIZE = struct.calcsize(CHANGE_FORMAT)
+RECORD_OPCODE = 0
+RECORD_ERROR = 1
+RECORD_LINE = 2
+
+# sidecar index : trace file name + INDEX_SUFFIX
+INDEX_SUFFIX = '.idx'
+INDEX_MAGIC = 'RIDX'
+INDEX_VERSION = 1
+# magic, version, clock interval, number of windows, number of pcs
+INDEX_HEADER_FORMAT = '<4sHIII'
+# clock window, uncompressed offset of its first record
+INDEX_WINDOW_FORMAT = '<IQ'
+# pc, number of windows it runs in ; followed by the window numbers
+INDEX_PC_FORMAT = '<II'
+
+# change record kinds
+CHANGE_REG = 0
+CHANGE_ST = 1
+CHANGE_SRAM = 2
+CHANGE_IO = 3
+CHANGE_STALL = 4
+CHANGE_NEXT = 5
+CHANGE_THREAD = 6
+CHANGE_JUMP = 7
+CHANGE_CAM = 8
+CHANGE_CRC = 9
+CHANGE_SRAM_VIOLATION = 10
+
+logfile = []
+def log(listfile,line):
+	""" print current line to list file,
+	 if it is an error or warning message print it to stdout also """ 
+	if listfile != 0:
+		#print line
+		if line.startswith("ERROR") or line.startswith("WARNING"):
+			print line
+
+		if not line.endswith('\n'):
+			line += '\n'
+		#listfile.write(line)
+		logfile.append(line)
+		if len(logfile) >= 1: #:
+			for i in range(len(logfile)):
+				listfile.write(logfile[i])
+			logfile[:] = []
+	else:
+		print line
+
+def format_change (kind,index,value):
+	""" text of one change record, as it appears in sim.log """
+	if kind == CHANGE_REG:
+		return " REG: r%d=%08X " % (index,value)
+	elif kind == CHANGE_ST:
+		return " ST: %08X " % (value)
+	elif kind == CHANGE_SRAM:
+		return " SRAM: word %08X=%08X " % (index,value)
+	elif kind == CHANGE_IO:
+		return " IO: %02X=%08X " % (index,value)
+	elif kind == CHANGE_STALL:
+		return " STALL: %d " % (value)
+	elif kind == CHANGE_NEXT:
+		if index:
+			return " NEXT: %08X " % (value)
+		return " NEXT: ?? "
+	elif kind == CHANGE_THREAD:
+		return " THREAD: %08X " % (value)
+	elif kind == CHANGE_JUMP:
+		return " JUMP: %08X " % (value)
+	elif kind == CHANGE_CAM:
+		return " CAM: %08X " % (value)
+	elif kind == CHANGE_CRC:
+		return " CRCCALC: %08X " % (value)
+	elif kind == CHANGE_SRAM_VIOLATION:
+		return "ERROR: SRAM access violation on load/store from/to 0x%x" % (index)
+	return " ?%d: %08X=%08X " % (kind,index,value)
+
+def format_changes (records):
+	return [ format_change(kind,index,value) for (kind,index,value) in records ]
+
+class change_ring:
+	""" changes made by the opcode being executed, kept as (kind, index, value)
+		records in preallocated slots ; only trace sinks format them """
+
+	def __init__ (self,size):
+		self.size = size
+		self.kinds = [0] * size
+		self.indexes = [0] * size
+		self.values = [0] * size
+		self.count = 0
+		self.subscribers = {}
+
+	def append (self,kind,index,value):
+		i = self.count % self.size
+		self.kinds[i] = kind
+		self.indexes[i] = index
+		self.values[i] = value
+		self.count += 1
+
+	def __len__ (self):
+		return min(self.count,self.size)
+
+	def records (self):
+		""" the records, oldest first ; the oldest are lost once the ring wraps """
+		first = max(0,self.count - self.size)
+		return [ (self.kinds[i % self.size],self.indexes[i % self.size],self.values[i % self.size]) \
+			for i in range(first,self.count) ]
+
+	def clear (self):
+		self.count = 0
+
+	def subscribe (self,kind,callback):
+		""" callback(clock, id, kind, index, value) for every record of kind """
+		if kind not in self.subscribers:
+			self.subscribers[kind] = []
+		self.subscribers[kind].append(callback)
+
+	def publish (self,clock,id):
+		if not self.subscribers:
+			return
+		for (kind,index,value) in self.records():
+			if kind in self.subscribers:
+				for callback in self.subscribers[kind]:
+					callback(clock,id,kind,index,value)
+
+class text_sink:
+	""" sim.log text trace : the disassembly of every executed opcode and its changes """
+
+	def __init__ (self,fio):
+		self.fio = fio
+
+	def opcode (self,clock,id,ind,opcode,changes):
+		word = opcode[2]
+		if opcode[0] is None:
+			log(self.fio,"clock=%d id=%d : 0x%08x => 0x%08x\tError ????" % (clock,id,ind*4,word))
+			return
+		log(self.fio,"clock=%d id=%d : 0x%08x => 0x%08x\t%s" % (clock,id,ind*4,word,disassembler.disassemble(word)))
+		if len(changes) > 0:
+			log(self.fio,"clock=%d id=%d : CHANGES: %s" % (clock,id,format_changes(changes.records())))
+
+	def line (self,line):
+		log(self.fio,line)
+
+	def close (self):
+		pass
+
+def trace_compression (name):
+	""" compression picked from the trace file extension """
+	if name.endswith('.gz'):
+		return 'gzip'
+	elif name.endswith('.bz2'):
+		return 'bz2'
+	elif name.endswith('.xz'):
+		return 'lzma'
+	return ''
+
+def open_trace_file (name,compression=''):
+	if compression == 'gzip':
+		return gzip.open(name,'wb',6)
+	elif compression == 'bz2':
+		return bz2.BZ2File(name,'wb',TRACE_BUFFER_SIZE)
+	elif compression == 'lzma':
+		if lzma is None:
+			raise ValueError('lzma compression is not available')
+		return lzma.open(name,'wb')
+	elif compression != '':
+		raise ValueError('unknown trace compression %s' % (compression))
+	return open(name,'wb',TRACE_BUFFER_SIZE)
+
+def open_trace_input (name):
+	""" open a trace file for reading, compressed or not """
+	fobj = open(name,'rb')
+	magic = fobj.read(6)
+	fobj.close()
+	if magic.startswith('\x1f\x8b'):
+		return gzip.open(name,'rb')
+	elif magic.startswith('BZh'):
+		return bz2.BZ2File(name,'rb')
+	elif magic.startswith('\xfd7zXZ'):
+		if lzma is None:
+			raise ValueError('lzma compression is not available')
+		return lzma.open(name,'rb')
+	return open(name,'rb',TRACE_BUFFER_SIZE)
+
+class trace_writer:
+	""" file-like writer : collects writes into batches and hands them to a background
+		thread over a bounded queue ; a full queue blocks the writer until the disk catches up """
+
+	def __init__ (self,fobj,batch_size=TRACE_BATCH_SIZE,queue_depth=TRACE_QUEUE_DEPTH):
+		self.fobj = fobj
+		self.batch_size = batch_size
+		self.batch = []
+		self.batch_bytes = 0
+		self.error = None
+		self.queue = Queue.Queue(queue_depth)
+		self.thread = threading.Thread(target=self.drain)
+		self.thread.daemon = True
+		self.thread.start()
+
+	def write (self,data):
+		self.batch.append(data)
+		self.batch_bytes += len(data)
+		if self.batch_bytes >= self.batch_size:
+			self.flush()
+
+	def flush (self):
+		if self.error:
+			raise self.error
+		if self.batch:
+			self.queue.put(''.join(self.batch))
+			self.batch = []
+			self.batch_bytes = 0
+
+	def drain (self):
+		while True:
+			data = self.queue.get()
+			if data is None:
+				return
+			if self.error:
+				continue
+			try:
+				self.fobj.write(data)
+			except Exception, e:
+				# kept for the caller ; the thread goes on emptying the queue so put() never blocks
+				self.error = e
+
+	def close (self):
+		try:
+			self.flush()
+		finally:
+			self.queue.put(None)
+			self.thread.join()
+			self.fobj.close()
+		if self.error:
+			raise self.error
+
+class binary_sink:
+	""" per-clock trace records ; tracedump.py renders them as text.
+		compression follows the file extension ( .gz, .bz2, .xz ), batch_size 0 writes on the caller thread.
+		every index_interval clocks the offset of the next record goes to the sidecar index, 0 writes none """
+
+	def __init__ (self,name,batch_size=TRACE_BATCH_SIZE,compression=None,index_interval=TRACE_INDEX_INTERVAL):
+		if compression is None:
+			compression = trace_compression(name)
+		self.name = name
+		self.batch_size = batch_size
+		self.compression = compression
+		self.index_interval = index_interval
+		self.fio = open_trace_file(name,compression)
+		if batch_size:
+			self.fio = trace_writer(self.fio,batch_size)
+		self.offset = 0
+		# lines logged while an opcode executes are written ahead of its record
+		self.line_offset = -1
+		self.index = 0
+		if index_interval:
+			self.index = index_builder(index_interval)
+		self.write(struct.pack(HEADER_FORMAT,TRACE_MAGIC,TRACE_VERSION))
+
+	def write (self,data):
+		self.fio.write(data)
+		self.offset += len(data)
+
+	def opcode (self,clock,id,ind,opcode,changes):
+		if self.index:
+			if self.line_offset < 0:
+				self.index.add(clock,ind*4,self.offset)
+			else:
+				self.index.add(clock,ind*4,self.line_offset)
+			self.line_offset = -1
+		if opcode[0] is None:
+			self.write(struct.pack(RECORD_FORMAT,RECORD_ERROR,clock,id,ind*4,opcode[2],0))
+			return
+		record = [struct.pack(RECORD_FORMAT,RECORD_OPCODE,clock,id,ind*4,opcode[2],len(changes))]
+		for (kind,index,value) in changes.records():
+			record.append(struct.pack(CHANGE_FORMAT,kind,int(index) & 0xFFFFFFFF,int(value) & 0xFFFFFFFF))
+		self.write(''.join(record))
+
+	def line (self,line):
+		if self.line_offset < 0:
+			self.line_offset = self.offset
+		self.write(struct.pack(RECORD_FORMAT,RECORD_LINE,0,0,0,0,len(line)) + line)
+
+	def reopen (self,suffix):
+		""" a sink like this one on file name + suffix """
+		return binary_sink(self.name + suffix,self.batch_size,self.compression,self.index_interval)
+
+	def close (self):
+		self.fio.close()
+		if self.index:
+			self.index.save(self.name + INDEX_SUFFIX,self.offset)
+
+class index_builder:
+	""" splits the trace into windows of records that fall in the same index_interval clocks ;
+		a new window starts whenever the clock moves to another interval, so runners that
+		restart the clock only add windows. the pcs executed in each window are kept too """
+
+	def __init__ (self,interval):
+		self.interval = interval
+		self.windows = []
+		self.pcs = {}
+		self.window = -1
+		self.window_pcs = {}
+
+	def add (self,clock,pc,offset):
+		window = clock // self.interval
+		if window != self.window:
+			self.end_window()
+			self.window = window
+			self.windows.append((window,offset))
+		self.window_pcs[pc] = 1
+
+	def end_window (self):
+		number = len(self.windows) - 1
+		for pc in self.window_pcs:
+			if pc not in self.pcs:
+				self.pcs[pc] = []
+			self.pcs[pc].append(number)
+		self.window_pcs = {}
+
+	def save (self,name,end):
+		""" write the index ; end is the offset just past the last record """
+		self.end_window()
+		fobj = open(name,'wb')
+		fobj.write(struct.pack(INDEX_HEADER_FORMAT,INDEX_MAGIC,INDEX_VERSION,self.interval,len(self.windows),len(self.pcs)))
+		for (window,offset) in self.windows:
+			fobj.write(struct.pack(INDEX_WINDOW_FORMAT,window,offset))
+		fobj.write(struct.pack('<Q',end))
+		for pc in sorted(self.pcs.keys()):
+			fobj.write(struct.pack(INDEX_PC_FORMAT,pc,len(self.pcs[pc])))
+			fobj.write(struct.pack('<%dI' % (len(self.pcs[pc])),*self.pcs[pc]))
+		fobj.close()
+
+class trace_index:
+	""" sidecar index of a binary trace, see index_builder """
+
+	def __init__ (self,name):
+		fobj = open(name,'rb')
+		data = fobj.read()
+		fobj.close()
+		pos = struct.calcsize(INDEX_HEADER_FORMAT)
+		(magic,version,self.interval,windows,pcs) = struct.unpack(INDEX_HEADER_FORMAT,data[:pos])
+		if magic != INDEX_MAGIC or version != INDEX_VERSION:
+			raise ValueError('not a version %d trace index' % (INDEX_VERSION))
+		size = struct.calcsize(INDEX_WINDOW_FORMAT)
+		self.windows = []
+		self.offsets = []
+		for i in range(windows):
+			(window,offset) = struct.unpack(INDEX_WINDOW_FORMAT,data[pos:pos + size])
+			self.windows.append(window)
+			self.offsets.append(offset)
+			pos += size
+		self.offsets.append(struct.unpack('<Q',data[pos:pos + 8])[0])
+		pos += 8
+		size = struct.calcsize(INDEX_PC_FORMAT)
+		self.pcs = {}
+		for i in range(pcs):
+			(pc,count) = struct.unpack(INDEX_PC_FORMAT,data[pos:pos + size])
+			pos += size
+			self.pcs[pc] = struct.unpack('<%dI' % (count),data[pos:pos + 4 * count])
+			pos += 4 * count
+
+	def clock_windows (self,first,last):
+		""" numbers of the windows that may hold clocks first to last """
+		first = first // self.interval
+		last = last // self.interval
+		return [ i for i in range(len(self.windows)) if first <= self.windows[i] <= last ]
+
+	def pc_windows (self,pc):
+		""" numbers of the windows that executed pc """
+		return list(self.pcs.get(pc,()))
+
+	def span (self,number):
+		""" (start, end) offsets of a window in the uncompressed trace """
+		return (self.offsets[number],self.offsets[number + 1])
+
+def read_header (fobj):
+	header = fobj.read(struct.calcsize(HEADER_FORMAT))
+	(magic,version) = struct.unpack(HEADER_FORMAT,header)
+	if magic != TRACE_MAGIC or version != TRACE_VERSION:
+		raise ValueError('not a version %d trace file' % (TRACE_VERSION))
+
+def read_records (fobj,size=-1):
+	""" iterate the records from the current position, size bytes of them or up to the end """
+	while size != 0:
+		data = fobj.read(RECORD_SIZE)
+		if len(data) < RECORD_SIZE:
+			return
+		(type,clock,id,pc,word,count) = struct.unpack(RECORD_FORMAT,data)
+		if type == RECORD_LINE:
+			size -= RECORD_SIZE + count
+			yield (type,clock,id,pc,word,fobj.read(count))
+			continue
+		size -= RECORD_SIZE + count * CHANGE_SIZE
+		changes = []
+		for i in range(count):
+			changes.append(struct.unpack(CHANGE_FORMAT,fobj.read(CHANGE_SIZE)))
+		yield (type,clock,id,pc,word,changes)
+
+def read_trace (fobj):
+	""" iterate the records of a binary trace : (type, clock, id, pc, word, changes) ;
+		changes is a list of (kind, index, value), or the text of a line record """
+	read_header(fobj)
+	for record in read_records(fobj):
+		yield record
+
+def select_records (records,first,last,pc):
+	""" records in clock range first to last ( None for no limit ) that executed pc ( None for any ) ;
+		line records go with the opcode record that follows them and only pass when no pc is asked for """
+	lines = []
+	for record in records:
+		if record[0] == RECORD_LINE:
+			if pc is None:
+				lines.append(record)
+			continue
+		if (first is None or record[1] >= first) and (last is None or record[1] <= last) and \
+			(pc is None or record[3] == pc):
+			for line in lines:
+				yield line
+			yield record
+		lines = []
+	# lines after the last opcode, when the whole run is asked for
+	if first is None and last is None:
+		for line in lines:
+			yield line
+
+def seek_trace (name,first=None,last=None,pc=None):
+	""" iterate the records of trace file name in clock range first to last that executed pc ;
+		with a sidecar index only the windows that can match are read, otherwise the whole file is.
+		offsets are uncompressed, a compressed trace still decompresses up to each window """
+	fobj = open_trace_input(name)
+	read_header(fobj)
+	try:
+		index = trace_index(name + INDEX_SUFFIX)
+	except IOError:
+		index = 0
+	if not index:
+		for record in select_records(read_records(fobj),first,last,pc):
+			yield record
+		fobj.close()
+		return
+	if first is None and last is None:
+		windows = range(len(index.windows))
+	else:
+		if first is None:
+			first = 0
+		if last is None:
+			last = 0xFFFFFFFF
+		windows = index.clock_windows(first,last)
+	if pc is not None:
+		windows = sorted(set(windows) & set(index.pc_windows(pc)))
+	for number in windows:
+		(start,end) = index.span(number)
+		fobj.seek(start)
+		for record in select_records(read_records(fobj,end - start),first,last,pc):
+			yield record
+	fobj.close()
+
+def render (record):
+	""" the sim.log text lines of one trace record """
+	(type,clock,id,pc,word,changes) = record
+	if type == RECORD_LINE:
+		return [changes]
+	if type == RECORD_ERROR:
+		return ["clock=%d id=%d : 0x%08x => 0x%08x\tError ????" % (clock,id,pc,word)]
+	lines = ["clock=%d id=%d : 0x%08x => 0x%08x\t%s" % (clock,id,pc,word,disassembler.disassemble(word))]
+	if len(changes) > 0:
+		lines.append("clock=%d id=%d : CHANGES: %s" % (clock,id,format_changes(changes)))
+	return lines